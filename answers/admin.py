@@ -1,6 +1,10 @@
 from django.contrib import admin
+from django.db import transaction
 
-from .models import State, City, Submission, SubmissionAnswer
+from .ingest import sync_answer_fields
+from .models import State, City, Submission, SubmissionAnswer, ExportJob, PurgeJob, IngestReceipt
+from . import purge, rollups
+from .pagination import EstimatedCountPaginator
 
 
 @admin.register(State)
@@ -47,11 +51,33 @@ class SubmissionAdmin(admin.ModelAdmin):
     inlines = [SubmissionAnswerInline]
     list_select_related = ('survey', 'company', 'city', 'state')
     raw_id_fields = ('city', 'state')
+    # Avoid exact COUNT(*)s over millions of rows on every changelist request
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def get_queryset(self, request):  # type: ignore[override]
         qs = super().get_queryset(request)
         return qs.select_related('survey', 'company', 'city', 'state')
 
+    # The change form saves the submission and its inline answers in one
+    # transaction: uncount them before, recount them once everything is saved.
+    def save_model(self, request, obj, form, change):  # type: ignore[override]
+        if change:
+            rollups.remove_submissions(Submission.objects.filter(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):  # type: ignore[override]
+        super().save_related(request, form, formsets, change)
+        answers = SubmissionAnswer.objects.filter(submission=form.instance)
+        sync_answer_fields(answers)
+        rollups.add_answers(answers)
+
+    def delete_model(self, request, obj):  # type: ignore[override]
+        purge.delete_submissions([obj.pk])
+
+    def delete_queryset(self, request, queryset):  # type: ignore[override]
+        purge.delete_submissions(queryset.values_list('id', flat=True))
+
 
 @admin.register(SubmissionAnswer)
 class SubmissionAnswerAdmin(admin.ModelAdmin):
@@ -66,10 +92,59 @@ class SubmissionAnswerAdmin(admin.ModelAdmin):
     )
     raw_id_fields = ('submission',)
     list_select_related = ('submission', 'question', 'selected_option')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def get_queryset(self, request):  # type: ignore[override]
         qs = super().get_queryset(request)
         return qs.select_related('submission', 'question', 'selected_option')
 
+    # The change form runs in a transaction, so the rollups change with the answer
+    def save_model(self, request, obj, form, change):  # type: ignore[override]
+        if change:
+            rollups.remove_answers(SubmissionAnswer.objects.filter(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+        answer = SubmissionAnswer.objects.filter(pk=obj.pk)
+        sync_answer_fields(answer)
+        rollups.add_answers(answer)
+
+    def delete_model(self, request, obj):  # type: ignore[override]
+        with transaction.atomic():
+            rollups.remove_answers(SubmissionAnswer.objects.filter(pk=obj.pk))
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):  # type: ignore[override]
+        with transaction.atomic():
+            rollups.remove_answers(queryset)
+            super().delete_queryset(request, queryset)
 
 
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'survey', 'kind', 'export_format', 'status', 'processed', 'total', 'file_size', 'created_at', 'finished_at',
+    )
+    list_filter = ('status', 'kind', 'export_format')
+    search_fields = ('survey__title', 'error')
+    raw_id_fields = ('survey', 'requested_by')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    list_select_related = ('survey',)
+
+
+@admin.register(PurgeJob)
+class PurgeJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'survey', 'status', 'processed', 'total', 'created_at', 'finished_at',
+    )
+    list_filter = ('status',)
+    search_fields = ('survey__title', 'error')
+    raw_id_fields = ('survey', 'requested_by')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    list_select_related = ('survey',)
+
+
+@admin.register(IngestReceipt)
+class IngestReceiptAdmin(admin.ModelAdmin):
+    list_display = ('receipt', 'company_id', 'submission_id', 'accepted_at', 'stored_at')
+    search_fields = ('receipt', 'error')
+    readonly_fields = ('accepted_at', 'stored_at')
@@ -6,3 +6,7 @@ class AnswersConfig(AppConfig):
     name = 'answers'
 
 
+
+    def ready(self):
+        # Import to register the gazetteer signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,153 @@
+"""Benchmark scenarios for the ingest, survey detail, dashboard and export paths.
+
+Each :class:`Scenario` is a callable run repeatedly against a seeded dataset by
+the ``run_benchmarks`` command. :func:`measure` records wall-clock latency, the
+number of SQL queries and the peak Python memory (``tracemalloc``) of the
+runs, and :class:`Result` summarizes them as p50/p95.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .exports import write_export
+from .models import ExportJob
+
+
+@dataclass
+class Context:
+    """Everything a scenario needs: the seeded survey and authenticated clients."""
+    survey: object
+    factory: object
+    api: Client
+    browser: Client
+    bulk_size: int = 100
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[Context], None]
+    description: str = ''
+
+
+@dataclass
+class Result:
+    name: str
+    latencies_ms: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    peak_kb: float = 0.0
+
+    @staticmethod
+    def _percentile(values: List[float], pct: int) -> float:
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'scenario': self.name,
+            'runs': len(self.latencies_ms),
+            'p50_ms': round(self._percentile(self.latencies_ms, 50), 2),
+            'p95_ms': round(self._percentile(self.latencies_ms, 95), 2),
+            'queries': max(self.queries),
+            'peak_kb': round(self.peak_kb, 1),
+        }
+
+
+class _Discard:
+    """Text sink for exports: counts what is written and keeps nothing."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, value: str) -> int:
+        self.size += len(value)
+        return len(value)
+
+
+def _check(response, expected: int = 200):
+    if response.status_code != expected:
+        raise AssertionError(f'{response.request["PATH_INFO"]} returned {response.status_code}, expected {expected}')
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def _survey_detail(ctx: Context) -> None:
+    _check(ctx.api.get(reverse('api_survey_detail'), {'token': ctx.survey.token}))
+
+
+def _submit(ctx: Context) -> None:
+    _check(ctx.api.post(reverse('answers_submit'), json.dumps(ctx.factory.payload()), content_type='application/json'), 201)
+
+
+def _submit_bulk(ctx: Context) -> None:
+    body = json.dumps([ctx.factory.payload() for _ in range(ctx.bulk_size)])
+    _check(ctx.api.post(reverse('answers_submit_bulk'), body, content_type='application/json'))
+
+
+def _dashboard(ctx: Context) -> None:
+    _check(ctx.browser.get(reverse('answers_dashboard', args=[ctx.survey.id])))
+
+
+def _dashboard_distributions(ctx: Context) -> None:
+    _check(ctx.browser.get(reverse('answers_dashboard', args=[ctx.survey.id]), {'format': 'distributions'}))
+
+
+def _dashboard_csv(ctx: Context) -> None:
+    _check(ctx.browser.get(reverse('answers_dashboard', args=[ctx.survey.id]), {'format': 'csv'}))
+
+
+def _export(kind: str, export_format: str) -> Callable[[Context], None]:
+    def run(ctx: Context) -> None:
+        job = ExportJob(survey=ctx.survey, kind=kind, export_format=export_format, filters={})
+        write_export(job, _Discard())
+    return run
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario('api_survey_detail', _survey_detail, 'GET /api/v1/survey/'),
+    Scenario('submit_answers', _submit, 'POST /api/v1/answers/submit/'),
+    Scenario('submit_answers_bulk', _submit_bulk, 'POST /api/v1/answers/submit/bulk/'),
+    Scenario('survey_dashboard', _dashboard, 'Dashboard HTML'),
+    Scenario('survey_dashboard_distributions', _dashboard_distributions, 'Dashboard distributions JSON'),
+    Scenario('survey_dashboard_csv', _dashboard_csv, 'Dashboard CSV (streamed)'),
+    Scenario('export_dashboard_csv', _export(ExportJob.KIND_DASHBOARD, ExportJob.FORMAT_CSV), 'Background export, dashboard CSV'),
+    Scenario('export_detail_json', _export(ExportJob.KIND_DETAIL, ExportJob.FORMAT_JSON), 'Background export, detail JSON'),
+]
+
+
+def measure(scenario: Scenario, ctx: Context, iterations: int, warmup: int = 1) -> Result:
+    """Run ``scenario`` ``warmup + iterations`` times and record the measured runs.
+
+    Peak memory comes from one extra traced run, since ``tracemalloc`` slows
+    Python code down too much to be on while timing.
+    """
+    for _ in range(warmup):
+        scenario.run(ctx)
+    result = Result(scenario.name)
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            scenario.run(ctx)
+            elapsed = time.perf_counter() - started
+        result.latencies_ms.append(elapsed * 1000)
+        result.queries.append(len(queries.captured_queries))
+
+    tracemalloc.start()
+    try:
+        scenario.run(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result.peak_kb = peak / 1024
+    return result
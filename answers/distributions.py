@@ -0,0 +1,90 @@
+"""Option distributions for every choice question of a survey.
+
+Counts for all questions are computed with one grouped query (by question and
+selected option) with the state/city filters applied once, so the number of
+queries does not grow with the number of questions. The result is shared by the
+HTML dashboard, the JSON export and the API.
+"""
+from django.db.models import Count
+
+from surveys.models import Question
+from .models import SubmissionAnswer
+from . import rollups
+
+
+SOURCE_ROLLUP = 'rollup'
+SOURCE_ANSWERS = 'answers'
+
+CHOICE_TYPES = (Question.MULTIPLE_CHOICE, Question.SINGLE_CHOICE)
+
+
+def _answer_counts(survey, state_id=None, city_id=None):
+    """Live counts straight from ``SubmissionAnswer`` (exact, but scans answers).
+
+    Filters on the survey, state and city copied onto each answer, so the
+    query reads one index of one table.
+    """
+    qs = SubmissionAnswer.objects.filter(survey=survey, selected_option__isnull=False)
+    if state_id:
+        qs = qs.filter(state_id=state_id)
+    if city_id:
+        qs = qs.filter(city_id=city_id)
+    return (
+        qs
+        .values_list('question_id', 'selected_option_id', 'selected_option__option_text')
+        .annotate(total=Count('id'))
+        .order_by('question_id', '-total')
+    )
+
+
+def _rollup_counts(survey, state_id=None, city_id=None):
+    return rollups.option_totals(survey, state_id, city_id).values_list(
+        'question_id', 'option_id', 'option__option_text', 'total',
+    )
+
+
+def compute_distributions(survey, state_id=None, city_id=None, source: str = SOURCE_ROLLUP) -> list[dict]:
+    """Return ``[{'question': Question, 'options': [...]}, ...]`` for the choice questions of ``survey``.
+
+    Each option entry has ``selected_option_id``, ``selected_option__option_text``
+    and ``total``, ordered by descending total. ``source`` picks the rollup table
+    (default) or a live scan of the answers. Always runs exactly two queries.
+    """
+    questions = list(
+        Question.objects.filter(survey=survey, question_type__in=CHOICE_TYPES).order_by('id')
+    )
+    counts = _answer_counts if source == SOURCE_ANSWERS else _rollup_counts
+
+    options_by_question: dict[int, list[dict]] = {}
+    for question_id, option_id, option_text, total in counts(survey, state_id, city_id):
+        options_by_question.setdefault(question_id, []).append({
+            'selected_option_id': option_id,
+            'selected_option__option_text': option_text,
+            'total': total,
+        })
+
+    return [
+        {'question': q, 'options': options_by_question.get(q.id, [])}
+        for q in questions
+    ]
+
+
+def distributions_to_json(distributions: list[dict]) -> list[dict]:
+    """JSON-friendly form of :func:`compute_distributions` output."""
+    return [
+        {
+            'question_id': dist['question'].id,
+            'question_text': dist['question'].question_text,
+            'question_type': dist['question'].question_type,
+            'total': sum(opt['total'] for opt in dist['options']),
+            'options': [
+                {
+                    'option_id': opt['selected_option_id'],
+                    'option_text': opt['selected_option__option_text'],
+                    'total': opt['total'],
+                }
+                for opt in dist['options']
+            ],
+        }
+        for dist in distributions
+    ]
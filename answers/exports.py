@@ -0,0 +1,289 @@
+"""Streaming exports of survey submissions.
+
+Submissions and their answers are walked with ``.iterator(chunk_size=...)`` so
+PostgreSQL uses server-side cursors and only one chunk of rows is held in
+memory at a time. Both querysets are ordered by submission id, which lets the
+answers be pivoted into CSV rows with a simple merge join.
+"""
+import csv
+import json
+import os
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Iterable, Iterator, TextIO
+
+from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+
+from surveys.models import Option, Question
+from .models import ExportJob, Submission, SubmissionAnswer
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+DASHBOARD_CSV_HEADER = ['Submission ID', 'Submitted At', 'IP Address', 'State', 'City', 'Latitude', 'Longitude']
+DETAIL_CSV_HEADER = ['Submission ID', 'Submitted At', 'IP', 'State', 'City', 'Latitude', 'Longitude', 'Question', 'Answer']
+
+# Progress is reported to the caller every this many submissions
+PROGRESS_EVERY = 1000
+
+
+class Echo:
+    """File-like object that returns what is written instead of buffering it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_submissions_with_answers(
+    submissions_qs: QuerySet,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[tuple[tuple, list[tuple]]]:
+    """Yield ``(submission_row, answer_rows)`` pairs ordered by submission id.
+
+    ``submission_row`` is ``(id, submitted_at, ip_address, state name, city name,
+    latitude, longitude)`` and each answer row is
+    ``(question_id, selected_option_id, text_response)``.
+    """
+    submissions = (
+        submissions_qs
+        .order_by('id')
+        .values_list('id', 'submitted_at', 'ip_address', 'state__name', 'city__name', 'latitude', 'longitude')
+        .iterator(chunk_size=chunk_size)
+    )
+    answers = (
+        SubmissionAnswer.objects
+        .filter(submission__in=submissions_qs.values('id'))
+        .order_by('submission_id', 'id')
+        .values_list('submission_id', 'question_id', 'selected_option_id', 'text_response')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    pending = next(answers, None)
+    for sub in submissions:
+        sub_answers: list[tuple] = []
+        # Skip answers of submissions filtered out between both cursors opening
+        while pending is not None and pending[0] < sub[0]:
+            pending = next(answers, None)
+        while pending is not None and pending[0] == sub[0]:
+            sub_answers.append(pending[1:])
+            pending = next(answers, None)
+        yield sub, sub_answers
+
+
+def iter_dashboard_csv_rows(survey, submissions_qs: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list]:
+    """Yield the header and one pivoted row per submission (one column per question)."""
+    questions = list(Question.objects.filter(survey=survey).order_by('id').values_list('id', 'question_text'))
+    option_text = dict(Option.objects.filter(question__survey=survey).values_list('id', 'option_text'))
+    column_for_question = {qid: idx for idx, (qid, _) in enumerate(questions)}
+
+    yield DASHBOARD_CSV_HEADER + [f'Q{qid}: {text}' for qid, text in questions]
+
+    for sub, sub_answers in iter_submissions_with_answers(submissions_qs, chunk_size):
+        sub_id, submitted_at, ip_address, state_name, city_name, latitude, longitude = sub
+        cells: list[list[str]] = [[] for _ in questions]
+        for question_id, option_id, text_response in sub_answers:
+            idx = column_for_question.get(question_id)
+            if idx is None:
+                continue
+            if option_id:
+                cells[idx].append(option_text.get(option_id) or '')
+            elif text_response:
+                cells[idx].append(text_response)
+        yield [
+            sub_id,
+            submitted_at.strftime('%Y-%m-%d %H:%M:%S') if submitted_at else '',
+            ip_address or '',
+            state_name or '',
+            city_name or '',
+            latitude or '',
+            longitude or '',
+        ] + ['; '.join(values) for values in cells]
+
+
+def stream_csv(rows: Iterable[list]) -> Iterator[str]:
+    """Encode rows as CSV lines one at a time."""
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+
+def _parse_day(value: str | None) -> date | None:
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def filter_submissions(survey, filters: dict) -> QuerySet:
+    """Submissions of ``survey`` narrowed by the view filters (state, city, from, to).
+
+    Dates become a half-open ``submitted_at`` range rather than a ``__date``
+    lookup, so the ``(survey, submitted_at, id)`` index can serve them.
+    """
+    qs = Submission.objects.filter(survey=survey)
+    date_from = _parse_day(filters.get('from'))
+    date_to = _parse_day(filters.get('to'))
+    if date_from:
+        qs = qs.filter(submitted_at__gte=datetime.combine(date_from, time.min))
+    if date_to:
+        qs = qs.filter(submitted_at__lt=datetime.combine(date_to + timedelta(days=1), time.min))
+    if filters.get('state'):
+        qs = qs.filter(state_id=filters['state'])
+    if filters.get('city'):
+        qs = qs.filter(city_id=filters['city'])
+    return qs
+
+
+def _iter_detail_csv_rows(survey, submissions_qs: QuerySet, chunk_size: int) -> Iterator[list[list]]:
+    """Yield the rows of each submission (one per answer, none without answers)."""
+    question_text = dict(Question.objects.filter(survey=survey).values_list('id', 'question_text'))
+    option_text = dict(Option.objects.filter(question__survey=survey).values_list('id', 'option_text'))
+
+    for sub, sub_answers in iter_submissions_with_answers(submissions_qs, chunk_size):
+        sub_id, submitted_at, ip_address, state_name, city_name, latitude, longitude = sub
+        rows = []
+        for question_id, option_id, text_response in sub_answers:
+            answer_text = option_text.get(option_id) if option_id else text_response
+            rows.append([
+                sub_id,
+                submitted_at,
+                ip_address or '',
+                state_name or '',
+                city_name or '',
+                latitude or '',
+                longitude or '',
+                question_text.get(question_id, ''),
+                answer_text or '',
+            ])
+        yield rows
+
+
+def _iter_json_items(survey, kind: str, submissions_qs: QuerySet, chunk_size: int) -> Iterator[dict]:
+    question_text = dict(Question.objects.filter(survey=survey).values_list('id', 'question_text'))
+    option_text = dict(Option.objects.filter(question__survey=survey).values_list('id', 'option_text'))
+    id_key = 'id' if kind == ExportJob.KIND_DASHBOARD else 'submission_id'
+
+    for sub, sub_answers in iter_submissions_with_answers(submissions_qs, chunk_size):
+        sub_id, submitted_at, ip_address, state_name, city_name, latitude, longitude = sub
+        yield {
+            id_key: sub_id,
+            'submitted_at': submitted_at.isoformat() if submitted_at else None,
+            'ip_address': ip_address,
+            'state': state_name,
+            'city': city_name,
+            'latitude': float(latitude) if latitude is not None else None,
+            'longitude': float(longitude) if longitude is not None else None,
+            'answers': [
+                {
+                    'question_id': question_id,
+                    'question_text': question_text.get(question_id),
+                    'selected_option_id': option_id,
+                    'selected_option_text': option_text.get(option_id) if option_id else None,
+                    'text_response': text_response,
+                }
+                for question_id, option_id, text_response in sub_answers
+            ],
+        }
+
+
+def write_export(
+    job: ExportJob,
+    out: TextIO,
+    on_progress: Callable[[int], None] | None = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> None:
+    """Render ``job`` into the text stream ``out``.
+
+    ``on_progress`` is called with the number of submissions written so far
+    every ``PROGRESS_EVERY`` submissions and once at the end.
+    """
+    survey = job.survey
+    submissions_qs = filter_submissions(survey, job.filters or {})
+    processed = 0
+
+    def tick() -> None:
+        nonlocal processed
+        processed += 1
+        if on_progress and processed % PROGRESS_EVERY == 0:
+            on_progress(processed)
+
+    if job.export_format == ExportJob.FORMAT_JSON:
+        out.write('[')
+        for idx, item in enumerate(_iter_json_items(survey, job.kind, submissions_qs, chunk_size)):
+            if idx:
+                out.write(',')
+            out.write(json.dumps(item, ensure_ascii=False))
+            tick()
+        out.write(']')
+    else:
+        writer = csv.writer(out)
+        if job.kind == ExportJob.KIND_DASHBOARD:
+            rows = iter_dashboard_csv_rows(survey, submissions_qs, chunk_size)
+            writer.writerow(next(rows))
+            for row in rows:
+                writer.writerow(row)
+                tick()
+        else:
+            writer.writerow(DETAIL_CSV_HEADER)
+            # Submissions without answers write no rows but still count, so
+            # progress ends at the total counted by the worker
+            for rows in _iter_detail_csv_rows(survey, submissions_qs, chunk_size):
+                writer.writerows(rows)
+                tick()
+
+    if on_progress:
+        on_progress(processed)
+
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _iter_file_range(path: str, start: int, length: int, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = fh.read(min(block_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def ranged_file_response(request, path: str, filename: str, content_type: str) -> HttpResponse:
+    """Serve ``path`` honouring a single ``Range: bytes=...`` header.
+
+    Returns 206 with ``Content-Range`` for satisfiable ranges, 416 for
+    unsatisfiable ones and the whole file (200) otherwise, so interrupted
+    downloads can be resumed.
+    """
+    size = os.path.getsize(path)
+    start, end = 0, size - 1
+    status = 200
+
+    match = _RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if match and (match.group(1) or match.group(2)):
+        first, last = match.group(1), match.group(2)
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(last))
+        if start >= size or start > end:
+            resp = HttpResponse(status=416)
+            resp['Content-Range'] = f'bytes */{size}'
+            return resp
+        status = 206
+
+    length = end - start + 1 if size else 0
+    resp = StreamingHttpResponse(_iter_file_range(path, start, length), status=status, content_type=content_type)
+    resp['Content-Length'] = str(length)
+    resp['Accept-Ranges'] = 'bytes'
+    resp['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if status == 206:
+        resp['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return resp
@@ -0,0 +1,209 @@
+"""Process-wide, read-only index of Brazilian states and cities.
+
+``City``/``State`` only change when ``load_geographic_data`` runs, yet ingest
+validation and the preview pages looked them up row by row. :class:`Gazetteer`
+loads both tables once (two queries) into compact arrays: cities sorted by
+state and name so each state owns a contiguous slice, plus dicts from IBGE
+city code and IBGE state code to positions. Lookups then cost no queries.
+:meth:`Gazetteer.nearest_city` resolves coordinates to the municipality with
+the closest seat through a grid index.
+
+Every process keeps its own instance. Its version is read from the database
+(row count and latest ``updated_at`` of both tables), so loads and edits made
+by any process, with any cache backend, are noticed: readers compare it at
+most every ``GAZETTEER_VERSION_CHECK_INTERVAL`` seconds and rebuild when it
+changed. Writers call :func:`bump_version` to have their own process check on
+the next lookup.
+"""
+import math
+import threading
+import time
+from array import array
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import City, State
+
+
+# Reverse geocoding grid: cell size in degrees and the equirectangular scale
+GRID_CELL_DEGREES = 0.5
+KM_PER_DEGREE = 111.32
+
+
+class StateEntry(NamedTuple):
+    id: int
+    code: str
+    uf: str
+    name: str
+
+
+class CityEntry(NamedTuple):
+    id: int
+    ibge_code: str
+    name: str
+    state_id: int
+    latitude: float
+    longitude: float
+
+
+class Gazetteer:
+    """Immutable snapshot of ``State`` and ``City``."""
+
+    def __init__(self, version: tuple = ()):
+        self.version = version
+        states = sorted(State.objects.values_list('id', 'code', 'uf', 'name'), key=lambda s: s[3])
+        self._states = tuple(StateEntry(*s) for s in states)
+        self._state_by_code = {s.code: s for s in self._states}
+        self._state_by_id = {s.id: s for s in self._states}
+
+        rows = sorted(
+            City.objects.values_list('id', 'ibge_code', 'name', 'state_id', 'latitude', 'longitude'),
+            key=lambda c: (c[3], c[2]),
+        )
+        self.city_ids = array('q', (r[0] for r in rows))
+        self.city_state_ids = array('q', (r[3] for r in rows))
+        self.latitudes = array('d', (float(r[4]) for r in rows))
+        self.longitudes = array('d', (float(r[5]) for r in rows))
+        self._ibge_codes = tuple(r[1] for r in rows)
+        self._names = tuple(r[2] for r in rows)
+        self._index_by_ibge = {code: i for i, code in enumerate(self._ibge_codes)}
+
+        # Spatial index for nearest_city(), built on first use
+        self._grid: dict[tuple[int, int], array] | None = None
+
+        # state_id -> (start, end) slice of the city arrays
+        self._state_slices: dict[int, tuple[int, int]] = {}
+        for i, state_id in enumerate(self.city_state_ids):
+            start, _ = self._state_slices.get(state_id, (i, i))
+            self._state_slices[state_id] = (start, i + 1)
+
+    def __len__(self) -> int:
+        return len(self.city_ids)
+
+    def _city(self, i: int) -> CityEntry:
+        return CityEntry(
+            self.city_ids[i], self._ibge_codes[i], self._names[i],
+            self.city_state_ids[i], self.latitudes[i], self.longitudes[i],
+        )
+
+    def states(self) -> tuple[StateEntry, ...]:
+        """All states ordered by name."""
+        return self._states
+
+    def state(self, code: str) -> StateEntry | None:
+        """State by IBGE state code (e.g. ``'35'``)."""
+        return self._state_by_code.get(code)
+
+    def state_by_id(self, state_id: int) -> StateEntry | None:
+        return self._state_by_id.get(state_id)
+
+    def city(self, ibge_code: str) -> CityEntry | None:
+        """City by 7-digit IBGE code."""
+        i = self._index_by_ibge.get(ibge_code)
+        return None if i is None else self._city(i)
+
+    def city_at(self, i: int) -> CityEntry:
+        """City by position in the arrays."""
+        return self._city(i)
+
+    def nearest_city(self, latitude: float, longitude: float, max_km: float | None = None) -> CityEntry | None:
+        """City whose seat is closest to the point, or ``None`` if none is within ``max_km``.
+
+        Uses a uniform grid of ``GRID_CELL_DEGREES`` cells built on first use,
+        scanning rings of cells outward until no closer seat can exist.
+        """
+        if max_km is None:
+            max_km = settings.REVERSE_GEOCODE_MAX_KM
+        grid = self._grid
+        if grid is None:
+            grid = self._grid = self._build_grid()
+        if not grid:
+            return None
+
+        lat, lng = float(latitude), float(longitude)
+        cos_lat = math.cos(math.radians(lat))
+        cx, cy = int(math.floor(lng / GRID_CELL_DEGREES)), int(math.floor(lat / GRID_CELL_DEGREES))
+        # Smallest distance (km) covered by ring r is about (r - 1) cells on the narrow (longitude) side
+        cell_km = GRID_CELL_DEGREES * KM_PER_DEGREE * max(cos_lat, 0.01)
+        max_ring = int(max_km / cell_km) + 2
+        best_i, best_d2 = -1, float('inf')
+        lats, lngs = self.latitudes, self.longitudes
+        for ring in range(max_ring + 1):
+            if best_i >= 0 and ((ring - 1) * cell_km) ** 2 > best_d2:
+                break
+            for x in range(cx - ring, cx + ring + 1):
+                for y in (range(cy - ring, cy + ring + 1) if x in (cx - ring, cx + ring) else (cy - ring, cy + ring)):
+                    for i in grid.get((x, y), ()):
+                        dy = (lats[i] - lat) * KM_PER_DEGREE
+                        dx = (lngs[i] - lng) * KM_PER_DEGREE * cos_lat
+                        d2 = dx * dx + dy * dy
+                        if d2 < best_d2:
+                            best_i, best_d2 = i, d2
+        if best_i < 0 or best_d2 > max_km * max_km:
+            return None
+        return self._city(best_i)
+
+    def _build_grid(self) -> dict[tuple[int, int], array]:
+        grid: dict[tuple[int, int], array] = {}
+        for i, (lat, lng) in enumerate(zip(self.latitudes, self.longitudes)):
+            key = (int(math.floor(lng / GRID_CELL_DEGREES)), int(math.floor(lat / GRID_CELL_DEGREES)))
+            grid.setdefault(key, array('l')).append(i)
+        return grid
+
+    def cities_in_state(self, code: str) -> list[CityEntry]:
+        """Cities of the state with IBGE state code ``code``, ordered by name."""
+        state = self.state(code)
+        if state is None:
+            return []
+        start, end = self._state_slices.get(state.id, (0, 0))
+        return [self._city(i) for i in range(start, end)]
+
+
+_current: Gazetteer | None = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _db_version() -> tuple:
+    """Row counts and latest changes of ``State`` and ``City``; two aggregate queries."""
+    return tuple(
+        value
+        for model in (State, City)
+        for value in model.objects.aggregate(rows=Count('id'), changed=Max('updated_at')).values()
+    )
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return this process's gazetteer, rebuilding it after a version bump."""
+    global _current, _checked_at
+    now = time.monotonic()
+    current = _current
+    if current is not None and now - _checked_at < settings.GAZETTEER_VERSION_CHECK_INTERVAL:
+        return current
+    with _lock:
+        version = _db_version()
+        if _current is None or _current.version != version:
+            _current = Gazetteer(version)
+        _checked_at = now
+        return _current
+
+
+async def aget_gazetteer() -> Gazetteer:
+    """Async :func:`get_gazetteer`; only leaves the event loop when a version check is due."""
+    current = _current
+    if current is not None and time.monotonic() - _checked_at < settings.GAZETTEER_VERSION_CHECK_INTERVAL:
+        return current
+    return await sync_to_async(get_gazetteer)()
+
+
+def bump_version() -> None:
+    """Check the version on the next lookup; call after changing ``City``/``State``.
+
+    Other processes notice the change from the database within
+    ``GAZETTEER_VERSION_CHECK_INTERVAL`` seconds.
+    """
+    global _checked_at
+    _checked_at = 0.0
@@ -0,0 +1,213 @@
+"""Server-side binning of submission coordinates for the dashboard heat map.
+
+Instead of sending every submission's coordinates to the browser, the
+``answers_heat`` endpoint returns one ``[lat, lng, count]`` cell per non-empty
+square of a world-aligned grid whose size follows the Leaflet zoom level
+(about ``CELL_PIXELS`` screen pixels per cell), limited to the map viewport.
+Binning is vectorized with NumPy and the grid is cached per survey, filters
+and zoom; the cache key includes the number and the highest id of the
+matching submissions, so new or deleted submissions are picked up without
+explicit invalidation. Submissions edited in place (coordinates, location)
+keep both, so their writers call :func:`bump_version` instead.
+
+:func:`build_grid` is the fixed rows x cols variant used by the legacy
+``_build_heat_grid`` helper: one flat cell index per point, ``bincount`` for
+the (optionally weighted) totals and a precomputed color table.
+"""
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, QuerySet
+
+MIN_ZOOM = 2
+MAX_ZOOM = 14
+CELL_PIXELS = 16
+TILE_PIXELS = 256
+CACHE_KEY_PREFIX = 'heat:'
+STREAM_CHUNK_SIZE = 10000
+
+# White -> red ramp indexed by the green/blue level (255 = white, empty cell)
+COLOR_LUT = np.array([f'#ff{level:02x}{level:02x}' for level in range(256)], dtype=object)
+
+
+def cell_degrees(zoom: int) -> float:
+    """Grid cell size in degrees for a Leaflet zoom level."""
+    return 360.0 / (2 ** zoom) / (TILE_PIXELS / CELL_PIXELS)
+
+
+def clamp_zoom(value) -> int:
+    try:
+        zoom = int(value)
+    except (TypeError, ValueError):
+        zoom = 4
+    return max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+
+
+def load_coordinates(submissions_qs: QuerySet) -> tuple[np.ndarray, np.ndarray]:
+    """Latitude and longitude arrays of the submissions that have coordinates.
+
+    Rows are streamed from a server-side cursor straight into one ``(n, 2)``
+    array, without an intermediate list of tuples.
+    """
+    rows = (
+        submissions_qs
+        .filter(latitude__isnull=False, longitude__isnull=False)
+        .values_list('latitude', 'longitude')
+        .order_by()
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    )
+    coords = np.fromiter(rows, dtype=np.dtype((np.float64, 2)))
+    if not coords.size:
+        coords = coords.reshape(0, 2)
+    return coords[:, 0], coords[:, 1]
+
+
+def load_values(submissions_qs: QuerySet, field: str) -> np.ndarray:
+    """One column of ``submissions_qs`` (``values_list(field, flat=True)``) as a float array."""
+    values = submissions_qs.order_by().values_list(field, flat=True).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    return np.fromiter(values, dtype=np.float64)
+
+
+def parse_bbox(value: str | None) -> tuple[float, float, float, float] | None:
+    """``'south,west,north,east'`` as floats, or ``None`` when missing or invalid."""
+    try:
+        south, west, north, east = (float(v) for v in (value or '').split(','))
+    except ValueError:
+        return None
+    return south, west, north, east
+
+
+def bin_points(lats: np.ndarray, lngs: np.ndarray, cell: float, weights: np.ndarray | None = None) -> dict:
+    """Sum points (or ``weights``) per grid cell of ``cell`` degrees.
+
+    Returns ``{'lat': ..., 'lng': ..., 'total': ...}`` arrays with the center
+    and total of every non-empty cell, plus ``bounds`` of the input points.
+    """
+    if lats.size == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {'lat': empty, 'lng': empty, 'total': empty, 'bounds': None}
+
+    rows = np.floor(lats / cell).astype(np.int64)
+    cols = np.floor(lngs / cell).astype(np.int64)
+    # One integer key per cell: unique() then groups points without Python loops
+    col_span = int(cols.max() - cols.min()) + 1
+    keys = (rows - rows.min()) * col_span + (cols - cols.min())
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights, minlength=unique_keys.size)
+    if weights is None:
+        totals = totals.astype(np.int64)
+
+    cell_rows = unique_keys // col_span + rows.min()
+    cell_cols = unique_keys % col_span + cols.min()
+    return {
+        'lat': np.round((cell_rows + 0.5) * cell, 5),
+        'lng': np.round((cell_cols + 0.5) * cell, 5),
+        'total': totals,
+        'bounds': [
+            [float(lats.min()), float(lngs.min())],
+            [float(lats.max()), float(lngs.max())],
+        ],
+    }
+
+
+def cells_in_bbox(binned: dict, bbox: tuple[float, float, float, float] | None, margin: float = 0.0) -> list[list]:
+    """``[[lat, lng, total], ...]`` for the cells inside ``bbox`` (all cells without one)."""
+    lat, lng, total = binned['lat'], binned['lng'], binned['total']
+    if bbox is not None:
+        south, west, north, east = bbox
+        mask = (
+            (lat >= south - margin) & (lat <= north + margin)
+            & (lng >= west - margin) & (lng <= east + margin)
+        )
+        lat, lng, total = lat[mask], lng[mask], total[mask]
+    return [list(c) for c in zip(lat.tolist(), lng.tolist(), total.tolist())]
+
+
+def build_grid(lats, lngs, rows: int, cols: int, weights=None) -> dict:
+    """Bucket points into a ``rows`` x ``cols`` grid spanning their bounds.
+
+    ``lats``, ``lngs`` and ``weights`` may be arrays or any sequence of
+    numbers (e.g. from :func:`load_values`). Returns
+    ``{'rows': [[{'count': ..., 'color': '#rrggbb'}, ...], ...], 'max': ...}``;
+    counts are ints, or floats when ``weights`` is given.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if lats.size == 0:
+        return {'rows': [[{'count': 0, 'color': COLOR_LUT[255]} for _ in range(cols)] for _ in range(rows)], 'max': 0}
+
+    cell_rows = _grid_index(lats, rows)
+    cell_cols = _grid_index(lngs, cols)
+    if weights is None:
+        grid = np.bincount(cell_rows * cols + cell_cols, minlength=rows * cols)
+    else:
+        grid = np.bincount(cell_rows * cols + cell_cols, weights=np.asarray(weights, dtype=np.float64), minlength=rows * cols)
+    max_count = grid.max()
+
+    if max_count > 0:
+        levels = (255 * (1.0 - grid / max_count)).astype(np.int64)
+    else:
+        levels = np.full(grid.shape, 255)
+    counts = grid.reshape(rows, cols).tolist()
+    colors = COLOR_LUT[levels].reshape(rows, cols).tolist()
+    return {
+        'rows': [
+            [{'count': count, 'color': color} for count, color in zip(count_row, color_row)]
+            for count_row, color_row in zip(counts, colors)
+        ],
+        'max': max_count.item(),
+    }
+
+
+def _grid_index(values: np.ndarray, size: int) -> np.ndarray:
+    """Grid row (or column) of each value; the span is widened when all values are equal."""
+    low, high = values.min(), values.max()
+    if high - low == 0:
+        low, high = low - 0.0001, high + 0.0001
+    index = ((values - low) / (high - low) * (size - 1)).astype(np.int64)
+    return np.clip(index, 0, size - 1)
+
+
+def _version_key(survey_id: int | None) -> str:
+    return f'{CACHE_KEY_PREFIX}version' if survey_id is None else f'{CACHE_KEY_PREFIX}{survey_id}:version'
+
+
+def bump_version(survey_id: int | None = None) -> None:
+    """Drop the cached grids of one survey, or of every survey, after submissions are edited in place."""
+    # Time-based so a cache eviction never brings back an older version
+    cache.set(_version_key(survey_id), time.time_ns(), None)
+
+
+def survey_heat(survey, submissions_qs: QuerySet, zoom: int, filters: dict, bbox=None) -> dict:
+    """Heat cells for ``submissions_qs`` at ``zoom`` inside ``bbox``.
+
+    The binned grid of the whole survey is cached per survey, filters and zoom;
+    only the viewport is cut per request, so panning does not re-bin.
+    """
+    fingerprint = submissions_qs.order_by().aggregate(total=Count('id'), last=Max('id'))
+    filter_key = ':'.join(f'{k}={filters[k]}' for k in sorted(filters) if filters[k])
+    versions = cache.get_many([_version_key(None), _version_key(survey.id)])
+    version = '.'.join(str(versions.get(k, 0)) for k in (_version_key(None), _version_key(survey.id)))
+    key = (
+        f'{CACHE_KEY_PREFIX}{survey.id}:{filter_key}:{zoom}:{version}:'
+        f'{fingerprint["total"]}:{fingerprint["last"]}'
+    )
+    binned = cache.get(key)
+    if binned is None:
+        lats, lngs = load_coordinates(submissions_qs)
+        binned = bin_points(lats, lngs, cell_degrees(zoom))
+        binned['points'] = int(lats.size)
+        cache.set(key, binned, settings.HEAT_CACHE_TIMEOUT)
+
+    cell = cell_degrees(zoom)
+    cells = cells_in_bbox(binned, bbox, margin=cell)
+    return {
+        'zoom': zoom,
+        'cell': cell,
+        'points': binned['points'],
+        'bounds': binned['bounds'],
+        'max': max((c[2] for c in cells), default=0),
+        'cells': cells,
+    }
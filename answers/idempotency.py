@@ -0,0 +1,176 @@
+"""Idempotent submits.
+
+Devices retry a submit whose response was lost. With an ``Idempotency-Key``
+header (or ``client_submission_id`` in the payload) the first response is
+stored in ``IdempotencyKey``, unique per company and key, in the same
+transaction as the submission, and kept in a per-process LRU. A repeat gets
+that response back without validation or inserts. When two copies race, the
+unique index rolls back the second transaction, which then answers with the
+first one's response.
+
+Spooled submits (``answers.spool``) keep the database off the request path:
+repeats are recognised in this process or in the local spool, and the flusher
+stores a duplicate's receipt with the original submission instead of a copy.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable
+
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from .models import IdempotencyKey
+
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+PAYLOAD_FIELD = 'client_submission_id'
+MAX_KEY_LENGTH = 64
+
+# (status code, response body)
+StoredResponse = tuple[int, dict]
+
+
+def _checked(key, field: str) -> str | None:
+    if key is None or key == '':
+        return None
+    if not isinstance(key, str) or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+        raise ValidationError({field: [f'Expected a printable string of at most {MAX_KEY_LENGTH} characters']})
+    return key
+
+
+def payload_key(data) -> str | None:
+    """The ``client_submission_id`` of one submission payload."""
+    return _checked(data.get(PAYLOAD_FIELD) if isinstance(data, dict) else None, PAYLOAD_FIELD)
+
+
+def get_key(request, data) -> str | None:
+    """The idempotency key of a submit: the ``Idempotency-Key`` header, else the payload field."""
+    if HEADER in request.META:
+        return _checked(request.META[HEADER], 'Idempotency-Key')
+    return payload_key(data)
+
+
+class RecentResponses:
+    """Thread-safe LRU of ``(company_id, key) -> (expires_at, response)``."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[tuple[int, str], tuple[float, StoredResponse]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, company_id: int, key: str) -> StoredResponse | None:
+        with self._lock:
+            entry = self._entries.get((company_id, key))
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[(company_id, key)]
+                return None
+            self._entries.move_to_end((company_id, key))
+            return entry[1]
+
+    def put(self, company_id: int, key: str, response: StoredResponse) -> None:
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[(company_id, key)] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end((company_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, pairs: Iterable[tuple[int, str]]) -> None:
+        with self._lock:
+            for pair in pairs:
+                self._entries.pop(pair, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+recent_responses = RecentResponses(
+    max_entries=settings.IDEMPOTENCY_CACHE_MAX_ENTRIES,
+    ttl=settings.IDEMPOTENCY_CACHE_TTL,
+)
+
+
+def lookup(company_id: int, key: str) -> StoredResponse | None:
+    """The stored response for ``key``, from this process or the database."""
+    response = recent_responses.get(company_id, key)
+    if response is not None:
+        return response
+    row = IdempotencyKey.objects.filter(company_id=company_id, key=key).values_list('status_code', 'response').first()
+    if row is None:
+        return None
+    recent_responses.put(company_id, key, tuple(row))
+    return tuple(row)
+
+
+def lookup_many(company_id: int, keys: Iterable[str]) -> dict[str, StoredResponse]:
+    """Stored responses of ``keys`` (one query for those not cached here)."""
+    found: dict[str, StoredResponse] = {}
+    missing = []
+    for key in set(keys):
+        response = recent_responses.get(company_id, key)
+        if response is None:
+            missing.append(key)
+        else:
+            found[key] = response
+    if missing:
+        rows = IdempotencyKey.objects.filter(company_id=company_id, key__in=missing)
+        for key, status_code, response in rows.values_list('key', 'status_code', 'response'):
+            found[key] = (status_code, response)
+            recent_responses.put(company_id, key, (status_code, response))
+    return found
+
+
+def stored_submissions(pairs: Iterable[tuple[int, str]]) -> dict[tuple[int, str], int | None]:
+    """Submission ids already stored for ``(company_id, key)`` pairs."""
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    rows = IdempotencyKey.objects.filter(
+        company_id__in={company_id for company_id, _ in pairs},
+        key__in={key for _, key in pairs},
+    ).values_list('company_id', 'key', 'submission_id')
+    return {(company_id, key): submission_id for company_id, key, submission_id in rows if (company_id, key) in pairs}
+
+
+def store(entries: Iterable[tuple[int, str, int | None, StoredResponse]]) -> None:
+    """Save ``(company_id, key, submission_id, response)`` entries; call inside the submission's transaction.
+
+    Raises ``IntegrityError`` if a key is already stored.
+    """
+    IdempotencyKey.objects.bulk_create([
+        IdempotencyKey(
+            company_id=company_id,
+            key=key,
+            submission_id=submission_id,
+            status_code=status_code,
+            response=response,
+        )
+        for company_id, key, submission_id, (status_code, response) in entries
+    ])
+
+
+def forget_submissions(submission_ids: Iterable[int]) -> None:
+    """Drop the keys stored for ``submission_ids``; call inside the transaction deleting them.
+
+    A retry with one of those keys is then stored as a new submission instead
+    of replaying a response for one that no longer exists. Other processes may
+    still replay it from their cache for up to ``IDEMPOTENCY_CACHE_TTL`` seconds.
+    """
+    keys = IdempotencyKey.objects.filter(submission_id__in=submission_ids)
+    pairs = list(keys.values_list('company_id', 'key'))
+    if not pairs:
+        return
+    keys.delete()
+    recent_responses.discard(pairs)
+
+
+def remember(company_id: int, key: str | None, response: StoredResponse) -> None:
+    """Keep a response in this process (after its transaction committed)."""
+    if key:
+        recent_responses.put(company_id, key, response)
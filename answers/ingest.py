@@ -0,0 +1,131 @@
+"""Persistence of validated submissions.
+
+``SubmissionCreateSerializer`` validates a payload and :func:`build_record`
+turns the validated data plus request metadata into a plain record. All write
+paths (single submit, bulk submit) hand records to :func:`persist_records`,
+which inserts every ``Submission`` and every ``SubmissionAnswer`` of a batch
+with one ``bulk_create`` each and updates the option rollups once.
+
+Answers carry copies of their submission's survey, state, city and
+``submitted_at``; :func:`sync_answer_fields` refreshes them after a submission
+changes outside of :func:`persist_records`.
+"""
+from typing import Any, Dict, List
+
+from django.db import transaction
+from django.db.models import OuterRef, QuerySet, Subquery
+from django.utils import timezone
+
+from surveys.models import Question
+from .models import Submission, SubmissionAnswer
+from . import rollups
+
+
+def get_ip_from_request(request) -> str | None:
+    if not request:
+        return None
+    # X-Forwarded-For support (take first)
+    xff = request.META.get('HTTP_X_FORWARDED_FOR')
+    if xff:
+        return xff.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR')
+
+
+def get_ua_from_request(request) -> str:
+    if not request:
+        return ''
+    return request.META.get('HTTP_USER_AGENT', '')
+
+
+def build_record(validated_data: Dict[str, Any], request=None, idempotency_key: str | None = None) -> Dict[str, Any]:
+    """Flatten serializer output into the record consumed by :func:`persist_records`.
+
+    ``answers`` is a list of ``(question_id, selected_option_id, text_response)``;
+    ``idempotency_key`` is carried along for the ingest spool.
+    """
+    definition = validated_data['survey_definition']
+    answers: List[tuple] = []
+    for ans in validated_data['answers']:
+        question_id = ans['question_id']
+        question_type = definition.questions[question_id]
+        if question_type == Question.MULTIPLE_CHOICE:
+            for oid in ans['option_ids']:
+                answers.append((question_id, oid, None))
+        elif question_type == Question.SINGLE_CHOICE:
+            answers.append((question_id, ans['option_ids'][0], None))
+        else:
+            answers.append((question_id, None, ans.get('text_response', '')))
+
+    return {
+        'survey_id': definition.id,
+        'company_id': definition.company_id,
+        'survey_token': definition.token,
+        'occurred_at': validated_data.get('occurred_at') or timezone.now(),
+        'latitude': validated_data.get('latitude'),
+        'longitude': validated_data.get('longitude'),
+        'city_id': validated_data.get('city_id'),
+        'state_id': validated_data.get('state_id'),
+        'ip_address': get_ip_from_request(request),
+        'user_agent': get_ua_from_request(request),
+        'answers': answers,
+        'idempotency_key': idempotency_key,
+    }
+
+
+@transaction.atomic
+def persist_records(records: List[Dict[str, Any]]) -> List[Submission]:
+    """Insert ``records`` in one transaction and return the created submissions in order."""
+    submissions = Submission.objects.bulk_create([
+        Submission(
+            survey_id=record['survey_id'],
+            company_id=record['company_id'],
+            survey_token=record['survey_token'],
+            occurred_at=record['occurred_at'],
+            latitude=record['latitude'],
+            longitude=record['longitude'],
+            city_id=record['city_id'],
+            state_id=record['state_id'],
+            ip_address=record['ip_address'],
+            user_agent=record['user_agent'],
+        )
+        for record in records
+    ])
+
+    answers_by_submission: List[tuple[Submission, List[SubmissionAnswer]]] = []
+    all_answers: List[SubmissionAnswer] = []
+    for submission, record in zip(submissions, records):
+        sub_answers = [
+            SubmissionAnswer(
+                submission=submission,
+                question_id=question_id,
+                selected_option_id=option_id,
+                text_response=text_response,
+                survey_id=submission.survey_id,
+                state_id=submission.state_id,
+                city_id=submission.city_id,
+                submitted_at=submission.submitted_at,
+            )
+            for question_id, option_id, text_response in record['answers']
+        ]
+        answers_by_submission.append((submission, sub_answers))
+        all_answers.extend(sub_answers)
+
+    SubmissionAnswer.objects.bulk_create(all_answers, batch_size=1000)
+    rollups.record_submissions(answers_by_submission)
+    return submissions
+
+
+# Fields of SubmissionAnswer copied from its Submission (same names on both)
+DENORMALIZED_FIELDS = ('survey_id', 'state_id', 'city_id', 'submitted_at')
+
+
+def sync_answer_fields(answers_qs: QuerySet) -> int:
+    """Copy survey, state, city and ``submitted_at`` from the submission onto ``answers_qs``.
+
+    One ``UPDATE`` with correlated subqueries; returns the number of answers updated.
+    """
+    submission = Submission.objects.filter(pk=OuterRef('submission_id'))
+    return answers_qs.update(**{
+        field: Subquery(submission.values(field)[:1])
+        for field in DENORMALIZED_FIELDS
+    })
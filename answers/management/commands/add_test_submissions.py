@@ -1,20 +1,27 @@
-import random
-from decimal import Decimal
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from surveys.models import Survey, Question, Option
-from answers.models import Submission, SubmissionAnswer
-from companies.models import Company
+import base64
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from answers import rollups
+from answers.synthetic import SubmissionFactory, bulk_load, load_city_points
+from surveys.models import Survey
 
 
 class Command(BaseCommand):
-    help = 'Add test submissions with Brazilian geographic coordinates'
+    help = 'Add synthetic submissions spread over the real Brazilian cities, or replay them through the API'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--survey-id',
             type=int,
-            help='Survey ID to add submissions to'
+            help='Survey ID to add submissions to (default: most recent survey)'
         )
         parser.add_argument(
             '--count',
@@ -22,125 +29,152 @@ class Command(BaseCommand):
             default=10,
             help='Number of submissions to create (default: 10)'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Submissions written per transaction (default: 5000)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Spread occurred_at over the last N days (default: 30)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed for reproducible data'
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            default=None,
+            help='Force COPY for answers (PostgreSQL only; default when on PostgreSQL)'
+        )
+        parser.add_argument(
+            '--no-copy',
+            dest='copy',
+            action='store_false',
+            help='Use batched INSERTs even on PostgreSQL'
+        )
+        parser.add_argument(
+            '--defer-rollups',
+            action='store_true',
+            help='Skip incremental rollup updates and rebuild the survey rollups once at the end'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            help='Replay submissions through POST /api/v1/answers/submit/ at this many requests per second'
+        )
+        parser.add_argument(
+            '--url',
+            default='http://localhost:8000',
+            help='Base URL for --rate (default: http://localhost:8000)'
+        )
+        parser.add_argument('--username', help='API account username for --rate')
+        parser.add_argument('--password', help='API account password for --rate')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Concurrent HTTP requests for --rate (default: 8)'
+        )
 
     def handle(self, *args, **options):
         survey_id = options.get('survey_id')
         count = options['count']
 
-        # Brazilian cities with their coordinates
-        brazilian_locations = [
-            # Major cities
-            {'name': 'São Paulo', 'lat': -23.5505, 'lng': -46.6333},
-            {'name': 'Rio de Janeiro', 'lat': -22.9068, 'lng': -43.1729},
-            {'name': 'Brasília', 'lat': -15.7801, 'lng': -47.9292},
-            {'name': 'Salvador', 'lat': -12.9714, 'lng': -38.5014},
-            {'name': 'Fortaleza', 'lat': -3.7172, 'lng': -38.5433},
-            {'name': 'Belo Horizonte', 'lat': -19.9167, 'lng': -43.9345},
-            {'name': 'Manaus', 'lat': -3.1190, 'lng': -60.0217},
-            {'name': 'Curitiba', 'lat': -25.4284, 'lng': -49.2733},
-            {'name': 'Recife', 'lat': -8.0476, 'lng': -34.8770},
-            {'name': 'Porto Alegre', 'lat': -30.0346, 'lng': -51.2177},
-            # Additional cities
-            {'name': 'Belém', 'lat': -1.4558, 'lng': -48.4902},
-            {'name': 'Goiânia', 'lat': -16.6869, 'lng': -49.2648},
-            {'name': 'Guarulhos', 'lat': -23.4538, 'lng': -46.5333},
-            {'name': 'Campinas', 'lat': -22.9056, 'lng': -47.0608},
-            {'name': 'São Luís', 'lat': -2.5297, 'lng': -44.3028},
-            {'name': 'Maceió', 'lat': -9.6658, 'lng': -35.7353},
-            {'name': 'Natal', 'lat': -5.7945, 'lng': -35.2110},
-            {'name': 'Campo Grande', 'lat': -20.4697, 'lng': -54.6201},
-            {'name': 'João Pessoa', 'lat': -7.1195, 'lng': -34.8450},
-            {'name': 'Florianópolis', 'lat': -27.5954, 'lng': -48.5480},
-        ]
-
         if survey_id:
             try:
                 survey = Survey.objects.get(id=survey_id)
             except Survey.DoesNotExist:
-                self.stdout.write(self.style.ERROR(f'Survey with ID {survey_id} not found'))
-                return
+                raise CommandError(f'Survey with ID {survey_id} not found')
         else:
             # Get the most recent survey
             survey = Survey.objects.order_by('-created_at').first()
             if not survey:
-                self.stdout.write(self.style.ERROR('No surveys found in the database'))
-                return
+                raise CommandError('No surveys found in the database')
 
-        # Get questions for the survey
-        questions = Question.objects.filter(survey=survey).order_by('id')
-        if not questions:
-            self.stdout.write(self.style.ERROR(f'No questions found for survey {survey.id}'))
-            return
+        if not survey.questions.exists():
+            raise CommandError(f'No questions found for survey {survey.id}')
 
-        # Get or create a test company
-        company = survey.company
+        cities = load_city_points()
+        if not cities:
+            raise CommandError('No cities found. Run load_geographic_data first.')
+        factory = SubmissionFactory(survey, cities, seed=options['seed'], days=options['days'])
 
-        self.stdout.write(f'Adding {count} test submissions to survey "{survey.title}" (ID: {survey.id})')
+        if options['rate']:
+            self._replay(factory, count, options)
+            return
 
-        created_count = 0
-        for i in range(count):
-            # Select a random location and add some variation
-            location = random.choice(brazilian_locations)
-            lat_variation = random.uniform(-0.1, 0.1)  # Small variation around the city
-            lng_variation = random.uniform(-0.1, 0.1)
-            
-            # Create submission
-            submission = Submission.objects.create(
-                survey=survey,
-                company=company,
-                survey_token=survey.token,
-                ip_address=f'192.168.{random.randint(1, 254)}.{random.randint(1, 254)}',
-                latitude=Decimal(str(location['lat'] + lat_variation)),
-                longitude=Decimal(str(location['lng'] + lng_variation)),
-                user_agent='Mozilla/5.0 (Test Bot)',
-                occurred_at=timezone.now()
-            )
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL')
 
-            # Answer questions
-            for question in questions:
-                if question.question_type in (Question.SINGLE_CHOICE, Question.MULTIPLE_CHOICE):
-                    # Get options for this question
-                    options = Option.objects.filter(question=question)
-                    if options:
-                        if question.question_type == Question.SINGLE_CHOICE:
-                            # Select one random option
-                            selected_option = random.choice(options)
-                            SubmissionAnswer.objects.create(
-                                submission=submission,
-                                question=question,
-                                selected_option=selected_option
-                            )
-                        else:
-                            # Select multiple random options
-                            num_selections = random.randint(1, min(3, len(options)))
-                            selected_options = random.sample(list(options), num_selections)
-                            for option in selected_options:
-                                SubmissionAnswer.objects.create(
-                                    submission=submission,
-                                    question=question,
-                                    selected_option=option
-                                )
-                elif question.question_type == Question.SHORT_TEXT:
-                    # Generate random text answer
-                    SubmissionAnswer.objects.create(
-                        submission=submission,
-                        question=question,
-                        text_response=f'Test answer {i+1} from {location["name"]}'
-                    )
-                elif question.question_type == Question.LONG_TEXT:
-                    # Generate random long text answer
-                    SubmissionAnswer.objects.create(
-                        submission=submission,
-                        question=question,
-                        text_response=f'This is a longer test answer {i+1} from {location["name"]}. '
-                                    f'The respondent is located at approximately {location["lat"]:.2f}, {location["lng"]:.2f}.'
-                    )
-
-            created_count += 1
-            self.stdout.write(f'Created submission {created_count}/{count} from {location["name"]}')
+        self.stdout.write(f'Adding {count} test submissions to survey "{survey.title}" (ID: {survey.id})')
+        started = time.perf_counter()
+        created = 0
+        batches = bulk_load(
+            factory, count, options['batch_size'], options['copy'],
+            update_rollups=not options['defer_rollups'],
+        )
+        for created in batches:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'  {created}/{count} submissions ({created / elapsed:.0f}/s)')
+        if options['defer_rollups']:
+            self.stdout.write('Rebuilding option rollups...')
+            rollups.rebuild(survey)
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully created {created_count} test submissions for survey "{survey.title}"'
+                f'Successfully created {created} test submissions for survey "{survey.title}" '
+                f'in {time.perf_counter() - started:.1f}s'
             )
         )
+
+    def _replay(self, factory: SubmissionFactory, count: int, options) -> None:
+        """Send ``count`` submissions to the API at ``--rate`` requests per second."""
+        if not (options['username'] and options['password']):
+            raise CommandError('--rate requires --username and --password of an API account')
+        url = options['url'].rstrip('/') + '/api/v1/answers/submit/'
+        credentials = base64.b64encode(f'{options["username"]}:{options["password"]}'.encode()).decode()
+        headers = {'Content-Type': 'application/json', 'Authorization': f'Basic {credentials}'}
+
+        def send(body: bytes) -> int:
+            request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    return response.status
+            except urllib.error.HTTPError as exc:
+                return exc.code
+            except OSError:
+                return 0
+
+        rate = options['rate']
+        self.stdout.write(f'Replaying {count} submissions to {url} at {rate:g} req/s')
+        statuses: dict[int, int] = {}
+        lock = threading.Lock()
+
+        def collect(future) -> None:
+            code = future.result()
+            with lock:
+                statuses[code] = statuses.get(code, 0) + 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for i in range(count):
+                # Fixed schedule: request i leaves at started + i / rate
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, json.dumps(factory.payload()).encode()).add_done_callback(collect)
+                if (i + 1) % max(int(rate), 1) == 0:
+                    with lock:
+                        completed = sum(statuses.values())
+                    self.stdout.write(f'  sent {i + 1}/{count}, completed {completed}')
+
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{code or "error"}: {n}' for code, n in sorted(statuses.items()))
+        style = self.style.SUCCESS if set(statuses) == {201} else self.style.ERROR
+        self.stdout.write(style(f'Sent {count} submissions in {elapsed:.1f}s ({count / elapsed:.1f}/s) - {summary}'))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from answers.ingest import sync_answer_fields
+from answers.models import Submission, SubmissionAnswer
+
+
+class Command(BaseCommand):
+    help = 'Copy survey, state, city and submitted_at from submissions onto their answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--survey-id',
+            type=int,
+            help='Only backfill answers of this survey'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Submissions whose answers are updated per transaction (default: 2000)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Resync every answer, not only those that were never filled'
+        )
+
+    def handle(self, *args, **options):
+        submissions = Submission.objects.all()
+        if options['survey_id']:
+            submissions = submissions.filter(survey_id=options['survey_id'])
+        answers = SubmissionAnswer.objects.all()
+        if not options['all']:
+            answers = answers.filter(survey__isnull=True)
+
+        started = time.perf_counter()
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                submissions.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += sync_answer_fields(answers.filter(submission_id__in=ids))
+            last_id = ids[-1]
+            self.stdout.write(f'  {updated} answers updated (up to submission {last_id})')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'{updated} answers updated ({elapsed:.1f}s)'))
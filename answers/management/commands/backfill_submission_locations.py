@@ -0,0 +1,92 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from answers import heat, rollups
+from answers.gazetteer import get_gazetteer
+from answers.ingest import sync_answer_fields
+from answers.models import Submission, SubmissionAnswer
+
+
+class Command(BaseCommand):
+    help = 'Fill city/state of submissions that only have coordinates with the nearest municipality'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--survey-id',
+            type=int,
+            help='Only backfill submissions of this survey'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Submissions updated per transaction (default: 2000)'
+        )
+        parser.add_argument(
+            '--max-km',
+            type=float,
+            help='Maximum distance to a municipality seat (default: REVERSE_GEOCODE_MAX_KM)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many submissions would be updated'
+        )
+
+    def handle(self, *args, **options):
+        geo = get_gazetteer()
+        if not len(geo):
+            self.stdout.write(self.style.ERROR('No cities found. Run load_geographic_data first.'))
+            return
+
+        qs = Submission.objects.filter(
+            city__isnull=True, latitude__isnull=False, longitude__isnull=False,
+        )
+        if options['survey_id']:
+            qs = qs.filter(survey_id=options['survey_id'])
+
+        started = time.perf_counter()
+        last_id = 0
+        updated = unresolved = 0
+        while True:
+            rows = list(
+                qs.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'latitude', 'longitude')[:options['batch_size']]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            changes = []
+            for submission_id, latitude, longitude in rows:
+                city = geo.nearest_city(latitude, longitude, options['max_km'])
+                if city is None:
+                    unresolved += 1
+                    continue
+                changes.append(Submission(id=submission_id, city_id=city.id, state_id=city.state_id))
+            updated += len(changes)
+            if options['dry_run'] or not changes:
+                continue
+
+            # Rollups are keyed by location: move the counts along with the submissions
+            with transaction.atomic():
+                batch = Submission.objects.filter(id__in=[s.id for s in changes])
+                rollups.remove_submissions(batch)
+                Submission.objects.bulk_update(changes, ['city', 'state'])
+                sync_answer_fields(SubmissionAnswer.objects.filter(submission__in=batch))
+                rollups.add_submissions(batch)
+            self.stdout.write(f'  {updated} submissions located (up to id {last_id})')
+
+        if updated and not options['dry_run']:
+            # The state/city filtered heat grids changed without new submissions
+            heat.bump_version(options['survey_id'])
+
+        elapsed = time.perf_counter() - started
+        verb = 'would be updated' if options['dry_run'] else 'updated'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{updated} submissions {verb}, {unresolved} too far from any municipality ({elapsed:.1f}s)'
+            )
+        )
@@ -0,0 +1,91 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from answers import rollups
+from answers.distributions import SOURCE_ANSWERS, SOURCE_ROLLUP, compute_distributions
+from answers.models import Submission, SubmissionAnswer
+from companies.models import Company
+from surveys.models import Option, Question, Survey
+
+
+class _Rollback(Exception):
+    """Raised to discard the synthetic benchmark data."""
+
+
+class Command(BaseCommand):
+    help = 'Show that distribution queries stay constant as the number of questions grows (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--questions',
+            type=int,
+            nargs='+',
+            default=[1, 10, 50, 200],
+            help='Question counts to benchmark (default: 1 10 50 200)'
+        )
+        parser.add_argument(
+            '--options',
+            type=int,
+            default=4,
+            help='Options per question (default: 4)'
+        )
+        parser.add_argument(
+            '--submissions',
+            type=int,
+            default=200,
+            help='Submissions per survey (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"questions":>10} {"source":>8} {"queries":>8} {"ms":>10}')
+        try:
+            with transaction.atomic():
+                company = Company.objects.create(name='Benchmark distributions')
+                for n_questions in options['questions']:
+                    survey = self._seed(company, n_questions, options['options'], options['submissions'])
+                    for source in (SOURCE_ROLLUP, SOURCE_ANSWERS):
+                        with CaptureQueriesContext(connection) as ctx:
+                            started = time.perf_counter()
+                            compute_distributions(survey, source=source)
+                            elapsed_ms = (time.perf_counter() - started) * 1000
+                        self.stdout.write(f'{n_questions:>10} {source:>8} {len(ctx.captured_queries):>8} {elapsed_ms:>10.2f}')
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
+
+    def _seed(self, company, n_questions: int, n_options: int, n_submissions: int) -> Survey:
+        survey = Survey.objects.create(company=company, title=f'Benchmark {n_questions} questions')
+        questions = Question.objects.bulk_create([
+            Question(survey=survey, question_text=f'Q{i}', question_type=Question.SINGLE_CHOICE)
+            for i in range(n_questions)
+        ])
+        options_by_question = {}
+        for question in questions:
+            options_by_question[question.id] = Option.objects.bulk_create([
+                Option(question=question, option_text=f'O{j}') for j in range(n_options)
+            ])
+        submissions = Submission.objects.bulk_create([
+            Submission(survey=survey, company=company, survey_token=survey.token)
+            for _ in range(n_submissions)
+        ])
+        SubmissionAnswer.objects.bulk_create(
+            [
+                SubmissionAnswer(
+                    submission=sub,
+                    question=question,
+                    selected_option=random.choice(options_by_question[question.id]),
+                    survey=survey,
+                    submitted_at=sub.submitted_at,
+                )
+                for sub in submissions
+                for question in questions
+            ],
+            batch_size=2000,
+        )
+        rollups.rebuild(survey)
+        return survey
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from answers import heat
+
+
+def legacy_build_heat_grid(points: list[tuple[float, float]], rows: int, cols: int) -> dict:
+    """The former pure-Python ``_build_heat_grid``, kept as the comparison baseline."""
+    if not points:
+        return {'rows': [[{'count': 0, 'color': '#ffffff'} for _ in range(cols)] for _ in range(rows)], 'max': 0}
+
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    min_lat, max_lat = min(lats), max(lats)
+    min_lon, max_lon = min(lons), max(lons)
+
+    if max_lat - min_lat == 0:
+        max_lat += 0.0001
+        min_lat -= 0.0001
+    if max_lon - min_lon == 0:
+        max_lon += 0.0001
+        min_lon -= 0.0001
+
+    grid = [[0 for _ in range(cols)] for _ in range(rows)]
+    for lat, lon in points:
+        r = int((lat - min_lat) / (max_lat - min_lat) * (rows - 1))
+        c = int((lon - min_lon) / (max_lon - min_lon) * (cols - 1))
+        r = max(0, min(rows - 1, r))
+        c = max(0, min(cols - 1, c))
+        grid[r][c] += 1
+
+    max_count = max(max(row) for row in grid)
+
+    def color_for(value: int) -> str:
+        if max_count == 0:
+            return '#ffffff'
+        t = value / max_count
+        g = int(255 * (1.0 - t))
+        return f"#{255:02x}{g:02x}{g:02x}"
+
+    return {
+        'rows': [[{'count': grid[r][c], 'color': color_for(grid[r][c])} for c in range(cols)] for r in range(rows)],
+        'max': max_count,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare the pure-Python and vectorized heat grid builders on random points'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--points',
+            type=int,
+            nargs='+',
+            default=[1000, 100_000, 1_000_000],
+            help='Point counts to measure (default: 1000 100000 1000000)'
+        )
+        parser.add_argument('--rows', type=int, default=50, help='Grid rows (default: 50)')
+        parser.add_argument('--cols', type=int, default=50, help='Grid columns (default: 50)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement, best is reported (default: 5)')
+        parser.add_argument(
+            '--legacy-max',
+            type=int,
+            default=1_000_000,
+            help='Skip the pure-Python builder above this many points (default: 1000000)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        rows, cols, repeat = options['rows'], options['cols'], options['repeat']
+
+        self.stdout.write(f'{"points":>10} {"legacy ms":>12} {"vectorized ms":>14} {"speedup":>9}')
+        for count in options['points']:
+            # Roughly the bounding box of Brazil
+            lats = rng.uniform(-33.75, 5.27, count)
+            lngs = rng.uniform(-73.99, -34.79, count)
+            vectorized_ms, vectorized = self._best(repeat, heat.build_grid, lats, lngs, rows, cols)
+
+            if count > options['legacy_max']:
+                self.stdout.write(f'{count:>10} {"-":>12} {vectorized_ms:>14.2f} {"-":>9}')
+                continue
+            points = list(zip(lats.tolist(), lngs.tolist()))
+            legacy_ms, legacy = self._best(repeat, legacy_build_heat_grid, points, rows, cols)
+            if legacy != vectorized:
+                self.stdout.write(self.style.ERROR(f'Grids differ for {count} points'))
+            self.stdout.write(
+                f'{count:>10} {legacy_ms:>12.2f} {vectorized_ms:>14.2f} {legacy_ms / vectorized_ms:>8.1f}x'
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def _best(self, repeat: int, func, *args) -> tuple[float, dict]:
+        best, result = float('inf'), None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(*args)
+            best = min(best, time.perf_counter() - started)
+        return best * 1000, result
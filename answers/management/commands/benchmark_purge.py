@@ -0,0 +1,96 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from answers import purge, rollups
+from answers.distributions import SOURCE_ANSWERS, SOURCE_ROLLUP, compute_distributions
+from answers.models import Submission
+from answers.synthetic import SubmissionFactory, bulk_load, create_survey, load_city_points
+from companies.models import Company
+
+
+class _Rollback(Exception):
+    """Raised to discard the synthetic benchmark data."""
+
+
+def _collector_delete(ids: list[int]) -> None:
+    """The previous path: rollups, then ``QuerySet.delete()`` through Django's collector."""
+    with transaction.atomic():
+        qs = Submission.objects.filter(id__in=ids)
+        rollups.remove_submissions(qs)
+        qs.delete()
+
+
+def _purge_delete(ids: list[int]) -> None:
+    purge.delete_submissions(ids)
+
+
+class Command(BaseCommand):
+    help = "Compare deleting submissions through Django's collector with answers.purge (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--submissions',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Submissions deleted per run (default: 1000 10000)'
+        )
+        parser.add_argument('--questions', type=int, default=20, help='Questions per survey (default: 20)')
+        parser.add_argument('--options', type=int, default=5, help='Options per choice question (default: 5)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+
+    def handle(self, *args, **options):
+        cities = load_city_points()
+        if not cities:
+            raise CommandError('No cities found. Run load_geographic_data first.')
+
+        self.stdout.write(f'{"submissions":>12} {"method":>10} {"ms":>10} {"queries":>8} {"peak KB":>10}')
+        try:
+            with transaction.atomic():
+                company = Company.objects.create(name='Benchmark purge')
+                survey = create_survey(company, options['questions'], options['options'], title='Benchmark purge')
+                factory = SubmissionFactory(survey, cities, seed=options['seed'])
+                for count in options['submissions']:
+                    for name, delete in (('collector', _collector_delete), ('purge', _purge_delete)):
+                        self._run(survey, factory, count, name, delete)
+                consistent = (
+                    compute_distributions(survey, source=SOURCE_ROLLUP)
+                    == compute_distributions(survey, source=SOURCE_ANSWERS)
+                )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if consistent:
+            self.stdout.write(self.style.SUCCESS('Rollups match the remaining answers; benchmark data rolled back'))
+        else:
+            self.stdout.write(self.style.ERROR('Rollups do not match the remaining answers'))
+
+    def _seed(self, survey, factory, count: int) -> list[int]:
+        last_id = Submission.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for _ in bulk_load(factory, count):
+            pass
+        return list(Submission.objects.filter(survey=survey, id__gt=last_id).values_list('id', flat=True))
+
+    def _run(self, survey, factory, count: int, name: str, delete) -> None:
+        # Timing and memory tracing use separate data, since tracemalloc slows Python down
+        ids = self._seed(survey, factory, count)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            delete(ids)
+            elapsed = time.perf_counter() - started
+
+        ids = self._seed(survey, factory, count)
+        tracemalloc.start()
+        try:
+            delete(ids)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.stdout.write(
+            f'{count:>12} {name:>10} {elapsed * 1000:>10.1f} {len(queries.captured_queries):>8} {peak / 1024:>10.1f}'
+        )
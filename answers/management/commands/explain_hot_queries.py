@@ -0,0 +1,126 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from answers.distributions import SOURCE_ANSWERS, compute_distributions
+from answers.models import Submission
+
+
+# Plan lines that read a whole table (SQLite / PostgreSQL)
+FULL_SCAN = re.compile(r'\bSCAN (?!.*USING (COVERING )?INDEX)|Seq Scan')
+# Session, auth and other bookkeeping queries are not what the views are tuned for
+SKIPPED_TABLES = ('django_session', 'auth_user', 'django_content_type')
+
+
+class _Rollback(Exception):
+    """Raised to discard the temporary user."""
+
+
+class Command(BaseCommand):
+    help = 'Print the EXPLAIN plan of every query the answers views run for a survey'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--survey-id',
+            type=int,
+            help='Survey to explain (default: the one with the most submissions)'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (PostgreSQL only; executes the queries again)'
+        )
+        parser.add_argument(
+            '--sql',
+            action='store_true',
+            help='Print the full SQL of each query instead of its first line'
+        )
+
+    def handle(self, *args, **options):
+        survey_id = options['survey_id'] or self._busiest_survey()
+        sample = (
+            Submission.objects
+            .filter(survey_id=survey_id, city__isnull=False)
+            .values('state_id', 'city_id')
+            .first()
+        ) or {'state_id': None, 'city_id': None}
+
+        requests = [
+            ('submissions_detail', reverse('answers_detail', args=[survey_id]), {}),
+            ('submissions_detail (state + city)', reverse('answers_detail', args=[survey_id]),
+             {'state': sample['state_id'], 'city': sample['city_id']}),
+            ('submissions_detail (date range)', reverse('answers_detail', args=[survey_id]),
+             {'from': '2000-01-01', 'to': '2100-01-01'}),
+            ('survey_dashboard', reverse('answers_dashboard', args=[survey_id]), {}),
+            ('survey_dashboard (state + city)', reverse('answers_dashboard', args=[survey_id]),
+             {'state': sample['state_id'], 'city': sample['city_id']}),
+            ('survey_heat', reverse('answers_heat', args=[survey_id]), {'zoom': 5}),
+            ('get_cities_for_state', reverse('answers_get_cities', args=[survey_id]), {'state_id': sample['state_id']}),
+        ]
+
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                client = Client()
+                client.force_login(User.objects.create_user(username='explain-hot-queries', is_staff=True))
+                for label, path, params in requests:
+                    params = {k: v for k, v in params.items() if v is not None}
+                    with CaptureQueriesContext(connection) as ctx:
+                        response = client.get(path, params)
+                    if response.status_code != 200:
+                        raise CommandError(f'{path} returned {response.status_code}')
+                    self._explain_all(label, [q['sql'] for q in ctx.captured_queries], options)
+
+                with CaptureQueriesContext(connection) as ctx:
+                    compute_distributions(survey_id, sample['state_id'], None, source=SOURCE_ANSWERS)
+                self._explain_all('live distributions (state)', [q['sql'] for q in ctx.captured_queries], options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+
+    def _busiest_survey(self) -> int:
+        row = (
+            Submission.objects
+            .values('survey_id')
+            .annotate(total=Count('id'))
+            .order_by('-total')
+            .first()
+        )
+        if row is None:
+            raise CommandError('No submissions found; pass --survey-id')
+        return row['survey_id']
+
+    def _explain_all(self, label: str, statements: list[str], options) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        seen = set()
+        for sql in statements:
+            if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+                continue
+            if any(f'"{table}"' in sql for table in SKIPPED_TABLES):
+                continue
+            seen.add(sql)
+            self.stdout.write(f'  {sql if options["sql"] else sql[:160]}')
+            for line in self._explain(sql, options['analyze']):
+                style = self.style.WARNING if FULL_SCAN.search(line) else (lambda text: text)
+                self.stdout.write(style(f'    {line}'))
+        self.stdout.write('')
+
+    def _explain(self, sql: str, analyze: bool) -> list[str]:
+        """Plan lines for an already interpolated SQL statement."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN ({"ANALYZE, BUFFERS" if analyze else "COSTS"}) {sql}')
+                return [row[0] for row in cursor.fetchall()]
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}')
+            return [' '.join(str(value) for value in row) for row in cursor.fetchall()]
@@ -0,0 +1,57 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from answers import spool
+from answers.models import IngestReceipt
+
+
+class Command(BaseCommand):
+    help = 'Store the submissions accepted into the local ingest spool (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.INGEST_SPOOL_BATCH_SIZE,
+            help='Submissions stored per transaction (default: INGEST_SPOOL_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, draining the spool every this many seconds (default: drain once and exit)'
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=settings.INGEST_RECEIPT_RETENTION_DAYS,
+            help='Delete receipts older than this many days; 0 keeps them (default: INGEST_RECEIPT_RETENTION_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        # Still drain a spool left behind after the setting was turned off
+        if not settings.INGEST_SPOOL_ENABLED and not settings.INGEST_SPOOL_PATH.exists():
+            self.stdout.write('The ingest spool is disabled (INGEST_SPOOL_ENABLED); nothing to do')
+            return
+        while True:
+            self._flush(options['batch_size'])
+            if options['retention_days'] > 0:
+                cutoff = timezone.now() - timedelta(days=options['retention_days'])
+                IngestReceipt.objects.filter(stored_at__lt=cutoff).delete()
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def _flush(self, batch_size: int) -> None:
+        started = time.perf_counter()
+        stored, failed = spool.flush(batch_size=batch_size)
+        if not (stored or failed):
+            return
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'{stored} spooled submissions stored ({elapsed:.1f}s)'))
+        if failed:
+            self.stdout.write(self.style.ERROR(f'{failed} spooled submissions could not be stored, see their receipts'))
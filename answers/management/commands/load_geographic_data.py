@@ -1,10 +1,19 @@
 import csv
 import os
+import time
+from decimal import Decimal
+
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, transaction
+from django.utils import timezone
+from answers import gazetteer, rollups
 from answers.models import State, City
 
 
+STATE_FIELDS = ['uf', 'name', 'latitude', 'longitude', 'region']
+CITY_FIELDS = ['name', 'latitude', 'longitude', 'is_capital', 'state_id', 'siafi_id', 'area_code', 'timezone']
+
+
 class Command(BaseCommand):
     help = 'Load Brazilian states and cities data from CSV files'
 
@@ -26,11 +35,23 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data before loading'
         )
+        parser.add_argument(
+            '--diff',
+            action='store_true',
+            help='Only write rows that are new or differ from the database'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per executemany batch (default: 1000)'
+        )
 
     def handle(self, *args, **options):
         states_file = options['states_file']
         cities_file = options['cities_file']
         clear_existing = options['clear_existing']
+        self.batch_size = options['batch_size']
 
         if not os.path.exists(states_file):
             self.stdout.write(
@@ -44,69 +65,121 @@ class Command(BaseCommand):
             )
             return
 
+        started = time.perf_counter()
+        state_rows = self._read_states(states_file)
+        city_rows = self._read_cities(cities_file)
+        self._timing('Read CSV files', started)
+
         with transaction.atomic():
             if clear_existing:
                 self.stdout.write('Clearing existing data...')
+                # One pass instead of one per row in the pre_delete signal
+                rollups.detach_locations('city', City.objects.values('pk'))
+                rollups.detach_locations('state', State.objects.values('pk'))
                 City.objects.all().delete()
                 State.objects.all().delete()
 
             # Load states
-            self.stdout.write('Loading states...')
-            states_created = 0
-            with open(states_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    state, created = State.objects.get_or_create(
-                        code=row['codigo_uf'],
-                        defaults={
-                            'uf': row['uf'],
-                            'name': row['nome'],
-                            'latitude': float(row['latitude']),
-                            'longitude': float(row['longitude']),
-                            'region': row['regiao'],
-                        }
-                    )
-                    if created:
-                        states_created += 1
-
+            step = time.perf_counter()
+            created, updated = self._upsert(State, 'code', STATE_FIELDS, state_rows, options['diff'])
             self.stdout.write(
-                self.style.SUCCESS(f'Created {states_created} states')
+                self.style.SUCCESS(f'States: {created} created, {updated} updated, '
+                                   f'{len(state_rows) - created - updated} unchanged')
             )
+            self._timing('States', step)
 
-            # Load cities
-            self.stdout.write('Loading cities...')
-            cities_created = 0
-            with open(cities_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    try:
-                        state = State.objects.get(code=row['codigo_uf'])
-                        city, created = City.objects.get_or_create(
-                            ibge_code=row['codigo_ibge'],
-                            defaults={
-                                'name': row['nome'],
-                                'latitude': float(row['latitude']),
-                                'longitude': float(row['longitude']),
-                                'is_capital': bool(int(row['capital'])),
-                                'state': state,
-                                'siafi_id': row['siafi_id'],
-                                'area_code': row['ddd'],
-                                'timezone': row['fuso_horario'],
-                            }
-                        )
-                        if created:
-                            cities_created += 1
-                    except State.DoesNotExist:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f'State with code {row["codigo_uf"]} not found for city {row["nome"]}'
-                            )
+            # Cities reference states by id; one query maps IBGE state codes to ids
+            step = time.perf_counter()
+            state_ids = dict(State.objects.values_list('code', 'id'))
+            resolved = {}
+            for ibge_code, row in city_rows.items():
+                state_code = row.pop('state_code')
+                if state_code not in state_ids:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f'State with code {state_code} not found for city {row["name"]}'
                         )
+                    )
+                    continue
+                row['state_id'] = state_ids[state_code]
+                resolved[ibge_code] = row
 
+            created, updated = self._upsert(City, 'ibge_code', CITY_FIELDS, resolved, options['diff'])
             self.stdout.write(
-                self.style.SUCCESS(f'Created {cities_created} cities')
+                self.style.SUCCESS(f'Cities: {created} created, {updated} updated, '
+                                   f'{len(resolved) - created - updated} unchanged')
             )
+            self._timing('Cities', step)
 
+        # The loader writes raw SQL, so model signals do not fire
+        gazetteer.bump_version()
+        self._timing('Total', started)
         self.stdout.write(
             self.style.SUCCESS('Geographic data loaded successfully!')
         )
+
+    def _read_states(self, path: str) -> dict[str, dict]:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return {
+                row['codigo_uf']: {
+                    'uf': row['uf'],
+                    'name': row['nome'],
+                    'latitude': Decimal(row['latitude']),
+                    'longitude': Decimal(row['longitude']),
+                    'region': row['regiao'],
+                }
+                for row in csv.DictReader(f)
+            }
+
+    def _read_cities(self, path: str) -> dict[str, dict]:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return {
+                row['codigo_ibge']: {
+                    'name': row['nome'],
+                    'latitude': Decimal(row['latitude']),
+                    'longitude': Decimal(row['longitude']),
+                    'is_capital': bool(int(row['capital'])),
+                    'state_code': row['codigo_uf'],
+                    'siafi_id': row['siafi_id'],
+                    'area_code': row['ddd'],
+                    'timezone': row['fuso_horario'],
+                }
+                for row in csv.DictReader(f)
+            }
+
+    def _upsert(self, model, key: str, fields: list[str], rows: dict[str, dict], diff: bool) -> tuple[int, int]:
+        """Insert or update ``rows`` (keyed by the unique ``key`` field) in bulk.
+
+        Returns ``(created, updated)``. With ``diff`` only new or changed rows
+        are written, so reloading the same files writes nothing.
+        """
+        existing = {
+            values[0]: dict(zip(fields, values[1:]))
+            for values in model.objects.values_list(key, *fields)
+        }
+        if diff:
+            rows = {k: row for k, row in rows.items() if existing.get(k) != row}
+        if not rows:
+            return 0, 0
+
+        # One INSERT ... ON CONFLICT DO UPDATE per batch (SQLite and PostgreSQL),
+        # skipping model instantiation
+        opts = model._meta
+        qn = connection.ops.quote_name
+        columns = [opts.get_field(name).column for name in [key] + fields + ['created_at', 'updated_at']]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        updates = ', '.join(f'{qn(c)} = EXCLUDED.{qn(c)}' for c in columns[1:] if c != 'created_at')
+        sql = (
+            f'INSERT INTO {qn(opts.db_table)} ({", ".join(qn(c) for c in columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))}) '
+            f'ON CONFLICT ({qn(columns[0])}) DO UPDATE SET {updates}'
+        )
+        params = [[k] + [row[name] for name in fields] + [now, now] for k, row in rows.items()]
+        with connection.cursor() as cursor:
+            for start in range(0, len(params), self.batch_size):
+                cursor.executemany(sql, params[start:start + self.batch_size])
+        created = sum(1 for k in rows if k not in existing)
+        return created, len(rows) - created
+
+    def _timing(self, label: str, since: float) -> None:
+        self.stdout.write(f'  {label}: {(time.perf_counter() - since) * 1000:.0f} ms')
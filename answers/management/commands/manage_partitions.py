@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from answers import partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly partitions of submissions/answers and detach expired ones (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rewrite the unpartitioned tables as partitioned ones (one-time, locks both tables)'
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=settings.SUBMISSION_PARTITIONS_AHEAD,
+            help='Months to create ahead of the current one (default: SUBMISSION_PARTITIONS_AHEAD)'
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            default=settings.SUBMISSION_RETENTION_MONTHS,
+            help='Detach partitions older than this many months; 0 keeps everything '
+                 '(default: SUBMISSION_RETENTION_MONTHS)'
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Drop detached partitions instead of moving them to the archive schema'
+        )
+        parser.add_argument(
+            '--archive-schema',
+            default='archive',
+            help='Schema detached partitions are moved to (default: archive)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the SQL without running it'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.SUBMISSION_PARTITIONING:
+            self.stdout.write('Partitioning is disabled (SUBMISSION_PARTITIONING); nothing to do')
+            return
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL')
+
+        dry_run = options['dry_run']
+        log = self.stdout.write if dry_run else (lambda sql: None)
+        current = partitions.month_start(datetime.now())
+        through = partitions.add_months(current, options['ahead'])
+
+        try:
+            if options['convert']:
+                converted = partitions.convert(through, dry_run=dry_run, log=log)
+                for table in converted:
+                    self.stdout.write(self.style.SUCCESS(f'Partitioned {table}'))
+            missing = [
+                m._meta.db_table for m in partitions.PARTITIONED_MODELS
+                if not partitions.is_partitioned(m._meta.db_table)
+            ]
+            if missing and not dry_run:
+                raise CommandError(f'{", ".join(missing)} not partitioned yet; run with --convert first')
+
+            for name in partitions.ensure_partitions(through, dry_run=dry_run, log=log):
+                self.stdout.write(self.style.SUCCESS(f'Created partition {name}'))
+
+            if options['retain_months'] > 0:
+                cutoff = partitions.add_months(current, -options['retain_months'])
+                months = sorted({
+                    month
+                    for m in partitions.PARTITIONED_MODELS
+                    for month in partitions.partitions(m._meta.db_table)
+                    if month < cutoff
+                })
+                for month in months:
+                    detached = partitions.detach_partition(
+                        month, options['drop'], options['archive_schema'], dry_run=dry_run, log=log,
+                    )
+                    verb = 'Dropped' if options['drop'] else f'Archived to {options["archive_schema"]}:'
+                    self.stdout.write(self.style.SUCCESS(f'{verb} {", ".join(detached)}'))
+        except partitions.PartitioningError as exc:
+            raise CommandError(str(exc))
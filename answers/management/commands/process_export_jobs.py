@@ -0,0 +1,157 @@
+import glob
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from answers.exports import filter_submissions, write_export
+from answers.models import ExportJob
+
+
+# Claims of a job whose worker keeps dying (e.g. out of memory) before it fails
+MAX_ATTEMPTS = 3
+
+
+class Command(BaseCommand):
+    help = 'Render pending export jobs to files on disk (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=5,
+            help='Maximum number of jobs to process in this run (default: 5)'
+        )
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=30,
+            help='Re-queue running jobs without progress for this many minutes (default: 30)'
+        )
+        parser.add_argument(
+            '--cleanup-days',
+            type=int,
+            default=7,
+            help='Delete finished export files older than this many days (default: 7, 0 disables)'
+        )
+
+    def handle(self, *args, **options):
+        exports_root = str(settings.EXPORTS_ROOT)
+        os.makedirs(exports_root, exist_ok=True)
+
+        if options['cleanup_days']:
+            self._cleanup(options['cleanup_days'])
+
+        self._recover_stale_jobs(options['stale_minutes'])
+
+        processed_jobs = 0
+        while processed_jobs < options['limit']:
+            job = self._claim_next_job()
+            if job is None:
+                break
+            processed_jobs += 1
+            self._run_job(job, exports_root)
+
+        if processed_jobs:
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed_jobs} export job(s)'))
+
+    def _recover_stale_jobs(self, minutes: int) -> None:
+        """Re-queue running jobs whose worker died, failing them after ``MAX_ATTEMPTS`` claims."""
+        cutoff = timezone.now() - timedelta(minutes=minutes)
+        stale = ExportJob.objects.filter(
+            Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+            status=ExportJob.STATUS_RUNNING,
+        )
+        failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+            status=ExportJob.STATUS_FAILED,
+            error=f'worker stopped responding {MAX_ATTEMPTS} times',
+            finished_at=timezone.now(),
+        )
+        requeued = stale.update(status=ExportJob.STATUS_PENDING)
+        if requeued:
+            self.stdout.write(f'Re-queued {requeued} stalled export job(s)')
+        if failed:
+            self.stdout.write(self.style.ERROR(f'{failed} stalled export job(s) failed after {MAX_ATTEMPTS} attempts'))
+
+    def _claim_next_job(self) -> ExportJob | None:
+        """Atomically move the oldest pending job to running so concurrent workers never share one."""
+        while True:
+            job = (
+                ExportJob.objects
+                .filter(status=ExportJob.STATUS_PENDING)
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            now = timezone.now()
+            claimed = ExportJob.objects.filter(pk=job.pk, status=ExportJob.STATUS_PENDING).update(
+                status=ExportJob.STATUS_RUNNING,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+
+    def _run_job(self, job: ExportJob, exports_root: str) -> None:
+        started = time.monotonic()
+        path = os.path.join(exports_root, job.filename)
+        # One file per claim: a worker taken for dead may still be writing an
+        # earlier attempt, and dropping its file makes its final rename fail
+        tmp_path = f'{path}.{job.attempts}.part'
+        for stale_path in glob.glob(glob.escape(path) + '.*.part'):
+            if stale_path != tmp_path:
+                os.remove(stale_path)
+        # Only the worker holding the current claim may update the job
+        claim = ExportJob.objects.filter(pk=job.pk, status=ExportJob.STATUS_RUNNING, attempts=job.attempts)
+        self.stdout.write(f'Export {job.pk}: {job.kind}/{job.export_format} for survey {job.survey_id}')
+
+        try:
+            total = filter_submissions(job.survey, job.filters or {}).count()
+            claim.update(total=total)
+
+            def on_progress(done: int) -> None:
+                claim.update(processed=done, heartbeat_at=timezone.now())
+
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+                write_export(job, out, on_progress=on_progress)
+            if not claim.exists():
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                self.stdout.write(self.style.WARNING(f'Export {job.pk} was re-queued meanwhile; discarded'))
+                return
+            os.replace(tmp_path, path)
+        except Exception as exc:  # noqa: BLE001 - any failure must be recorded on the job
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            claim.update(
+                status=ExportJob.STATUS_FAILED,
+                error=str(exc),
+                finished_at=timezone.now(),
+            )
+            self.stdout.write(self.style.ERROR(f'Export {job.pk} failed: {exc}'))
+            return
+
+        claim.update(
+            status=ExportJob.STATUS_DONE,
+            file_path=path,
+            file_size=os.path.getsize(path),
+            finished_at=timezone.now(),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Export {job.pk} done in {time.monotonic() - started:.1f}s: {path}')
+        )
+
+    def _cleanup(self, days: int) -> None:
+        cutoff = timezone.now() - timedelta(days=days)
+        old_jobs = ExportJob.objects.filter(finished_at__lt=cutoff)
+        for job in old_jobs:
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+        old_jobs.delete()
@@ -0,0 +1,116 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from answers.exports import filter_submissions
+from answers.models import PurgeJob
+from answers.purge import purge_submissions
+
+
+# Claims of a job whose worker keeps dying (e.g. out of memory) before it fails
+MAX_ATTEMPTS = 3
+
+
+class Command(BaseCommand):
+    help = 'Delete the submissions of pending purge jobs (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=5,
+            help='Maximum number of jobs to process in this run (default: 5)'
+        )
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=30,
+            help='Re-queue running jobs without progress for this many minutes (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        self._recover_stale_jobs(options['stale_minutes'])
+
+        processed_jobs = 0
+        while processed_jobs < options['limit']:
+            job = self._claim_next_job()
+            if job is None:
+                break
+            processed_jobs += 1
+            self._run_job(job)
+
+        if processed_jobs:
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed_jobs} purge job(s)'))
+
+    def _recover_stale_jobs(self, minutes: int) -> None:
+        """Re-queue running jobs whose worker died, failing them after ``MAX_ATTEMPTS`` claims."""
+        cutoff = timezone.now() - timedelta(minutes=minutes)
+        stale = PurgeJob.objects.filter(
+            Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+            status=PurgeJob.STATUS_RUNNING,
+        )
+        failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+            status=PurgeJob.STATUS_FAILED,
+            error=f'worker stopped responding {MAX_ATTEMPTS} times',
+            finished_at=timezone.now(),
+        )
+        requeued = stale.update(status=PurgeJob.STATUS_PENDING)
+        if requeued:
+            self.stdout.write(f'Re-queued {requeued} stalled purge job(s)')
+        if failed:
+            self.stdout.write(self.style.ERROR(f'{failed} stalled purge job(s) failed after {MAX_ATTEMPTS} attempts'))
+
+    def _claim_next_job(self) -> PurgeJob | None:
+        """Atomically move the oldest pending job to running so concurrent workers never share one."""
+        while True:
+            job = (
+                PurgeJob.objects
+                .filter(status=PurgeJob.STATUS_PENDING)
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            now = timezone.now()
+            claimed = PurgeJob.objects.filter(pk=job.pk, status=PurgeJob.STATUS_PENDING).update(
+                status=PurgeJob.STATUS_RUNNING,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+
+    def _run_job(self, job: PurgeJob) -> None:
+        started = time.monotonic()
+        self.stdout.write(f'Purge {job.pk}: survey {job.survey_id} {job.filters or "(all submissions)"}')
+
+        try:
+            total = filter_submissions(job.survey, job.filters or {}).count()
+            PurgeJob.objects.filter(pk=job.pk).update(total=total)
+
+            def on_progress(done: int) -> None:
+                PurgeJob.objects.filter(pk=job.pk).update(processed=done, heartbeat_at=timezone.now())
+
+            deleted = purge_submissions(job.survey, job.filters or {}, on_progress=on_progress)
+        except Exception as exc:  # noqa: BLE001 - any failure must be recorded on the job
+            PurgeJob.objects.filter(pk=job.pk).update(
+                status=PurgeJob.STATUS_FAILED,
+                error=str(exc),
+                finished_at=timezone.now(),
+            )
+            self.stdout.write(self.style.ERROR(f'Purge {job.pk} failed: {exc}'))
+            return
+
+        PurgeJob.objects.filter(pk=job.pk).update(
+            status=PurgeJob.STATUS_DONE,
+            processed=deleted,
+            finished_at=timezone.now(),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Purge {job.pk} done in {time.monotonic() - started:.1f}s: {deleted} submissions deleted')
+        )
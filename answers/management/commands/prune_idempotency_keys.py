@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from answers.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete stored idempotency keys older than the retention period (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.IDEMPOTENCY_KEY_RETENTION_DAYS,
+            help='Keep keys of the last this many days (default: IDEMPOTENCY_KEY_RETENTION_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} idempotency keys deleted'))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from answers.exports import filter_submissions
+from answers.purge import PURGE_CHUNK_SIZE, purge_submissions
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = 'Delete all submissions of a survey, optionally limited to a date range, state or city'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey-id', type=int, required=True, help='Survey whose submissions are deleted')
+        parser.add_argument('--from', dest='date_from', help='First day to delete (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last day to delete (YYYY-MM-DD)')
+        parser.add_argument('--state', type=int, help='Only submissions of this state id')
+        parser.add_argument('--city', type=int, help='Only submissions of this city id')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=PURGE_CHUNK_SIZE,
+            help=f'Submissions deleted per transaction (default: {PURGE_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many submissions would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            survey = Survey.objects.get(id=options['survey_id'])
+        except Survey.DoesNotExist:
+            raise CommandError(f'Survey {options["survey_id"]} not found')
+
+        filters = {
+            key: options[name]
+            for key, name in (('from', 'date_from'), ('to', 'date_to'), ('state', 'state'), ('city', 'city'))
+            if options[name]
+        }
+        total = filter_submissions(survey, filters).count()
+        if options['dry_run']:
+            self.stdout.write(f'{total} submissions would be deleted')
+            return
+
+        started = time.perf_counter()
+
+        def on_progress(done: int) -> None:
+            self.stdout.write(f'  {done}/{total} submissions deleted')
+
+        deleted = purge_submissions(survey, filters, options['chunk_size'], on_progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'{deleted} submissions deleted ({elapsed:.1f}s)'))
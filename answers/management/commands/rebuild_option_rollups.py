@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from answers import rollups
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-aggregated option counts used by the survey dashboards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--survey-id',
+            type=int,
+            help='Only rebuild this survey (default: all surveys)'
+        )
+
+    def handle(self, *args, **options):
+        survey_id = options.get('survey_id')
+        survey = None
+        if survey_id:
+            try:
+                survey = Survey.objects.get(id=survey_id)
+            except Survey.DoesNotExist:
+                self.stdout.write(self.style.ERROR(f'Survey with ID {survey_id} not found'))
+                return
+
+        written = rollups.rebuild(survey)
+        target = f'survey "{survey.title}"' if survey else 'all surveys'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} rollup rows for {target}'))
@@ -0,0 +1,122 @@
+import base64
+import json
+import secrets
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from answers.benchmarks import SCENARIOS, Context, measure
+from answers.synthetic import SubmissionFactory, create_survey, generate_submissions, load_city_points
+from companies.models import Company, CompanyAPIAccount
+from companies.usage import usage_tracker
+
+
+class _Rollback(Exception):
+    """Raised to discard the synthetic benchmark data."""
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic dataset and report p50/p95 latency, queries and peak memory per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=1, help='Companies to seed (default: 1)')
+        parser.add_argument('--surveys', type=int, default=1, help='Surveys per company (default: 1)')
+        parser.add_argument('--questions', type=int, default=20, help='Questions per survey (default: 20)')
+        parser.add_argument('--options', type=int, default=5, help='Options per choice question (default: 5)')
+        parser.add_argument('--submissions', type=int, default=10000, help='Submissions per survey (default: 10000)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Submissions inserted per batch (default: 1000)')
+        parser.add_argument('--iterations', type=int, default=20, help='Measured runs per scenario (default: 20)')
+        parser.add_argument('--warmup', type=int, default=1, help='Unmeasured runs per scenario (default: 1)')
+        parser.add_argument('--bulk-size', type=int, default=100, help='Items per bulk submit request (default: 100)')
+        parser.add_argument(
+            '--scenario',
+            nargs='+',
+            choices=[s.name for s in SCENARIOS],
+            help='Scenarios to run (default: all)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of rolling it back'
+        )
+
+    def handle(self, *args, **options):
+        cities = load_city_points()
+        if not cities:
+            raise CommandError('No cities found. Run load_geographic_data first.')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        if options['warmup'] < 0:
+            raise CommandError('--warmup cannot be negative')
+        scenarios = [s for s in SCENARIOS if not options['scenario'] or s.name in options['scenario']]
+
+        setup_test_environment()
+        try:
+            # Write API usage synchronously (API_USAGE_FLUSH_INTERVAL=0), inside the
+            # transaction that is rolled back, instead of from the flush thread
+            with mock.patch.object(usage_tracker, 'interval', 0), transaction.atomic():
+                ctx = self._seed(cities, options)
+                summaries = [
+                    measure(scenario, ctx, options['iterations'], options['warmup']).summary()
+                    for scenario in scenarios
+                ]
+                if not options['keep']:
+                    raise _Rollback
+        except _Rollback:
+            self.stdout.write('Benchmark data rolled back')
+        finally:
+            teardown_test_environment()
+
+        self._report(summaries)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(summaries, fh, indent=2)
+            self.stdout.write(f'Results written to {options["json_path"]}')
+
+    def _seed(self, cities, options) -> Context:
+        primary = None
+        for c in range(options['companies']):
+            company = Company.objects.create(
+                name=f'Benchmark company {c + 1}', company_type=Company.CLIENT, is_active=True,
+            )
+            for s in range(options['surveys']):
+                survey = create_survey(
+                    company, options['questions'], options['options'],
+                    title=f'Benchmark survey {c + 1}.{s + 1}',
+                )
+                factory = SubmissionFactory(survey, cities, seed=options['seed'] + c * 1000 + s)
+                for created in generate_submissions(factory, options['submissions'], options['batch_size']):
+                    if created % 100_000 == 0 or created == options['submissions']:
+                        self.stdout.write(f'  {survey.title}: {created}/{options["submissions"]} submissions')
+                if primary is None:
+                    primary = (company, survey, factory)
+
+        company, survey, factory = primary
+        password = secrets.token_urlsafe(16)
+        account = CompanyAPIAccount.objects.create(
+            company=company,
+            username=f'benchmark-{secrets.token_hex(4)}',
+            password=make_password(password),
+        )
+        credentials = base64.b64encode(f'{account.username}:{password}'.encode()).decode()
+        api = Client(HTTP_AUTHORIZATION=f'Basic {credentials}')
+
+        browser = Client()
+        browser.force_login(User.objects.create_user(username=f'benchmark-{secrets.token_hex(4)}', is_staff=True))
+        return Context(survey=survey, factory=factory, api=api, browser=browser, bulk_size=options['bulk_size'])
+
+    def _report(self, summaries) -> None:
+        self.stdout.write(f'{"scenario":<32} {"runs":>5} {"p50 ms":>10} {"p95 ms":>10} {"queries":>8} {"peak KB":>10}')
+        for row in summaries:
+            self.stdout.write(
+                f'{row["scenario"]:<32} {row["runs"]:>5} {row["p50_ms"]:>10.2f} {row["p95_ms"]:>10.2f} '
+                f'{row["queries"]:>8} {row["peak_kb"]:>10.1f}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'{len(summaries)} scenario(s) measured'))
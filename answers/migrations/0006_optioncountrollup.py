@@ -0,0 +1,61 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    SubmissionAnswer = apps.get_model('answers', 'SubmissionAnswer')
+    OptionCountRollup = apps.get_model('answers', 'OptionCountRollup')
+    rows = (
+        SubmissionAnswer.objects
+        .filter(selected_option__isnull=False)
+        .annotate(day=TruncDate('submission__submitted_at'))
+        .values_list(
+            'submission__survey_id', 'question_id', 'selected_option_id',
+            'submission__state_id', 'submission__city_id', 'day',
+        )
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    OptionCountRollup.objects.bulk_create(
+        (
+            OptionCountRollup(
+                survey_id=survey_id, question_id=question_id, option_id=option_id,
+                state_id=state_id, city_id=city_id, day=day, total=total,
+            )
+            for survey_id, question_id, option_id, state_id, city_id, day, total in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('answers', '0005_exportjob'),
+        ('surveys', '0005_alter_option_option_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptionCountRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('total', models.BigIntegerField(default=0)),
+                ('city', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='answers.city')),
+                ('option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='surveys.option')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='option_rollups', to='surveys.question')),
+                ('state', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='answers.state')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='option_rollups', to='surveys.survey')),
+            ],
+            options={
+                'db_table': 'answers_option_count_rollup',
+                'indexes': [models.Index(fields=['survey', 'state', 'city'], name='answers_rollup_filter_idx'), models.Index(fields=['option', 'state', 'city', 'day'], name='answers_rollup_key_idx')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
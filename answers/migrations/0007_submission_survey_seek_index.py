@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('answers', '0006_optioncountrollup'),
+        ('companies', '0011_companyapiaccount_request_count'),
+        ('surveys', '0005_alter_option_option_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['survey', 'submitted_at', 'id'], name='answers_sub_survey_seek_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('answers', '0007_submission_survey_seek_index'),
+        ('companies', '0011_companyapiaccount_request_count'),
+        ('surveys', '0005_alter_option_option_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['survey', 'state', 'city'], name='answers_sub_survey_geo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissionanswer',
+            index=models.Index(condition=models.Q(('selected_option__isnull', False)), fields=['question', 'selected_option', 'submission'], name='answers_ans_option_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('answers', '0008_submission_query_indexes'),
+        ('surveys', '0005_alter_option_option_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissionanswer',
+            name='city',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='answers.city'),
+        ),
+        migrations.AddField(
+            model_name='submissionanswer',
+            name='state',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='answers.state'),
+        ),
+        migrations.AddField(
+            model_name='submissionanswer',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='submissionanswer',
+            name='survey',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='surveys.survey'),
+        ),
+        migrations.AddIndex(
+            model_name='submissionanswer',
+            index=models.Index(condition=models.Q(('selected_option__isnull', False)), fields=['survey', 'state', 'city', 'question', 'selected_option'], name='answers_ans_survey_geo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissionanswer',
+            index=models.Index(fields=['survey', 'submitted_at'], name='answers_ans_survey_day_idx'),
+        ),
+    ]
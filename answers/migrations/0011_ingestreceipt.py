@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('answers', '0010_purgejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('receipt', models.CharField(max_length=32, unique=True)),
+                ('company_id', models.BigIntegerField(db_index=True)),
+                ('submission_id', models.BigIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('accepted_at', models.DateTimeField()),
+                ('stored_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'answers_ingest_receipt',
+            },
+        ),
+    ]
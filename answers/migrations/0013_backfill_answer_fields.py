@@ -0,0 +1,47 @@
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Subquery
+
+
+BATCH_SIZE = 2000
+
+DENORMALIZED_FIELDS = ('survey_id', 'state_id', 'city_id', 'submitted_at')
+
+
+def backfill_answer_fields(apps, schema_editor):
+    """Copy survey, state, city and submitted_at onto answers stored before 0009.
+
+    Rollup maintenance and distributions read only these copies, so they must
+    be filled before the app serves traffic. Batched by submission, one
+    transaction per batch; answers already filled are skipped.
+    """
+    Submission = apps.get_model('answers', 'Submission')
+    SubmissionAnswer = apps.get_model('answers', 'SubmissionAnswer')
+    submission = Submission.objects.filter(pk=OuterRef('submission_id'))
+    pending = SubmissionAnswer.objects.filter(survey__isnull=True)
+    last_id = 0
+    while True:
+        ids = list(
+            pending.filter(submission_id__gt=last_id).order_by('submission_id')
+            .values_list('submission_id', flat=True).distinct()[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            pending.filter(submission_id__in=ids).update(**{
+                field: Subquery(submission.values(field)[:1])
+                for field in DENORMALIZED_FIELDS
+            })
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own instead of one transaction over every answer
+    atomic = False
+
+    dependencies = [
+        ('answers', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_answer_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 06:14
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    """Fold rows sharing a key, which concurrent first inserts could create, into one."""
+    OptionCountRollup = apps.get_model('answers', 'OptionCountRollup')
+    duplicates = (
+        OptionCountRollup.objects
+        .values('option_id', 'state_id', 'city_id', 'day')
+        .annotate(rows=Count('id'), keep=Min('id'), key_total=Sum('total'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in list(duplicates):
+        OptionCountRollup.objects.filter(pk=row['keep']).update(total=row['key_total'])
+        OptionCountRollup.objects.filter(
+            option_id=row['option_id'], state_id=row['state_id'], city_id=row['city_id'], day=row['day'],
+        ).exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('answers', '0013_backfill_answer_fields'),
+        ('surveys', '0005_alter_option_option_type_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='optioncountrollup',
+            name='answers_rollup_key_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='optioncountrollup',
+            constraint=models.UniqueConstraint(models.F('option'), django.db.models.functions.comparison.Coalesce('state', 0), django.db.models.functions.comparison.Coalesce('city', 0), models.F('day'), name='answers_rollup_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('answers', '0015_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='submission_id',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from companies.models import Company
@@ -80,6 +82,11 @@ class Submission(models.Model):
         indexes = [
             models.Index(fields=['city']),
             models.Index(fields=['state']),
+            # Keyset pagination of a survey's submissions (answers.pagination);
+            # also serves survey + date range filters and ordering by submitted_at
+            models.Index(fields=['survey', 'submitted_at', 'id'], name='answers_sub_survey_seek_idx'),
+            # Dashboard/detail state and city filters and their dropdowns
+            models.Index(fields=['survey', 'state', 'city'], name='answers_sub_survey_geo_idx'),
         ]
 
     def __str__(self) -> str:  # type: ignore[override]
@@ -99,12 +106,39 @@ class SubmissionAnswer(models.Model):
     selected_option = models.ForeignKey(Option, null=True, blank=True, on_delete=models.CASCADE)
     text_response = models.TextField(null=True, blank=True)
 
+    # Copied from the submission so analytics filter and group answers without
+    # joining answers_submission (see answers.ingest.sync_answer_fields)
+    survey = models.ForeignKey(
+        Survey, on_delete=models.CASCADE, null=True, blank=True, editable=False, db_index=False, related_name='+',
+    )
+    state = models.ForeignKey(
+        State, on_delete=models.SET_NULL, null=True, blank=True, editable=False, db_index=False, related_name='+',
+    )
+    city = models.ForeignKey(
+        City, on_delete=models.SET_NULL, null=True, blank=True, editable=False, db_index=False, related_name='+',
+    )
+    submitted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'answers_submission_answer'
         indexes = [
             models.Index(fields=['submission', 'question']),
+            # Distributions per survey, optionally by state/city, from the index alone
+            models.Index(
+                fields=['survey', 'state', 'city', 'question', 'selected_option'],
+                condition=models.Q(selected_option__isnull=False),
+                name='answers_ans_survey_geo_idx',
+            ),
+            models.Index(fields=['survey', 'submitted_at'], name='answers_ans_survey_day_idx'),
+            # Live option distributions: per question, grouped by option, joined
+            # to the submission for the state/city filters without a table lookup
+            models.Index(
+                fields=['question', 'selected_option', 'submission'],
+                condition=models.Q(selected_option__isnull=False),
+                name='answers_ans_option_idx',
+            ),
         ]
 
     def __str__(self) -> str:  # type: ignore[override]
@@ -113,3 +147,210 @@ class SubmissionAnswer(models.Model):
         return f"Answer text (Q{self.question_id})"
 
 
+
+
+class OptionCountRollup(models.Model):
+    """Pre-aggregated number of times an option was selected.
+
+    One row per (survey, question, option, state, city, day), kept current by
+    ``answers.rollups`` when submissions are created or deleted. The option
+    implies the survey and question, so the unique key is (option, state, city,
+    day), with a missing state or city counted as a value of its own.
+    """
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='option_rollups')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='option_rollups')
+    option = models.ForeignKey(Option, on_delete=models.CASCADE, related_name='rollups')
+    state = models.ForeignKey(State, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    city = models.ForeignKey(City, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    day = models.DateField()
+    total = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'answers_option_count_rollup'
+        indexes = [
+            models.Index(fields=['survey', 'state', 'city'], name='answers_rollup_filter_idx'),
+        ]
+        constraints = [
+            # apply_deltas upserts against this key (see rollups._CONFLICT_TARGET)
+            models.UniqueConstraint(
+                F('option'), Coalesce('state', 0), Coalesce('city', 0), F('day'),
+                name='answers_rollup_key_uniq',
+            ),
+        ]
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"Rollup opt#{self.option_id} (Q{self.question_id}) {self.day}: {self.total}"
+
+
+class ExportJob(models.Model):
+    """Survey export rendered to a file on disk by the ``process_export_jobs`` worker."""
+
+    KIND_DASHBOARD = 'dashboard'
+    KIND_DETAIL = 'detail'
+    KIND_CHOICES = [
+        (KIND_DASHBOARD, 'Dashboard (uma linha por submissão)'),
+        (KIND_DETAIL, 'Detalhes (uma linha por resposta)'),
+    ]
+
+    FORMAT_CSV = 'csv'
+    FORMAT_JSON = 'json'
+    FORMAT_CHOICES = [
+        (FORMAT_CSV, 'CSV'),
+        (FORMAT_JSON, 'JSON'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Na fila'),
+        (STATUS_RUNNING, 'Processando'),
+        (STATUS_DONE, 'Concluído'),
+        (STATUS_FAILED, 'Falhou'),
+    ]
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='export_jobs')
+    requested_by = models.ForeignKey(
+        'auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs'
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_DASHBOARD)
+    export_format = models.CharField(max_length=8, choices=FORMAT_CHOICES, default=FORMAT_CSV)
+    # Same keys as the view query string: state, city, from, to
+    filters = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    file_size = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched on claim and on every progress update; a running job that stops
+    # beating belonged to a worker that died and is re-queued
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        db_table = 'answers_export_job'
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"Export {self.pk} ({self.kind}/{self.export_format}) for survey {self.survey_id} - {self.status}"
+
+    @property
+    def progress(self) -> int:
+        """Progress in percent (0-100)."""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.processed * 100 / self.total))
+
+    @property
+    def filename(self) -> str:
+        return f"{self.kind}_{self.survey_id}_{self.pk}.{self.export_format}"
+
+
+class PurgeJob(models.Model):
+    """Deletion of every submission matching a set of filters, run by the ``process_purge_jobs`` worker."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Na fila'),
+        (STATUS_RUNNING, 'Processando'),
+        (STATUS_DONE, 'Concluído'),
+        (STATUS_FAILED, 'Falhou'),
+    ]
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='purge_jobs')
+    requested_by = models.ForeignKey(
+        'auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='purge_jobs'
+    )
+    # Same keys as the view query string: state, city, from, to (empty = whole survey)
+    filters = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched on claim and on every progress update; a running job that stops
+    # beating belonged to a worker that died and is re-queued
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        db_table = 'answers_purge_job'
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"Purge {self.pk} for survey {self.survey_id} - {self.status}"
+
+    @property
+    def progress(self) -> int:
+        """Progress in percent (0-100)."""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.processed * 100 / self.total))
+
+
+class IngestReceipt(models.Model):
+    """Outcome of a submission accepted through the ingest spool (``answers.spool``).
+
+    Written in the same transaction as the submissions it receipts, so the
+    flusher can tell after a crash which spooled records were already stored.
+    """
+
+    receipt = models.CharField(max_length=32, unique=True)
+    # Plain ids: a receipt must be storable even if its company or submission is
+    # gone, and purges delete submissions with raw SQL
+    company_id = models.BigIntegerField(db_index=True)
+    submission_id = models.BigIntegerField(null=True, blank=True)
+    # Set instead of submission_id when the record could not be stored
+    error = models.TextField(blank=True)
+    accepted_at = models.DateTimeField()
+    stored_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'answers_ingest_receipt'
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"Receipt {self.receipt} -> {self.submission_id or 'failed'}"
+
+
+class IdempotencyKey(models.Model):
+    """First response to a submit sent with an idempotency key (``answers.idempotency``).
+
+    Kept apart from ``Submission`` because partitioned tables only allow unique
+    indexes that include the partition key.
+    """
+
+    company_id = models.BigIntegerField()
+    key = models.CharField(max_length=64)
+    # Indexed for answers.purge, which drops the keys of deleted submissions
+    submission_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'answers_idempotency_key'
+        constraints = [
+            models.UniqueConstraint(fields=['company_id', 'key'], name='answers_idem_company_key_uniq'),
+        ]
+
+    def __str__(self) -> str:  # type: ignore[override]
+        return f"Idempotency key {self.key} (company {self.company_id})"
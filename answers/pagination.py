@@ -0,0 +1,168 @@
+"""Keyset (seek) pagination for large submission lists.
+
+``Paginator`` pages with ``OFFSET``, so page N reads and discards every row
+before it, and it needs a ``COUNT(*)`` of the whole filtered set to number
+the pages. :class:`KeysetPaginator` instead remembers the ``(submitted_at,
+id)`` of the first and last rows of a page in opaque cursors and asks for the
+rows just after (or before) that key, which the ``(survey, submitted_at, id)``
+index answers in the same time on every page.
+
+Totals come from :func:`estimate_count`: the planner's row estimate on
+PostgreSQL for large sets, otherwise a count that stops at
+``PAGINATION_COUNT_CAP``.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+def parse_page_size(value: str | None, default: int = 15, maximum: int = 100) -> int:
+    """``page_size`` query param clamped to ``1..maximum``; ``default`` when missing or not a number."""
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, maximum))
+
+
+def encode_cursor(direction: str, submitted_at: datetime, pk: int) -> str:
+    payload = json.dumps([direction, submitted_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str | None) -> tuple[str, datetime, int] | None:
+    """``(direction, submitted_at, id)`` from a cursor, or ``None`` when missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, submitted_at, pk = json.loads(raw)
+        if direction not in ('next', 'prev'):
+            return None
+        return direction, datetime.fromisoformat(submitted_at), int(pk)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def estimate_count(queryset: QuerySet, cap: int | None = None) -> tuple[int, bool]:
+    """Number of rows in ``queryset`` without a full ``COUNT(*)``.
+
+    Returns ``(count, exact)``. On PostgreSQL an estimate above ``cap`` from
+    the planner is returned as is; otherwise rows are counted up to ``cap``
+    (``exact`` is ``False`` when the cap was reached).
+    """
+    if cap is None:
+        cap = settings.PAGINATION_COUNT_CAP
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate > cap:
+            return estimate, False
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count <= cap
+
+
+class KeysetPage:
+    """One page of a :class:`KeysetPaginator`, newest first."""
+
+    def __init__(self, object_list: list, paginator: 'KeysetPaginator', has_next: bool, has_previous: bool):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self) -> str | None:
+        if not self.has_next or not self.object_list:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor('next', last.submitted_at, last.pk)
+
+    @property
+    def previous_cursor(self) -> str | None:
+        if not self.has_previous or not self.object_list:
+            return None
+        first = self.object_list[0]
+        return encode_cursor('prev', first.submitted_at, first.pk)
+
+
+class KeysetPaginator:
+    """Page ``queryset`` by ``(submitted_at, id)``, newest first.
+
+    ``get_page(cursor)`` returns the first page for a missing or invalid
+    cursor. The ``count`` is estimated (see :func:`estimate_count`) and only
+    computed when accessed.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int):
+        self.queryset = queryset.order_by()
+        self.per_page = per_page
+
+    @cached_property
+    def estimated_count(self) -> tuple[int, bool]:
+        return estimate_count(self.queryset)
+
+    @property
+    def count(self) -> int:
+        return self.estimated_count[0]
+
+    @property
+    def count_is_exact(self) -> bool:
+        return self.estimated_count[1]
+
+    def get_page(self, cursor: str | None) -> KeysetPage:
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            rows = list(self.queryset.order_by('-submitted_at', '-id')[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, False)
+
+        direction, submitted_at, pk = decoded
+        if direction == 'next':
+            after = Q(submitted_at__lt=submitted_at) | Q(submitted_at=submitted_at, id__lt=pk)
+            rows = list(self.queryset.filter(after).order_by('-submitted_at', '-id')[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, len(rows) > self.per_page, True)
+
+        before = Q(submitted_at__gt=submitted_at) | Q(submitted_at=submitted_at, id__gt=pk)
+        rows = list(self.queryset.filter(before).order_by('submitted_at', 'id')[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not rows:
+            # Everything newer was deleted: start over
+            return self.get_page(None)
+        return KeysetPage(rows, self, True, has_previous)
+
+
+class EstimatedCountPaginator(Paginator):
+    """``Paginator`` whose total comes from :func:`estimate_count`.
+
+    For the admin changelists, which page with ``OFFSET`` but otherwise
+    run an exact ``COUNT(*)`` over the filtered rows on every request. Where
+    there is no planner estimate, a capped count falls back to an exact one
+    so that every page stays reachable.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        count, exact = estimate_count(self.object_list)
+        if exact or connections[self.object_list.db].vendor == 'postgresql':
+            return count
+        return self.object_list.count()
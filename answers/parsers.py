@@ -0,0 +1,158 @@
+"""Request body parsers for the answers API.
+
+Besides JSON, the submit endpoints read MessagePack and (with the optional
+``cbor2`` package) CBOR bodies, selected by ``Content-Type``. Any of them may
+be compressed (``Content-Encoding: gzip``, or ``zstd`` when the optional
+``zstandard`` package is installed) through
+:class:`DecompressingParserMixin`. Bodies are decompressed while they are
+parsed and rejected with ``413`` once they exceed
+``API_MAX_DECOMPRESSED_BODY_SIZE``, so a small compressed upload cannot expand
+into an unbounded amount of memory or parsing work.
+"""
+import gzip
+import io
+import json
+import zlib
+
+import msgpack
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd bodies are answered with 415 without it
+    zstandard = None
+
+try:
+    import cbor2
+except ImportError:  # optional: CBOR is only offered when installed
+    cbor2 = None
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request body too large.'
+    default_code = 'payload_too_large'
+
+
+_DECODE_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def supported_encodings() -> list[str]:
+    return ['gzip', 'zstd'] if zstandard else ['gzip']
+
+
+class _BoundedStream(io.RawIOBase):
+    """Decoded request body that raises :class:`PayloadTooLarge` past ``limit`` bytes."""
+
+    def __init__(self, reader, encoding: str, limit: int):
+        self._reader = reader
+        self._encoding = encoding
+        self._limit = limit
+        self._total = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            data = self._reader.read(len(buffer))
+        except _DECODE_ERRORS as exc:
+            raise ParseError(f'Invalid {self._encoding} request body - {exc}')
+        self._total += len(data)
+        if self._total > self._limit:
+            raise PayloadTooLarge(f'Request body larger than {self._limit} bytes once decompressed.')
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def decoded_stream(stream, parser_context: dict):
+    """Wrap ``stream`` to decode the request's ``Content-Encoding`` and bound its size."""
+    request = parser_context.get('request')
+    encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower() if request is not None else ''
+    if encoding in ('', 'identity'):
+        reader = stream
+    elif encoding in ('gzip', 'x-gzip'):
+        reader = gzip.GzipFile(fileobj=stream, mode='rb')
+    elif encoding == 'zstd' and zstandard is not None:
+        reader = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    else:
+        raise UnsupportedMediaType(
+            encoding,
+            detail=f'Unsupported Content-Encoding "{encoding}"; use one of: {", ".join(supported_encodings())}.',
+        )
+    return io.BufferedReader(_BoundedStream(reader, encoding or 'identity', settings.API_MAX_DECOMPRESSED_BODY_SIZE))
+
+
+class DecompressingParserMixin:
+    """Lets a parser read compressed bodies, within the decompressed size limit."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        return super().parse(decoded_stream(stream, parser_context), media_type, parser_context)
+
+
+class NDJSONParser(BaseParser):
+    """Newline-delimited JSON: one JSON object per line, parsed into a list."""
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for line_number, raw_line in enumerate(stream, start=1):
+            line = raw_line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON parse error on line {line_number} - {exc}')
+        return items
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack body with the same structure as the JSON one."""
+
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {str(exc) or "invalid format"}')
+
+
+class CBORParser(BaseParser):
+    """CBOR body with the same structure as the JSON one (needs ``cbor2``)."""
+
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except cbor2.CBORDecodeError as exc:
+            raise ParseError(f'CBOR parse error - {exc}')
+
+
+class CompressedJSONParser(DecompressingParserMixin, JSONParser):
+    pass
+
+
+class CompressedNDJSONParser(DecompressingParserMixin, NDJSONParser):
+    pass
+
+
+class CompressedMessagePackParser(DecompressingParserMixin, MessagePackParser):
+    pass
+
+
+class CompressedCBORParser(DecompressingParserMixin, CBORParser):
+    pass
+
+
+# Binary formats accepted next to JSON by the submit endpoints
+BINARY_PARSER_CLASSES = [CompressedMessagePackParser] + ([CompressedCBORParser] if cbor2 else [])
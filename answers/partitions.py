@@ -0,0 +1,263 @@
+"""Monthly range partitioning of submissions and answers on PostgreSQL.
+
+Opt-in with ``SUBMISSION_PARTITIONING``. ``answers_submission`` and
+``answers_submission_answer`` are both partitioned by ``submitted_at`` (copied
+onto every answer), one partition per calendar month named
+``<table>_pYYYYMM`` plus a ``<table>_default`` catch-all, so:
+
+- date-filtered queries only read the months they ask for (partition pruning);
+- dropping a month of data is ``DETACH PARTITION`` instead of a huge ``DELETE``.
+
+Partitioned tables need the partition key in every unique constraint, so the
+primary keys become ``(id, submitted_at)`` (ids still come from one sequence and
+stay unique) and the database-level foreign key from answers to submissions is
+dropped; :mod:`answers.purge` and Django's collector delete the answers first.
+:func:`convert` does the one-time rewrite, the ``manage_partitions`` command
+calls :func:`ensure_partitions` and :func:`detach_partition` from ``cron``.
+"""
+from datetime import date, datetime, time
+
+from django.db import connection, transaction
+
+from .models import OptionCountRollup, Submission, SubmissionAnswer
+
+
+PARTITION_KEY = 'submitted_at'
+# Converted and maintained together; answers first so their FK to submissions goes first
+PARTITIONED_MODELS = (SubmissionAnswer, Submission)
+
+
+class PartitioningError(Exception):
+    """The database cannot be (re)partitioned as asked."""
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f'{table}_p{month:%Y%m}'
+
+
+def _month_of(table: str, name: str) -> date | None:
+    """Month of a partition created by this module, or ``None`` (e.g. the default partition)."""
+    suffix = name[len(table) + 2:]
+    if not name.startswith(f'{table}_p') or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def _qn(name: str) -> str:
+    return connection.ops.quote_name(name)
+
+
+def _bound(month: date) -> str:
+    return datetime.combine(month, time.min).isoformat(sep=' ')
+
+
+def is_partitioned(table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid '
+            'WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace',
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions(table: str) -> dict[date, str]:
+    """Monthly partitions of ``table`` by month."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s AND p.relnamespace = current_schema()::regnamespace',
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return {month: name for name in names if (month := _month_of(table, name)) is not None}
+
+
+def _execute(statements: list[str], dry_run: bool, log) -> None:
+    with connection.cursor() as cursor:
+        for sql in statements:
+            log(sql)
+            if not dry_run:
+                cursor.execute(sql)
+
+
+def _create_partition_sql(table: str, month: date) -> list[str]:
+    """Create the partition of ``month``, moving any matching rows out of the default partition."""
+    name = partition_name(table, month)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    key = _qn(PARTITION_KEY)
+    return [
+        f'CREATE TABLE {_qn(name)} (LIKE {_qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        f'WITH moved AS (DELETE FROM {_qn(table + "_default")} '
+        f"WHERE {key} >= '{lower}' AND {key} < '{upper}' RETURNING *) "
+        f'INSERT INTO {_qn(name)} SELECT * FROM moved',
+        f"ALTER TABLE {_qn(table)} ATTACH PARTITION {_qn(name)} FOR VALUES FROM ('{lower}') TO ('{upper}')",
+    ]
+
+
+def ensure_partitions(through: date, dry_run: bool = False, log=print) -> list[str]:
+    """Create the missing monthly partitions from the current month through ``through``."""
+    created = []
+    first = month_start(datetime.now())
+    for model in PARTITIONED_MODELS:
+        table = model._meta.db_table
+        existing = partitions(table)
+        month = first
+        while month <= through:
+            if month not in existing:
+                with transaction.atomic():
+                    _execute(_create_partition_sql(table, month), dry_run, log)
+                created.append(partition_name(table, month))
+            month = add_months(month, 1)
+    return created
+
+
+def detach_partition(month: date, drop: bool, archive_schema: str, dry_run: bool = False, log=print) -> list[str]:
+    """Detach the ``month`` partition of every table, then drop it or move it to ``archive_schema``.
+
+    The option rollups of that month are deleted in the same transaction, so
+    dashboards stop counting the removed submissions.
+    """
+    statements = []
+    detached = []
+    if not drop:
+        statements.append(f'CREATE SCHEMA IF NOT EXISTS {_qn(archive_schema)}')
+    for model in PARTITIONED_MODELS:
+        table = model._meta.db_table
+        name = partitions(table).get(month)
+        if name is None:
+            continue
+        statements.append(f'ALTER TABLE {_qn(table)} DETACH PARTITION {_qn(name)}')
+        statements.append(
+            f'DROP TABLE {_qn(name)}' if drop else f'ALTER TABLE {_qn(name)} SET SCHEMA {_qn(archive_schema)}'
+        )
+        detached.append(name)
+    if not detached:
+        return []
+    with transaction.atomic():
+        log(f'-- delete option rollups from {month} to {add_months(month, 1)}')
+        if not dry_run:
+            OptionCountRollup.objects.filter(day__gte=month, day__lt=add_months(month, 1)).delete()
+        _execute(statements, dry_run, log)
+    return detached
+
+
+def _column_is_identity(table: str, column: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT is_identity FROM information_schema.columns '
+            'WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s',
+            [table, column],
+        )
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'YES'
+
+
+def _constraints(sql: str, params: list) -> list[tuple]:
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _convert_sql(model, first: date, through: date) -> list[str]:
+    """Statements that rebuild ``model``'s table as a partitioned table, keeping its data."""
+    table = model._meta.db_table
+    staging = f'{table}_partitioned'
+    pk = model._meta.pk.column
+    identity = _column_is_identity(table, pk)
+
+    # Foreign keys pointing at this table cannot reference a partitioned table by id alone
+    incoming = _constraints(
+        'SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        'WHERE contype = %s AND confrelid = %s::regclass AND conrelid <> confrelid',
+        ['f', table],
+    )
+    # ... and those from this table to another partitioned one are not recreated
+    partitioned = {m._meta.db_table for m in PARTITIONED_MODELS}
+    outgoing = [
+        (target, name, definition)
+        for target, name, definition in _constraints(
+            'SELECT confrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint '
+            'WHERE contype = %s AND conrelid = %s::regclass',
+            ['f', table],
+        )
+        if target.split('.')[-1].strip('"') not in partitioned
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, pk])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s',
+            [table],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            'SELECT conname FROM pg_constraint WHERE contype = %s AND conrelid = %s::regclass',
+            ['p', table],
+        )
+        pk_names = {row[0] for row in cursor.fetchall()}
+    unique = [name for name, definition in indexes if 'UNIQUE' in definition and name not in pk_names]
+    if unique:
+        raise PartitioningError(f'{table} has unique indexes without {PARTITION_KEY}: {", ".join(unique)}')
+
+    statements = [
+        f'ALTER TABLE {source} DROP CONSTRAINT {_qn(name)}' for source, name, _ in incoming
+    ]
+    statements.append(
+        f'CREATE TABLE {_qn(staging)} (LIKE {_qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS'
+        f'{" INCLUDING IDENTITY" if identity else ""}) PARTITION BY RANGE ({_qn(PARTITION_KEY)})'
+    )
+    statements.append(f'ALTER TABLE {_qn(staging)} ADD PRIMARY KEY ({_qn(pk)}, {_qn(PARTITION_KEY)})')
+    statements.append(f'CREATE TABLE {_qn(table + "_default")} PARTITION OF {_qn(staging)} DEFAULT')
+    month = first
+    while month <= through:
+        statements.append(
+            f'CREATE TABLE {_qn(partition_name(table, month))} PARTITION OF {_qn(staging)} '
+            f"FOR VALUES FROM ('{_bound(month)}') TO ('{_bound(add_months(month, 1))}')"
+        )
+        month = add_months(month, 1)
+    statements.append(f'INSERT INTO {_qn(staging)} SELECT * FROM {_qn(table)}')
+
+    if identity:
+        statements.append(
+            f"SELECT setval(pg_get_serial_sequence('{staging}', '{pk}'), "
+            f'(SELECT COALESCE(MAX({_qn(pk)}), 0) + 1 FROM {_qn(table)}), false)'
+        )
+    elif sequence:
+        # serial column: keep its sequence alive when the old table is dropped
+        statements.append(f'ALTER SEQUENCE {sequence} OWNED BY {_qn(staging)}.{_qn(pk)}')
+    statements.append(f'DROP TABLE {_qn(table)}')
+    statements.append(f'ALTER TABLE {_qn(staging)} RENAME TO {_qn(table)}')
+    # Index and constraint names are free again once the old table is gone
+    statements += [definition for name, definition in indexes if name not in pk_names]
+    statements += [
+        f'ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(name)} {definition}' for _, name, definition in outgoing
+    ]
+    return statements
+
+
+def convert(through: date, dry_run: bool = False, log=print) -> list[str]:
+    """Rewrite the unpartitioned tables as partitioned ones (one transaction). Returns the tables converted."""
+    pending = [m for m in PARTITIONED_MODELS if not is_partitioned(m._meta.db_table)]
+    if not pending:
+        return []
+    if SubmissionAnswer.objects.filter(submitted_at__isnull=True).exists():
+        raise PartitioningError('Some answers have no submitted_at; run migrate or backfill_answer_fields first')
+
+    oldest = Submission.objects.order_by(PARTITION_KEY).values_list(PARTITION_KEY, flat=True).first()
+    first = month_start(oldest or datetime.now())
+    with transaction.atomic():
+        for model in pending:
+            statements = _convert_sql(model, first, through)
+            _execute(statements, dry_run, log)
+    return [m._meta.db_table for m in pending]
@@ -0,0 +1,72 @@
+"""Bulk deletion of submissions without Django's delete collector.
+
+``QuerySet.delete()`` loads every ``SubmissionAnswer`` of the submissions into
+memory to cascade and send signals, one model instance per answer. Nothing in
+this app listens to answer or submission deletes, so :func:`delete_submissions`
+instead works through the ids in chunks, each in its own transaction:
+
+1. subtract the chunk's answers from the option rollups (one grouped query);
+2. ``DELETE`` its answers by ``submission_id``, then the submissions by ``id``;
+3. ``DELETE`` the idempotency keys that pointed at them, so a retry with the
+   same key is stored again instead of replaying a deleted submission.
+
+:func:`purge_submissions` applies that to every submission matching the view
+filters (a whole survey, a date range...), for the ``purge_submissions`` command
+and the ``process_purge_jobs`` worker.
+"""
+from typing import Callable, Iterable
+
+from django.db import connection, transaction
+
+from .exports import filter_submissions
+from .models import Submission, SubmissionAnswer
+from . import idempotency, rollups
+
+
+PURGE_CHUNK_SIZE = 1000
+
+
+def _delete_chunk(ids: list[int]) -> int:
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with transaction.atomic():
+        rollups.remove_submissions(Submission.objects.filter(id__in=ids))
+        idempotency.forget_submissions(ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {qn(SubmissionAnswer._meta.db_table)} '
+                f'WHERE {qn(SubmissionAnswer._meta.get_field("submission").column)} IN ({placeholders})',
+                ids,
+            )
+            cursor.execute(
+                f'DELETE FROM {qn(Submission._meta.db_table)} WHERE {qn(Submission._meta.pk.column)} IN ({placeholders})',
+                ids,
+            )
+            return cursor.rowcount
+
+
+def delete_submissions(ids: Iterable[int], chunk_size: int = PURGE_CHUNK_SIZE) -> int:
+    """Delete the submissions with ``ids`` and their answers, keeping rollups current. Returns the number deleted."""
+    ids = sorted({int(i) for i in ids})
+    return sum(_delete_chunk(ids[start:start + chunk_size]) for start in range(0, len(ids), chunk_size))
+
+
+def purge_submissions(
+    survey,
+    filters: dict,
+    chunk_size: int = PURGE_CHUNK_SIZE,
+    on_progress: Callable[[int], None] | None = None,
+) -> int:
+    """Delete every submission of ``survey`` matching ``filters`` (state, city, from, to). Returns the number deleted."""
+    qs = filter_submissions(survey, filters).order_by('id')
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(qs.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            break
+        deleted += _delete_chunk(ids)
+        last_id = ids[-1]
+        if on_progress is not None:
+            on_progress(deleted)
+    return deleted
@@ -0,0 +1,50 @@
+"""Binary response renderers for the survey and answers APIs.
+
+Field clients send ``Accept: application/msgpack`` (or ``application/cbor``
+when the optional ``cbor2`` package is installed) to get the same payload as
+the JSON response in a compact binary encoding that decodes without text
+parsing. JSON stays the default when ``Accept`` names no format.
+"""
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import cbor2
+except ImportError:  # optional: CBOR is only offered when installed
+    cbor2 = None
+
+
+# Dates, decimals and UUIDs are sent as the strings the JSON responses use
+_encode_default = JSONEncoder().default
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data, default=lambda encoder, value: encoder.encode(_encode_default(value)))
+
+
+# Binary formats offered next to JSON by the survey fetch and submit endpoints
+BINARY_RENDERER_CLASSES = [MessagePackRenderer] + ([CBORRenderer] if cbor2 else [])
+
+# Renderers of the endpoints used by field clients; JSON first so it stays the default
+API_RENDERER_CLASSES = [JSONRenderer] + BINARY_RENDERER_CLASSES
@@ -0,0 +1,189 @@
+"""Incremental maintenance of ``OptionCountRollup``.
+
+Writers call :func:`record_submissions` after inserting answers and
+:func:`remove_submissions` before deleting submissions, so dashboards can read
+option distributions from the rollup table instead of scanning
+``SubmissionAnswer``.
+"""
+from collections import Counter
+from datetime import date
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import Count, QuerySet, Sum
+from django.db.models.functions import TruncDate
+
+from .models import OptionCountRollup, Submission, SubmissionAnswer
+
+
+# (survey_id, question_id, option_id, state_id, city_id, day)
+RollupKey = tuple[int, int, int, int | None, int | None, date]
+
+
+APPLY_CHUNK_SIZE = 500
+
+# Matches the answers_rollup_key_uniq constraint; COALESCE makes keys without a
+# state or city unique too, which a plain unique index would not.
+_CONFLICT_TARGET = 'option_id, COALESCE(state_id, 0), COALESCE(city_id, 0), day'
+
+
+def apply_deltas(deltas: Counter[RollupKey]) -> None:
+    """Add each delta to the rollup row of its key, creating rows as needed.
+
+    One ``INSERT ... ON CONFLICT DO UPDATE`` per chunk of keys: the database
+    adds the delta to the row of an existing key, so concurrent writers never
+    create a second row for a key or lose an increment.
+    """
+    # Sorted keys give concurrent writers the same lock order
+    keys = sorted(
+        (k for k, amount in deltas.items() if amount),
+        key=lambda k: (k[2], k[3] or 0, k[4] or 0, k[5]),
+    )
+    opts = OptionCountRollup._meta
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    total = qn(opts.get_field('total').column)
+    columns = ', '.join(
+        qn(opts.get_field(name).column)
+        for name in ('survey', 'question', 'option', 'state', 'city', 'day', 'total')
+    )
+    for start in range(0, len(keys), APPLY_CHUNK_SIZE):
+        chunk = keys[start:start + APPLY_CHUNK_SIZE]
+        params = []
+        for survey_id, question_id, option_id, state_id, city_id, day in chunk:
+            params += [
+                survey_id, question_id, option_id, state_id, city_id,
+                connection.ops.adapt_datefield_value(day),
+                deltas[(survey_id, question_id, option_id, state_id, city_id, day)],
+            ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(chunk))} '
+                f'ON CONFLICT ({_CONFLICT_TARGET}) DO UPDATE SET {total} = {table}.{total} + EXCLUDED.{total}',
+                params,
+            )
+
+
+def record_submissions(items: Iterable[tuple[Submission, Iterable[SubmissionAnswer]]]) -> None:
+    """Count the selected options of freshly created ``(submission, answers)`` pairs."""
+    deltas: Counter[RollupKey] = Counter()
+    for submission, answers in items:
+        day = submission.submitted_at.date()
+        for ans in answers:
+            if ans.selected_option_id:
+                deltas[(
+                    submission.survey_id, ans.question_id, ans.selected_option_id,
+                    submission.state_id, submission.city_id, day,
+                )] += 1
+    apply_deltas(deltas)
+
+
+def _grouped_rows(answers_qs: QuerySet) -> QuerySet:
+    """``(survey, question, option, state, city, day, total)`` rows for ``answers_qs``."""
+    return (
+        answers_qs
+        .filter(selected_option__isnull=False)
+        .annotate(day=TruncDate('submitted_at'))
+        .values_list('survey_id', 'question_id', 'selected_option_id', 'state_id', 'city_id', 'day')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+
+def _grouped_answer_counts(answers_qs: QuerySet) -> Counter[RollupKey]:
+    counts: Counter[RollupKey] = Counter()
+    for survey_id, question_id, option_id, state_id, city_id, day, total in _grouped_rows(answers_qs):
+        counts[(survey_id, question_id, option_id, state_id, city_id, day)] += total
+    return counts
+
+
+def remove_answers(answers_qs: QuerySet) -> None:
+    """Subtract ``answers_qs`` before they are deleted or changed.
+
+    Must run in the same transaction as the change.
+    """
+    counts = _grouped_answer_counts(answers_qs)
+    apply_deltas(Counter({key: -total for key, total in counts.items()}))
+
+
+def add_answers(answers_qs: QuerySet) -> None:
+    """Count existing ``answers_qs`` (e.g. after editing them)."""
+    apply_deltas(_grouped_answer_counts(answers_qs))
+
+
+def remove_submissions(submissions_qs: QuerySet) -> None:
+    """Subtract the answers of ``submissions_qs`` before they are deleted.
+
+    Must run in the same transaction as the delete.
+    """
+    remove_answers(SubmissionAnswer.objects.filter(submission__in=submissions_qs.values('id')))
+
+
+def add_submissions(submissions_qs: QuerySet) -> None:
+    """Count the answers of existing ``submissions_qs`` (e.g. after changing their location)."""
+    add_answers(SubmissionAnswer.objects.filter(submission__in=submissions_qs.values('id')))
+
+
+def detach_locations(field: str, pks) -> None:
+    """Move the rollups of states or cities about to be deleted to the key without them.
+
+    ``field`` is ``'state'`` or ``'city'`` and ``pks`` their ids (or a
+    queryset of them). The rollup foreign keys are ``SET_NULL``, which would
+    collide with existing rows of the key without a location; merging the rows
+    first keeps the totals and the unique key. Must run in the same
+    transaction as the delete.
+    """
+    rows = OptionCountRollup.objects.filter(**{f'{field}_id__in': pks})
+    moved: Counter[RollupKey] = Counter()
+    for survey_id, question_id, option_id, state_id, city_id, day, total in rows.values_list(
+        'survey_id', 'question_id', 'option_id', 'state_id', 'city_id', 'day', 'total',
+    ).iterator(chunk_size=APPLY_CHUNK_SIZE * 4):
+        if field == 'state':
+            state_id = None
+        else:
+            city_id = None
+        moved[(survey_id, question_id, option_id, state_id, city_id, day)] += total
+    rows.delete()
+    apply_deltas(moved)
+
+
+@transaction.atomic
+def rebuild(survey=None) -> int:
+    """Recompute rollups from ``SubmissionAnswer`` (all surveys or one). Returns rows written.
+
+    Reads the survey, state, city and date copied onto the answers (filled
+    for older answers by migration 0013).
+    """
+    rollups = OptionCountRollup.objects.all()
+    answers = SubmissionAnswer.objects.all()
+    if survey is not None:
+        rollups = rollups.filter(survey=survey)
+        answers = answers.filter(survey=survey)
+    rollups.delete()
+    # INSERT ... SELECT keeps the grouped rows inside the database
+    select_sql, params = _grouped_rows(answers).query.sql_with_params()
+    opts = OptionCountRollup._meta
+    qn = connection.ops.quote_name
+    columns = ', '.join(
+        qn(opts.get_field(name).column)
+        for name in ('survey', 'question', 'option', 'state', 'city', 'day', 'total')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {qn(opts.db_table)} ({columns}) {select_sql}', params)
+        return cursor.rowcount
+
+
+def option_totals(survey, state_id=None, city_id=None) -> QuerySet:
+    """Selected-option totals per question for ``survey`` from the rollup table."""
+    qs = OptionCountRollup.objects.filter(survey=survey)
+    if state_id:
+        qs = qs.filter(state_id=state_id)
+    if city_id:
+        qs = qs.filter(city_id=city_id)
+    return (
+        qs
+        .values('question_id', 'option_id', 'option__option_text')
+        .annotate(total=Sum('total'))
+        .filter(total__gt=0)
+        .order_by('question_id', '-total')
+    )
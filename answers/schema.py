@@ -1,14 +1,36 @@
-from drf_spectacular.utils import extend_schema, OpenApiExample
-from .serializers import SubmissionCreateSerializer, SubmissionResponseSerializer
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
+from .serializers import (
+    BulkSubmissionResponseSerializer,
+    IngestReceiptSerializer,
+    SubmissionCreateSerializer,
+    SubmissionResponseSerializer,
+)
 
 
 submit_answers_schema = extend_schema(
     tags=['Answers'],
     summary='Submit answers for a survey',
-    description='Accepts a bearer-authenticated POST with a survey token and answers. Records metadata like IP, lat/lon, and occurred_at.',
+    description=(
+        'Accepts a bearer-authenticated POST with a survey token and answers. Records metadata like IP, lat/lon, and occurred_at. '
+        'When the server spools submissions (INGEST_SPOOL_ENABLED) the response is 202 with a receipt id; '
+        'poll GET /api/v1/answers/receipts/{receipt}/ for the stored submission.'
+    ),
     request=SubmissionCreateSerializer,
+    parameters=[
+        OpenApiParameter(
+            'Idempotency-Key',
+            location=OpenApiParameter.HEADER,
+            required=False,
+            description=(
+                'Unique id chosen by the client for this submission (e.g. a UUID), same as client_submission_id. '
+                'Retries with the same key return the first response, with the Idempotent-Replayed header, '
+                'instead of creating another submission.'
+            ),
+        ),
+    ],
     responses={
         201: SubmissionResponseSerializer,
+        202: IngestReceiptSerializer,
         400: dict,
         404: dict,
     },
@@ -32,3 +54,56 @@ submit_answers_schema = extend_schema(
 )
 
 
+submit_answers_bulk_schema = extend_schema(
+    tags=['Answers'],
+    summary='Submit many survey answers at once',
+    description=(
+        'Accepts a JSON array (application/json) or one submission per line (application/x-ndjson). '
+        'Every item is validated independently; valid items are stored in a single transaction and the '
+        'response reports the outcome of each item by its position in the request. Items whose client_submission_id '
+        'was already stored are not inserted again and report the first response.'
+    ),
+    request=SubmissionCreateSerializer(many=True),
+    responses={
+        200: BulkSubmissionResponseSerializer,
+        400: dict,
+    },
+    examples=[
+        OpenApiExample(
+            'BulkSubmit',
+            value=[
+                {'token': '2-M58TVW', 'answers': [{'question_id': 2, 'option_ids': [3]}]},
+                {'token': '2-M58TVW', 'answers': [{'question_id': 2, 'option_ids': [4]}]},
+            ],
+            request_only=True,
+        ),
+        OpenApiExample(
+            'BulkSubmitResult',
+            value={
+                'created': 1,
+                'replayed': 0,
+                'failed': 1,
+                'results': [
+                    {'index': 0, 'status': 201, 'id': 120, 'survey_token': '2-M58TVW', 'submitted_at': '2025-08-20T12:34:56'},
+                    {'index': 1, 'status': 400, 'errors': {'non_field_errors': ['One or more options are invalid for this survey']}},
+                ],
+            },
+            response_only=True,
+        ),
+    ],
+)
+
+
+ingest_receipt_schema = extend_schema(
+    tags=['Answers'],
+    summary='Status of a spooled submission',
+    description=(
+        'Returns the outcome of a submission accepted with 202: pending, stored (with submission_id) '
+        'or failed (with error). A receipt not found yet is reported as pending for '
+        'INGEST_RECEIPT_PENDING_SECONDS after it was issued, since another server may still hold it.'
+    ),
+    responses={
+        200: IngestReceiptSerializer,
+        404: dict,
+    },
+)
@@ -1,11 +1,13 @@
 from typing import Any, Dict, List
 
-from django.db import transaction
 from rest_framework import serializers
 
-from companies.models import Company
-from surveys.models import Survey, Question, Option
-from .models import Submission, SubmissionAnswer
+from surveys.cache import get_compiled_survey
+from surveys.models import Question
+from .gazetteer import get_gazetteer
+from .idempotency import MAX_KEY_LENGTH
+from .models import Submission
+from .ingest import build_record, persist_records
 
 
 class SubmissionAnswerInputSerializer(serializers.Serializer):
@@ -29,179 +31,117 @@ class SubmissionCreateSerializer(serializers.Serializer):
     ibge_code = serializers.CharField(required=False, allow_blank=True)
     state_code = serializers.CharField(required=False, allow_blank=True)
     answers = SubmissionAnswerInputSerializer(many=True)
+    # Same as the Idempotency-Key header: retries with it return the first response
+    client_submission_id = serializers.CharField(required=False, max_length=MAX_KEY_LENGTH)
 
     def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        # Validation works on the cached survey definition: no queries on the hot path.
+        # Async callers look it up beforehand and pass it as ``compiled_surveys``.
+        prefetched = self.context.get('compiled_surveys', {})
         token = attrs['token']
-        survey = Survey.objects.filter(token=token).select_related('company').first()
-        if not survey:
+        definition = prefetched[token] if token in prefetched else get_compiled_survey(token)
+        if not definition:
             raise serializers.ValidationError({'token': 'invalid or unknown survey token'})
-        attrs['survey'] = survey
+        attrs['survey_definition'] = definition
+        question_types = definition.questions
+        option_question = definition.option_question
 
-        # Load referenced questions and options in bulk for validation
         question_ids = [a['question_id'] for a in attrs['answers']]
-        questions = Question.objects.filter(id__in=question_ids, survey=survey)
-        question_map = {q.id: q for q in questions}
-        if len(question_map) != len(set(question_ids)):
+        if any(qid not in question_types for qid in question_ids):
             raise serializers.ValidationError('One or more questions are invalid for this survey')
 
-        # Build option map by question where provided
         option_ids: List[int] = []
         for ans in attrs['answers']:
             if 'option_ids' in ans:
                 option_ids.extend(ans['option_ids'])
             if 'option_id' in ans:
                 option_ids.append(ans['option_id'])
-        options = Option.objects.filter(id__in=option_ids, question__survey=survey)
-        option_map = {opt.id: opt for opt in options}
-        if len(option_map) != len(set(option_ids)):
+        if any(oid not in option_question for oid in option_ids):
             raise serializers.ValidationError('One or more options are invalid for this survey')
 
         # Per-answer rule checks
         for ans in attrs['answers']:
-            question = question_map[ans['question_id']]
+            question_id = ans['question_id']
+            question_type = question_types[question_id]
             option_ids_for_answer = ans.get('option_ids')
             text_response = ans.get('text_response')
 
-            if question.question_type == Question.MULTIPLE_CHOICE:
+            if question_type == Question.MULTIPLE_CHOICE:
                 if not option_ids_for_answer:
                     raise serializers.ValidationError(
-                        f'Question {question.id} expects option_ids'
+                        f'Question {question_id} expects option_ids'
                     )
                 # Ensure all options belong to this question
                 for oid in option_ids_for_answer:
-                    opt = option_map.get(oid)
-                    if not opt or opt.question_id != question.id:
+                    if option_question.get(oid) != question_id:
                         raise serializers.ValidationError(
-                            f'Option {oid} does not belong to question {question.id}'
+                            f'Option {oid} does not belong to question {question_id}'
                         )
                 # Text should not be present for pure multiple choice
                 if text_response:
                     raise serializers.ValidationError(
-                        f'Question {question.id} does not accept text_response'
+                        f'Question {question_id} does not accept text_response'
                     )
-            elif question.question_type == Question.SINGLE_CHOICE:
+            elif question_type == Question.SINGLE_CHOICE:
                 # Normalize to option_ids with exactly one element
                 if option_ids_for_answer is None and 'option_id' in ans:
                     option_ids_for_answer = [ans['option_id']]
                     ans['option_ids'] = option_ids_for_answer
                 if not option_ids_for_answer or len(option_ids_for_answer) != 1:
                     raise serializers.ValidationError(
-                        f'Question {question.id} expects exactly one option'
+                        f'Question {question_id} expects exactly one option'
                     )
                 oid = option_ids_for_answer[0]
-                opt = option_map.get(oid)
-                if not opt or opt.question_id != question.id:
+                if option_question.get(oid) != question_id:
                     raise serializers.ValidationError(
-                        f'Option {oid} does not belong to question {question.id}'
+                        f'Option {oid} does not belong to question {question_id}'
                     )
                 if text_response:
                     raise serializers.ValidationError(
-                        f'Question {question.id} does not accept text_response'
+                        f'Question {question_id} does not accept text_response'
                     )
             else:  # TEXT
                 if option_ids_for_answer:
                     raise serializers.ValidationError(
-                        f'Question {question.id} does not accept options'
+                        f'Question {question_id} does not accept options'
                     )
                 if text_response is None:
                     raise serializers.ValidationError(
-                        f'Question {question.id} requires text_response'
+                        f'Question {question_id} requires text_response'
                     )
 
-        attrs['question_map'] = question_map
-        attrs['option_map'] = option_map
+        attrs['city_id'], attrs['state_id'] = self._resolve_location(attrs)
         return attrs
 
-    @transaction.atomic
+    def _resolve_location(self, attrs: Dict[str, Any]) -> tuple[int | None, int | None]:
+        """Return ``(city_id, state_id)`` for the optional IBGE and state codes (no queries).
+
+        Without codes, the municipality with the nearest seat to the submitted
+        coordinates is used, if any is close enough.
+        """
+        ibge_code = attrs.get('ibge_code')
+        state_code = attrs.get('state_code')
+        geo = self.context.get('gazetteer') or get_gazetteer()
+        if not (ibge_code and state_code):
+            latitude, longitude = attrs.get('latitude'), attrs.get('longitude')
+            if latitude is None or longitude is None:
+                return None, None
+            city = geo.nearest_city(latitude, longitude)
+            return (city.id, city.state_id) if city else (None, None)
+        city = geo.city(ibge_code)
+        if not city:
+            raise serializers.ValidationError(f'City with IBGE code {ibge_code} not found')
+        state = geo.state(state_code)
+        if not state:
+            raise serializers.ValidationError(f'State with code {state_code} not found')
+        # Validate that the city belongs to the state
+        if city.state_id != state.id:
+            raise serializers.ValidationError(f'City {city.name} does not belong to state {state.name}')
+        return city.id, state.id
+
     def create(self, validated_data: Dict[str, Any]) -> Submission:
         request = self.context.get('request')
-        survey: Survey = validated_data['survey']
-
-        # Process geographic data if provided
-        city = None
-        state = None
-        ibge_code = validated_data.get('ibge_code')
-        state_code = validated_data.get('state_code')
-        
-        if ibge_code and state_code:
-            try:
-                from .models import City, State
-                city = City.objects.get(ibge_code=ibge_code)
-                state = State.objects.get(code=state_code)
-                
-                # Validate that the city belongs to the state
-                if city.state != state:
-                    raise serializers.ValidationError(
-                        f'City {city.name} does not belong to state {state.name}'
-                    )
-            except City.DoesNotExist:
-                raise serializers.ValidationError(f'City with IBGE code {ibge_code} not found')
-            except State.DoesNotExist:
-                raise serializers.ValidationError(f'State with code {state_code} not found')
-
-        submission = Submission.objects.create(
-            survey=survey,
-            company=survey.company,
-            survey_token=survey.token,
-            occurred_at=validated_data.get('occurred_at') or None,
-            latitude=validated_data.get('latitude'),
-            longitude=validated_data.get('longitude'),
-            city=city,
-            state=state,
-            ip_address=self._get_ip_from_request(request),
-            user_agent=self._get_ua_from_request(request),
-        )
-
-        answers_in = validated_data['answers']
-        option_map = validated_data['option_map']
-        question_map = validated_data['question_map']
-
-        submission_answers: List[SubmissionAnswer] = []
-        for ans in answers_in:
-            question = question_map[ans['question_id']]
-            if question.question_type == Question.MULTIPLE_CHOICE:
-                for oid in ans['option_ids']:
-                    submission_answers.append(
-                        SubmissionAnswer(
-                            submission=submission,
-                            question=question,
-                            selected_option=option_map[oid],
-                        )
-                    )
-            elif question.question_type == Question.SINGLE_CHOICE:
-                oid = ans['option_ids'][0]
-                submission_answers.append(
-                    SubmissionAnswer(
-                        submission=submission,
-                        question=question,
-                        selected_option=option_map[oid],
-                    )
-                )
-            else:
-                submission_answers.append(
-                    SubmissionAnswer(
-                        submission=submission,
-                        question=question,
-                        text_response=ans.get('text_response', ''),
-                    )
-                )
-
-        SubmissionAnswer.objects.bulk_create(submission_answers)
-        return submission
-
-    def _get_ip_from_request(self, request) -> str | None:  # type: ignore[override]
-        if not request:
-            return None
-        # X-Forwarded-For support (take first)
-        xff = request.META.get('HTTP_X_FORWARDED_FOR')
-        if xff:
-            return xff.split(',')[0].strip()
-        return request.META.get('REMOTE_ADDR')
-
-    def _get_ua_from_request(self, request) -> str:  # type: ignore[override]
-        if not request:
-            return ''
-        return request.META.get('HTTP_USER_AGENT', '')
+        return persist_records([build_record(validated_data, request)])[0]
 
 
 class SubmissionResponseSerializer(serializers.ModelSerializer):
@@ -210,3 +150,32 @@ class SubmissionResponseSerializer(serializers.ModelSerializer):
         fields = ['id', 'survey_token', 'submitted_at']
 
 
+
+
+class IngestReceiptSerializer(serializers.Serializer):
+    """Receipt of a submission accepted into the ingest spool."""
+    STATUS_PENDING = 'pending'
+    STATUS_STORED = 'stored'
+    STATUS_FAILED = 'failed'
+
+    receipt = serializers.CharField()
+    status = serializers.ChoiceField(choices=[STATUS_PENDING, STATUS_STORED, STATUS_FAILED])
+    submission_id = serializers.IntegerField(required=False, allow_null=True)
+    error = serializers.CharField(required=False)
+
+
+class BulkSubmissionItemResultSerializer(serializers.Serializer):
+    """Outcome of one item of a bulk submission (documentation only)."""
+    index = serializers.IntegerField()
+    status = serializers.IntegerField(help_text='201 when created, 400 when invalid')
+    id = serializers.IntegerField(required=False)
+    survey_token = serializers.CharField(required=False)
+    submitted_at = serializers.DateTimeField(required=False)
+    errors = serializers.JSONField(required=False)
+
+
+class BulkSubmissionResponseSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    replayed = serializers.IntegerField(help_text='Items repeating an already stored client_submission_id')
+    failed = serializers.IntegerField()
+    results = BulkSubmissionItemResultSerializer(many=True)
@@ -0,0 +1,40 @@
+"""Rebuild the geographic gazetteer (and merge the rollups of deleted locations)
+when states or cities change, and keep the fields answers copy from their
+submission (and its heat map cells) current."""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import gazetteer, heat, rollups
+from .ingest import DENORMALIZED_FIELDS, sync_answer_fields
+from .models import City, State, Submission, SubmissionAnswer
+
+
+@receiver([post_save, post_delete], sender=State)
+@receiver([post_save, post_delete], sender=City)
+def geography_changed(sender, **kwargs):
+    gazetteer.bump_version()
+
+
+@receiver(pre_delete, sender=State)
+@receiver(pre_delete, sender=City)
+def location_deleted(sender, instance, **kwargs):
+    # Before the rollup foreign keys are set to NULL (see rollups.detach_locations)
+    rollups.detach_locations('state' if sender is State else 'city', [instance.pk])
+
+
+@receiver(pre_save, sender=SubmissionAnswer)
+def fill_answer_fields(sender, instance, raw=False, **kwargs):
+    # persist_records fills these itself; this covers answers saved one by one (admin)
+    if raw or instance.survey_id is not None or instance.submission_id is None:
+        return
+    for field in DENORMALIZED_FIELDS:
+        setattr(instance, field, getattr(instance.submission, field))
+
+
+@receiver(post_save, sender=Submission)
+def submission_changed(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    sync_answer_fields(SubmissionAnswer.objects.filter(submission=instance))
+    # Same count and ids, possibly new coordinates or location
+    heat.bump_version(instance.survey_id)
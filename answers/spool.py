@@ -0,0 +1,300 @@
+"""Write-behind ingest spool.
+
+With ``INGEST_SPOOL_ENABLED`` the submit endpoint does not touch the main
+database: the record built by :func:`answers.ingest.build_record` is appended
+to a local SQLite file in WAL mode (``INGEST_SPOOL_PATH``, one fsync'd insert)
+and the client gets ``202`` with a receipt id. :func:`flush` drains the spool
+oldest first, storing up to ``INGEST_SPOOL_BATCH_SIZE`` records per
+transaction with :func:`answers.ingest.persist_records` plus one
+``IngestReceipt`` per record. Records leave the spool only after that commit;
+if the flusher dies in between, the next run finds their receipts and drops
+them instead of inserting them twice.
+
+Every host has its own spool, drained by ``flush_ingest_spool`` from its
+``cron``. ``submitted_at`` is the time a record is flushed; its receipt keeps
+the time it was accepted. Retries sent with an idempotency key are stored once
+(see ``answers.idempotency``).
+
+Receipt ids start with the time they were issued. A server that does not hold
+a receipt in its spool (another host accepted it) reports it as pending until
+``INGEST_RECEIPT_PENDING_SECONDS`` have passed.
+"""
+import fcntl
+import json
+import logging
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from . import idempotency
+from .ingest import persist_records
+from .models import IngestReceipt
+from .serializers import IngestReceiptSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class SpooledRecord(NamedTuple):
+    id: int
+    receipt: str
+    record: Dict[str, Any]
+    accepted_at: datetime
+
+
+def _encode(record: Dict[str, Any]) -> str:
+    def default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        raise TypeError(f'{type(value).__name__} is not spoolable')
+    return json.dumps(record, default=default)
+
+
+def _decode(payload: str) -> Dict[str, Any]:
+    record = json.loads(payload)
+    record['occurred_at'] = datetime.fromisoformat(record['occurred_at'])
+    for field in ('latitude', 'longitude'):
+        if record[field] is not None:
+            record[field] = Decimal(record[field])
+    record['answers'] = [tuple(answer) for answer in record['answers']]
+    return record
+
+
+def _spooled(row: tuple) -> SpooledRecord:
+    row_id, receipt, record, accepted_at = row
+    return SpooledRecord(row_id, receipt, _decode(record), datetime.fromisoformat(accepted_at))
+
+
+_KEY_EXPRESSION = "json_extract(record, '$.idempotency_key')"
+
+# 12 hex digits of milliseconds since the epoch, then 20 random ones
+_RECEIPT_RE = re.compile(r'[0-9a-f]{32}')
+
+
+def new_receipt() -> str:
+    return f'{time.time_ns() // 1_000_000:012x}{secrets.token_hex(10)}'
+
+
+def recently_issued(receipt: str) -> bool:
+    """Whether ``receipt`` looks issued by a server less than ``INGEST_RECEIPT_PENDING_SECONDS`` ago."""
+    if not _RECEIPT_RE.fullmatch(receipt):
+        return False
+    age = time.time() - int(receipt[:12], 16) / 1000
+    # A little clock skew between servers is fine; older uuid4 receipts decode far in the future
+    return -60 <= age <= settings.INGEST_RECEIPT_PENDING_SECONDS
+
+
+class Spool:
+    """Queue of ingest records in a SQLite file; safe across threads and processes."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # fsync on every commit: an accepted submission survives a power loss
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS spool ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, receipt TEXT NOT NULL UNIQUE, '
+                'record TEXT NOT NULL, accepted_at TEXT NOT NULL)'
+            )
+            conn.execute(f'CREATE INDEX IF NOT EXISTS spool_idempotency_key ON spool ({_KEY_EXPRESSION})')
+            self._local.conn = conn
+        return conn
+
+    def append(self, record: Dict[str, Any]) -> str:
+        """Store ``record`` durably and return its receipt id."""
+        receipt = new_receipt()
+        self._connection().execute(
+            'INSERT INTO spool (receipt, record, accepted_at) VALUES (?, ?, ?)',
+            (receipt, _encode(record), timezone.now().isoformat()),
+        )
+        return receipt
+
+    def head(self, limit: int) -> List[SpooledRecord]:
+        """The ``limit`` oldest records."""
+        rows = self._connection().execute(
+            'SELECT id, receipt, record, accepted_at FROM spool ORDER BY id LIMIT ?', (limit,)
+        ).fetchall()
+        return [_spooled(row) for row in rows]
+
+    def get(self, receipt: str) -> SpooledRecord | None:
+        row = self._connection().execute(
+            'SELECT id, receipt, record, accepted_at FROM spool WHERE receipt = ?', (receipt,)
+        ).fetchone()
+        return _spooled(row) if row is not None else None
+
+    def find(self, company_id: int, idempotency_key: str) -> SpooledRecord | None:
+        """The spooled record of ``company_id`` sent with ``idempotency_key``, if any."""
+        row = self._connection().execute(
+            f'SELECT id, receipt, record, accepted_at FROM spool WHERE {_KEY_EXPRESSION} = ? '
+            "AND json_extract(record, '$.company_id') = ? ORDER BY id LIMIT 1",
+            (idempotency_key, company_id),
+        ).fetchone()
+        return _spooled(row) if row is not None else None
+
+    def remove(self, ids: List[int]) -> None:
+        conn = self._connection()
+        conn.execute('BEGIN')
+        try:
+            conn.executemany('DELETE FROM spool WHERE id = ?', [(row_id,) for row_id in ids])
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+
+    @contextmanager
+    def flush_lock(self) -> Iterator[bool]:
+        """Hold this spool's flusher lock; yields ``False`` if another flusher has it.
+
+        The OS releases the lock when its holder dies, so a crashed flusher
+        never blocks the next one.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_spool: Spool | None = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> Spool:
+    """This process's spool at ``INGEST_SPOOL_PATH``."""
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = Spool(settings.INGEST_SPOOL_PATH)
+        return _spool
+
+
+def _receipt(item: SpooledRecord, submission_id: int | None = None, error: str = '') -> IngestReceipt:
+    return IngestReceipt(
+        receipt=item.receipt,
+        company_id=item.record['company_id'],
+        submission_id=submission_id,
+        error=error,
+        accepted_at=item.accepted_at,
+    )
+
+
+def pending_receipt(receipt: str) -> dict:
+    """Response body of a spooled submit."""
+    return {'receipt': receipt, 'status': IngestReceiptSerializer.STATUS_PENDING}
+
+
+def _key(item: SpooledRecord) -> tuple[int, str] | None:
+    key = item.record.get('idempotency_key')
+    return (item.record['company_id'], key) if key else None
+
+
+def _store(items: List[SpooledRecord]) -> None:
+    """Store ``items`` with their receipts and idempotency keys in one transaction.
+
+    Retries of a submission already stored (or earlier in ``items``) are not
+    inserted again: their receipts point at the first copy.
+    """
+    originals = idempotency.stored_submissions(key for item in items if (key := _key(item)))
+    fresh: List[SpooledRecord] = []
+    repeats: List[SpooledRecord] = []
+    for item in items:
+        key = _key(item)
+        if key is not None and key in originals:
+            repeats.append(item)
+        else:
+            fresh.append(item)
+            if key is not None:
+                originals[key] = None
+    with transaction.atomic():
+        submissions = persist_records([item.record for item in fresh])
+        keyed = []
+        for item, submission in zip(fresh, submissions):
+            key = _key(item)
+            if key is not None:
+                originals[key] = submission.pk
+                keyed.append((*key, submission.pk, (202, pending_receipt(item.receipt))))
+        idempotency.store(keyed)
+        IngestReceipt.objects.bulk_create(
+            [_receipt(item, submission.pk) for item, submission in zip(fresh, submissions)]
+            + [_receipt(item, originals[_key(item)]) for item in repeats]
+        )
+
+
+def _store_one_by_one(items: List[SpooledRecord]) -> int:
+    """Store ``items`` separately after their batch failed; returns how many failed."""
+    failed = 0
+    for item in items:
+        try:
+            _store([item])
+        except (IntegrityError, DataError) as exc:
+            # e.g. the survey or a question was deleted after the record was accepted
+            logger.warning('Spooled submission %s could not be stored: %s', item.receipt, exc)
+            _receipt(item, error=str(exc)).save()
+            failed += 1
+    return failed
+
+
+def flush(spool: Spool | None = None, batch_size: int | None = None) -> tuple[int, int]:
+    """Store every spooled record in batches. Returns ``(stored, failed)``.
+
+    Returns ``(0, 0)`` right away when another flusher is draining this spool.
+    Errors other than invalid records (e.g. the database being down) propagate
+    and leave the spool untouched.
+    """
+    spool = spool or get_spool()
+    batch_size = batch_size or settings.INGEST_SPOOL_BATCH_SIZE
+    stored = failed = 0
+    with spool.flush_lock() as locked:
+        if not locked:
+            return 0, 0
+        while True:
+            items = spool.head(batch_size)
+            if not items:
+                break
+            # Stored by a flusher that died before removing them from the spool
+            done = set(
+                IngestReceipt.objects
+                .filter(receipt__in=[item.receipt for item in items])
+                .values_list('receipt', flat=True)
+            )
+            pending = [item for item in items if item.receipt not in done]
+            if pending:
+                try:
+                    _store(pending)
+                    batch_failed = 0
+                except (IntegrityError, DataError):
+                    batch_failed = _store_one_by_one(pending)
+                stored += len(pending) - batch_failed
+                failed += batch_failed
+            spool.remove([item.id for item in items])
+    return stored, failed
@@ -0,0 +1,314 @@
+"""Synthetic survey data for benchmarks and load tests.
+
+Submissions are spread over the real cities loaded from ``loads/municipios.csv``
+(``load_geographic_data``) with coordinates jittered around each city.
+:func:`generate_submissions` writes them through
+:func:`answers.ingest.persist_records`, the same path used by the API, while
+:func:`bulk_load` uses raw batch writes (``COPY`` on PostgreSQL) for millions
+of rows and keeps the rollups consistent itself.
+"""
+import io
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from surveys.cache import compile_survey
+from surveys.models import Option, Question, Survey
+from .ingest import persist_records
+from .models import City, Submission, SubmissionAnswer
+from . import rollups
+
+# Share of generated questions per type
+QUESTION_MIX = (
+    (Question.SINGLE_CHOICE, 0.6),
+    (Question.MULTIPLE_CHOICE, 0.3),
+    (Question.TEXT, 0.1),
+)
+COORD_JITTER = 0.05
+USER_AGENT = 'Mozilla/5.0 (Synthetic Load)'
+
+
+def load_city_points() -> List[tuple]:
+    """Return one tuple per city: ``(city_id, state_id, lat, lng, ibge_code, state_code)``."""
+    return [
+        (city_id, state_id, float(lat), float(lng), ibge_code, state_code)
+        for city_id, state_id, lat, lng, ibge_code, state_code in City.objects.values_list(
+            'id', 'state_id', 'latitude', 'longitude', 'ibge_code', 'state__code',
+        )
+    ]
+
+
+def create_survey(company, n_questions: int, n_options: int, title: str = '') -> Survey:
+    """Create a survey with ``n_questions`` questions following :data:`QUESTION_MIX`."""
+    survey = Survey.objects.create(company=company, title=title or f'Synthetic {n_questions}x{n_options}')
+    types: List[str] = []
+    for question_type, share in QUESTION_MIX:
+        types.extend([question_type] * round(n_questions * share))
+    types = (types + [Question.SINGLE_CHOICE] * n_questions)[:n_questions]
+    questions = Question.objects.bulk_create(
+        [
+            Question(survey=survey, question_text=f'Pergunta {i + 1}', question_type=question_type)
+            for i, question_type in enumerate(types)
+        ],
+        batch_size=1000,
+    )
+    Option.objects.bulk_create(
+        [
+            Option(question=question, option_text=f'Opção {j + 1}')
+            for question in questions
+            if question.question_type != Question.TEXT
+            for j in range(n_options)
+        ],
+        batch_size=2000,
+    )
+    return survey
+
+
+class SubmissionFactory:
+    """Random submissions for one survey, as persist records or as API payloads."""
+
+    def __init__(self, survey: Survey, cities: List[tuple], seed: int | None = None, days: int = 30):
+        if not cities:
+            raise ValueError('No cities loaded; run load_geographic_data first')
+        definition = compile_survey(survey.token)
+        self.definition = definition
+        self.cities = cities
+        self.rng = random.Random(seed)
+        self.days = days
+        options_by_question: Dict[int, List[int]] = {}
+        for option_id, question_id in definition.option_question.items():
+            options_by_question.setdefault(question_id, []).append(option_id)
+        self.questions = [
+            (question_id, question_type, sorted(options_by_question.get(question_id, [])))
+            for question_id, question_type in sorted(definition.questions.items())
+        ]
+
+    def _answers(self) -> List[tuple]:
+        """Return ``(question_id, option_ids, text)`` for every question."""
+        rng = self.rng
+        answers = []
+        for question_id, question_type, option_ids in self.questions:
+            if question_type == Question.TEXT or not option_ids:
+                answers.append((question_id, [], f'Resposta {rng.randrange(1_000_000)}'))
+            elif question_type == Question.SINGLE_CHOICE:
+                answers.append((question_id, [rng.choice(option_ids)], None))
+            else:
+                k = rng.randint(1, min(3, len(option_ids)))
+                answers.append((question_id, rng.sample(option_ids, k), None))
+        return answers
+
+    def _location(self) -> tuple:
+        city = self.rng.choice(self.cities)
+        lat = city[2] + self.rng.uniform(-COORD_JITTER, COORD_JITTER)
+        lng = city[3] + self.rng.uniform(-COORD_JITTER, COORD_JITTER)
+        return city, Decimal(f'{lat:.6f}'), Decimal(f'{lng:.6f}')
+
+    def _occurred_at(self):
+        return timezone.now() - timedelta(seconds=self.rng.randrange(max(self.days, 1) * 86400))
+
+    def record(self) -> Dict[str, Any]:
+        """One record in the shape consumed by :func:`persist_records`."""
+        city, lat, lng = self._location()
+        answers = []
+        for question_id, option_ids, text in self._answers():
+            if option_ids:
+                answers.extend((question_id, oid, None) for oid in option_ids)
+            else:
+                answers.append((question_id, None, text))
+        return self._record(city, lat, lng, self._occurred_at(), answers)
+
+    def records(self, n: int) -> List[Dict[str, Any]]:
+        """``n`` records, drawing each question's answers for the whole batch at once."""
+        rng = self.rng
+        cities = rng.choices(self.cities, k=n)
+        answers: List[List[tuple]] = [[] for _ in range(n)]
+        for question_id, question_type, option_ids in self.questions:
+            if question_type == Question.TEXT or not option_ids:
+                for row, number in zip(answers, rng.choices(range(1_000_000), k=n)):
+                    row.append((question_id, None, f'Resposta {number}'))
+            elif question_type == Question.SINGLE_CHOICE:
+                for row, oid in zip(answers, rng.choices(option_ids, k=n)):
+                    row.append((question_id, oid, None))
+            else:
+                sizes = rng.choices(range(1, min(3, len(option_ids)) + 1), k=n)
+                for row, k in zip(answers, sizes):
+                    row.extend((question_id, oid, None) for oid in rng.sample(option_ids, k))
+
+        seconds = rng.choices(range(max(self.days, 1) * 86400), k=n)
+        now = timezone.now()
+        return [
+            self._record(
+                city,
+                Decimal(f'{city[2] + rng.uniform(-COORD_JITTER, COORD_JITTER):.6f}'),
+                Decimal(f'{city[3] + rng.uniform(-COORD_JITTER, COORD_JITTER):.6f}'),
+                now - timedelta(seconds=offset),
+                row,
+            )
+            for city, offset, row in zip(cities, seconds, answers)
+        ]
+
+    def _record(self, city: tuple, lat: Decimal, lng: Decimal, occurred_at, answers: List[tuple]) -> Dict[str, Any]:
+        definition = self.definition
+        return {
+            'survey_id': definition.id,
+            'company_id': definition.company_id,
+            'survey_token': definition.token,
+            'occurred_at': occurred_at,
+            'latitude': lat,
+            'longitude': lng,
+            'city_id': city[0],
+            'state_id': city[1],
+            'ip_address': f'10.{self.rng.randint(0, 255)}.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}',
+            'user_agent': USER_AGENT,
+            'answers': answers,
+        }
+
+    def payload(self) -> Dict[str, Any]:
+        """One request body for ``POST /api/v1/answers/submit/``."""
+        city, lat, lng = self._location()
+        answers = []
+        for question_id, option_ids, text in self._answers():
+            if option_ids:
+                answers.append({'question_id': question_id, 'option_ids': option_ids})
+            else:
+                answers.append({'question_id': question_id, 'text_response': text})
+        return {
+            'token': self.definition.token,
+            'occurred_at': self._occurred_at().isoformat(),
+            'latitude': str(lat),
+            'longitude': str(lng),
+            'ibge_code': city[4],
+            'state_code': city[5],
+            'answers': answers,
+        }
+
+
+def generate_submissions(factory: SubmissionFactory, count: int, batch_size: int = 1000) -> Iterator[int]:
+    """Insert ``count`` submissions through ``persist_records``, yielding the running total after each batch."""
+    created = 0
+    while created < count:
+        n = min(batch_size, count - created)
+        persist_records([factory.record() for _ in range(n)])
+        created += n
+        yield created
+
+
+def bulk_load(
+    factory: SubmissionFactory,
+    count: int,
+    batch_size: int = 5000,
+    use_copy: bool | None = None,
+    update_rollups: bool = True,
+) -> Iterator[int]:
+    """Insert ``count`` submissions with raw batch writes, yielding the running total after each batch.
+
+    Submissions go through ``bulk_create`` (their ids are needed); answers are
+    written with ``COPY`` on PostgreSQL (``use_copy`` defaults to that) or a
+    single ``executemany`` otherwise, skipping model instantiation. Rollups are
+    updated from the generated rows unless ``update_rollups`` is False, in which
+    case the caller must ``rollups.rebuild()`` the survey afterwards.
+    """
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+    created = 0
+    while created < count:
+        n = min(batch_size, count - created)
+        with transaction.atomic():
+            _load_batch(factory.records(n), use_copy, update_rollups)
+        created += n
+        yield created
+
+
+def _load_batch(records: List[Dict[str, Any]], use_copy: bool, update_rollups: bool) -> None:
+    submissions = Submission.objects.bulk_create([
+        Submission(
+            survey_id=record['survey_id'],
+            company_id=record['company_id'],
+            survey_token=record['survey_token'],
+            occurred_at=record['occurred_at'],
+            latitude=record['latitude'],
+            longitude=record['longitude'],
+            city_id=record['city_id'],
+            state_id=record['state_id'],
+            ip_address=record['ip_address'],
+            user_agent=record['user_agent'],
+        )
+        for record in records
+    ])
+
+    created_at = timezone.now()
+    rows: List[tuple] = []
+    deltas: Counter = Counter()
+    for submission, record in zip(submissions, records):
+        day = submission.submitted_at.date()
+        for question_id, option_id, text_response in record['answers']:
+            rows.append((
+                submission.pk, question_id, option_id, text_response,
+                submission.survey_id, submission.state_id, submission.city_id, submission.submitted_at, created_at,
+            ))
+            if option_id and update_rollups:
+                deltas[(
+                    submission.survey_id, question_id, option_id,
+                    submission.state_id, submission.city_id, day,
+                )] += 1
+
+    if use_copy:
+        _copy_answers(rows)
+    else:
+        _insert_answers(rows)
+    rollups.apply_deltas(deltas)
+
+
+def _answer_columns() -> List[str]:
+    opts = SubmissionAnswer._meta
+    return [
+        opts.get_field(name).column
+        for name in (
+            'submission', 'question', 'selected_option', 'text_response',
+            'survey', 'state', 'city', 'submitted_at', 'created_at',
+        )
+    ]
+
+
+def _insert_answers(rows: List[tuple]) -> None:
+    qn = connection.ops.quote_name
+    columns = _answer_columns()
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        qn(SubmissionAnswer._meta.db_table),
+        ', '.join(qn(c) for c in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    created_at = adapt(rows[0][-1]) if rows else None
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [row[:7] + (adapt(row[7]), created_at) for row in rows])
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _copy_answers(rows: List[tuple]) -> None:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(v) for v in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    qn = connection.ops.quote_name
+    sql = 'COPY {} ({}) FROM STDIN'.format(
+        qn(SubmissionAnswer._meta.db_table),
+        ', '.join(qn(c) for c in _answer_columns()),
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
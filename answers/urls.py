@@ -3,13 +3,20 @@ from . import views
 
 
 urlpatterns = [
-    path('api/v1/answers/submit/', views.submit_answers, name='answers_submit'),
+    path('api/v1/answers/submit/', views.submit_answers_async, name='answers_submit'),
+    path('api/v1/answers/submit/bulk/', views.submit_answers_bulk, name='answers_submit_bulk'),
+    path('api/v1/answers/receipts/<str:receipt>/', views.ingest_receipt, name='answers_ingest_receipt'),
     path('answers/', views.surveys_index, name='answers_summary'),
     path('answers/<int:survey_id>/dashboard/', views.survey_dashboard, name='answers_dashboard'),
     path('answers/<int:survey_id>/test-csv/', views.test_csv_export, name='test_csv_export'),
     path('answers/<int:survey_id>/', views.submissions_detail, name='answers_detail'),
     path('answers/<int:survey_id>/delete/<int:submission_id>/', views.delete_submission, name='answers_delete_submission'),
     path('answers/<int:survey_id>/cities/', views.get_cities_for_state, name='answers_get_cities'),
+    path('answers/<int:survey_id>/heat/', views.survey_heat, name='answers_heat'),
+    path('answers/<int:survey_id>/exports/', views.export_jobs, name='answers_export_jobs'),
+    path('answers/<int:survey_id>/purges/', views.purge_jobs, name='answers_purge_jobs'),
+    path('answers/exports/<int:job_id>/status/', views.export_job_status, name='answers_export_status'),
+    path('answers/exports/<int:job_id>/download/', views.export_job_download, name='answers_export_download'),
 ]
 
 
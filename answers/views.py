@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import IntegrityError, transaction
 from django.db.models import Count, Q
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, render, redirect
@@ -9,17 +11,38 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from io import BytesIO
 import json
+import os
 
-from rest_framework.decorators import api_view, permission_classes
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from rest_framework.decorators import api_view, parser_classes, permission_classes, renderer_classes
+from rest_framework.exceptions import (
+	APIException, AuthenticationFailed, NotAcceptable, NotAuthenticated, ValidationError,
+)
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
 
 from companies.models import Company
+from surveys.cache import aget_compiled_survey
 from surveys.models import Survey, Question
-from .models import State, City, Submission, SubmissionAnswer
-from .serializers import SubmissionCreateSerializer, SubmissionResponseSerializer
-from .schema import submit_answers_schema
+from .models import State, City, Submission, SubmissionAnswer, ExportJob, PurgeJob, IngestReceipt
+from .serializers import IngestReceiptSerializer, SubmissionCreateSerializer, SubmissionResponseSerializer
+from .schema import ingest_receipt_schema, submit_answers_bulk_schema, submit_answers_schema
+from .ingest import build_record, persist_records
+from .parsers import BINARY_PARSER_CLASSES, CompressedJSONParser, CompressedNDJSONParser
+from .renderers import API_RENDERER_CLASSES
+from .exports import filter_submissions, iter_dashboard_csv_rows, ranged_file_response, stream_csv
+from . import heat, idempotency, purge
+from .gazetteer import aget_gazetteer
+from .spool import get_spool, pending_receipt, recently_issued
+from .distributions import compute_distributions, distributions_to_json
+from .pagination import KeysetPaginator, parse_page_size
 
 
 def test_csv_export(request, survey_id: int):
@@ -40,6 +63,8 @@ def test_csv_export(request, survey_id: int):
 
 @submit_answers_schema
 @api_view(['POST'])
+@parser_classes([CompressedJSONParser, *BINARY_PARSER_CLASSES, FormParser, MultiPartParser])
+@renderer_classes(API_RENDERER_CLASSES)
 @permission_classes([IsAuthenticated])
 def submit_answers(request):
 	"""
@@ -47,12 +72,273 @@ def submit_answers(request):
 	
 	Authentication: Basic Auth (username/password) or Bearer Token (legacy JWT)
 	The authentication is handled by CompanyAccountAuthentication or JWTAuthentication.
+
+	The URL is served by :func:`submit_answers_async`; this view defines the
+	documented contract and can be routed instead on WSGI-only deployments.
 	"""
+	company_id = request.user.company.id
+	key = idempotency.get_key(request, request.data)
+	original = _original_response(company_id, key) if key else None
+	if original is not None:
+		return Response(original[1], status=original[0], headers=REPLAYED_HEADERS)
 	serializer = SubmissionCreateSerializer(data=request.data, context={'request': request})
 	if not serializer.is_valid():
 		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-	submission = serializer.save()
-	return Response(SubmissionResponseSerializer(submission).data, status=status.HTTP_201_CREATED)
+	status_code, data = _create_submission(build_record(serializer.validated_data, request, key), company_id, key)
+	return Response(data, status=status_code)
+
+
+# Marks a repeated submit answered with the stored response
+REPLAYED_HEADERS = {'Idempotent-Replayed': 'true'}
+
+# A question, option or city the payload referenced was deleted after it was validated
+STALE_REFERENCE_RESPONSE = (
+	status.HTTP_400_BAD_REQUEST,
+	{'detail': 'A pesquisa foi alterada durante o envio; busque-a novamente e reenvie.'},
+)
+
+
+def _original_response(company_id: int, key: str) -> idempotency.StoredResponse | None:
+	"""Response to an earlier submit with ``key``; spooled submits never read the database."""
+	if not settings.INGEST_SPOOL_ENABLED:
+		return idempotency.lookup(company_id, key)
+	original = idempotency.recent_responses.get(company_id, key)
+	if original is None:
+		spooled = get_spool().find(company_id, key)
+		if spooled is not None:
+			original = (status.HTTP_202_ACCEPTED, pending_receipt(spooled.receipt))
+	return original
+
+
+def _create_submission(record: dict, company_id: int, key: str | None) -> idempotency.StoredResponse:
+	"""Store (or spool) ``record`` and its idempotency key; returns the response status and body."""
+	if settings.INGEST_SPOOL_ENABLED:
+		response = (status.HTTP_202_ACCEPTED, pending_receipt(get_spool().append(record)))
+	else:
+		try:
+			with transaction.atomic():
+				submission = persist_records([record])[0]
+				response = (status.HTTP_201_CREATED, dict(SubmissionResponseSerializer(submission).data))
+				if key:
+					idempotency.store([(company_id, key, submission.pk, response)])
+		except IntegrityError:
+			# A concurrent copy of this submit stored the key first, or a reference went away
+			original = idempotency.lookup(company_id, key) if key else None
+			return original or STALE_REFERENCE_RESPONSE
+	idempotency.remember(company_id, key, response)
+	return response
+
+
+def _api_response(data, status_code: int, headers: dict | None = None, renderer=None) -> HttpResponse:
+	renderer = renderer or JSONRenderer()
+	return HttpResponse(
+		renderer.render(data),
+		status=status_code,
+		content_type=renderer.media_type,
+		headers=headers,
+	)
+
+
+def _api_error_response(exc: APIException, drf_request: Request, renderer=None) -> HttpResponse:
+	"""Render ``exc`` like DRF's ``APIView.handle_exception`` would."""
+	status_code = exc.status_code
+	headers = None
+	if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+		auth_header = drf_request.authenticators[0].authenticate_header(drf_request)
+		if auth_header:
+			headers = {'WWW-Authenticate': auth_header}
+		else:
+			status_code = status.HTTP_403_FORBIDDEN
+	data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+	return _api_response(data, status_code, headers, renderer)
+
+
+@csrf_exempt
+async def submit_answers_async(request):
+	"""
+	Async version of :func:`submit_answers`, served at the same URL.
+
+	Under ASGI (``app.asgi``) the body of a slow upload is read by the event
+	loop before the view runs, so waiting clients do not hold a thread. The
+	payload is parsed in a worker thread, then validated on the loop against the
+	cached survey definition and gazetteer (looked up first, off the loop only
+	on a cache miss), while authentication and the insert transaction run
+	through ``sync_to_async``.
+	Same parsers, renderers, authentication, errors and responses as
+	:func:`submit_answers`.
+	"""
+	if request.method != 'POST':
+		return _api_response(
+			{'detail': f'Method "{request.method}" not allowed.'},
+			status.HTTP_405_METHOD_NOT_ALLOWED,
+			{'Allow': 'POST, OPTIONS'},
+		)
+	drf_request = Request(
+		request,
+		parsers=[parser() for parser in submit_answers.cls.parser_classes],
+		authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+	)
+	try:
+		renderer, _ = drf_request.negotiator.select_renderer(
+			drf_request, [renderer_class() for renderer_class in submit_answers.cls.renderer_classes],
+		)
+	except NotAcceptable as exc:
+		# Like APIView, report it in the default format
+		return _api_error_response(exc, drf_request)
+	try:
+		user = await sync_to_async(lambda: drf_request.user)()
+		if not (user and user.is_authenticated):
+			raise NotAuthenticated()
+		# Parsing and decompressing up to API_MAX_DECOMPRESSED_BODY_SIZE would stall
+		# every other request on the loop; it touches no database, so any thread will do
+		data = await sync_to_async(lambda: drf_request.data, thread_sensitive=False)()
+		key = idempotency.get_key(request, data)
+	except APIException as exc:
+		return _api_error_response(exc, drf_request, renderer)
+
+	company_id = user.company.id
+	if key:
+		original = idempotency.recent_responses.get(company_id, key)
+		if original is None:
+			original = await sync_to_async(_original_response)(company_id, key)
+		if original is not None:
+			return _api_response(original[1], original[0], REPLAYED_HEADERS, renderer)
+
+	prefetched = {}
+	token = data.get('token') if isinstance(data, dict) else None
+	if isinstance(token, (str, int, float)) and not isinstance(token, bool):
+		# Same normalization as the serializer's CharField
+		token = str(token).strip()
+		prefetched[token] = await aget_compiled_survey(token)
+	serializer = SubmissionCreateSerializer(data=data, context={
+		'request': drf_request,
+		'compiled_surveys': prefetched,
+		'gazetteer': await aget_gazetteer(),
+	})
+	if not serializer.is_valid():
+		return _api_response(serializer.errors, status.HTTP_400_BAD_REQUEST, renderer=renderer)
+	record = build_record(serializer.validated_data, drf_request, key)
+	# Transactions cannot span async ORM calls: the inserts and rollups run in one sync block
+	status_code, body = await sync_to_async(_create_submission)(record, company_id, key)
+	return _api_response(body, status_code, renderer=renderer)
+
+
+# drf-spectacular only lists DRF views: document the async view with submit_answers
+submit_answers_async.cls = submit_answers.cls
+submit_answers_async.initkwargs = submit_answers.initkwargs
+
+
+@submit_answers_bulk_schema
+@api_view(['POST'])
+@parser_classes([CompressedJSONParser, CompressedNDJSONParser, *BINARY_PARSER_CLASSES])
+@renderer_classes(API_RENDERER_CLASSES)
+@permission_classes([IsAuthenticated])
+def submit_answers_bulk(request):
+	"""
+	Submit many submissions in one request (JSON array or NDJSON).
+
+	Items are validated one by one; all valid items are inserted together and
+	the response lists the outcome of each item by its index. Items repeating
+	the ``client_submission_id`` of an earlier submission (or of a previous
+	item) are not inserted again and report the first response.
+	"""
+	items = request.data
+	if not isinstance(items, list):
+		return Response({'detail': 'expected a list of submissions'}, status=status.HTTP_400_BAD_REQUEST)
+	if len(items) > settings.BULK_SUBMIT_MAX_ITEMS:
+		return Response(
+			{'detail': f'at most {settings.BULK_SUBMIT_MAX_ITEMS} submissions per request'},
+			status=status.HTTP_400_BAD_REQUEST,
+		)
+
+	company_id = request.user.company.id
+	results: list[dict] = []
+	keys: dict[int, str] = {}
+	for index, item in enumerate(items):
+		try:
+			key = idempotency.payload_key(item)
+		except ValidationError as exc:
+			results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': exc.detail})
+			continue
+		if key:
+			keys[index] = key
+	originals = idempotency.lookup_many(company_id, keys.values())
+
+	valid: list[tuple[int, dict]] = []
+	first_index: dict[str, int] = {}
+	repeats: list[tuple[int, str]] = []
+	invalid_keys = {r['index'] for r in results}
+	for index, item in enumerate(items):
+		if index in invalid_keys:
+			continue
+		key = keys.get(index)
+		if key is not None and (key in originals or key in first_index):
+			repeats.append((index, key))
+			continue
+		serializer = SubmissionCreateSerializer(data=item, context={'request': request})
+		if serializer.is_valid():
+			valid.append((index, build_record(serializer.validated_data, request, key)))
+			if key is not None:
+				first_index[key] = index
+		else:
+			results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors})
+
+	created: dict[int, idempotency.StoredResponse] = {}
+	try:
+		with transaction.atomic():
+			submissions = persist_records([record for _, record in valid]) if valid else []
+			keyed = []
+			for (index, record), submission in zip(valid, submissions):
+				created[index] = (status.HTTP_201_CREATED, dict(SubmissionResponseSerializer(submission).data))
+				if record['idempotency_key']:
+					keyed.append((company_id, record['idempotency_key'], submission.pk, created[index]))
+			idempotency.store(keyed)
+	except IntegrityError:
+		if not idempotency.lookup_many(company_id, first_index):
+			status_code, data = STALE_REFERENCE_RESPONSE
+			return Response(data, status=status_code)
+		return Response(
+			{'detail': 'a concurrent request sent the same client_submission_id; retry this request'},
+			status=status.HTTP_409_CONFLICT,
+		)
+	for key, index in first_index.items():
+		idempotency.remember(company_id, key, created[index])
+
+	for index, (status_code, data) in created.items():
+		results.append({'index': index, 'status': status_code, **data})
+	for index, key in repeats:
+		status_code, data = originals[key] if key in originals else created[first_index[key]]
+		# A spooled original has its own 'status' field in data
+		results.append({**data, 'index': index, 'status': status_code})
+	results.sort(key=lambda r: r['index'])
+	return Response({
+		'created': len(created),
+		'replayed': len(repeats),
+		'failed': len(items) - len(created) - len(repeats),
+		'results': results,
+	})
+
+
+@ingest_receipt_schema
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ingest_receipt(request, receipt: str):
+	"""Outcome of a submission accepted into the ingest spool."""
+	company_id = request.user.company.id
+	stored = IngestReceipt.objects.filter(receipt=receipt, company_id=company_id).first()
+	if stored is not None:
+		if stored.submission_id is None:
+			data = {'receipt': receipt, 'status': IngestReceiptSerializer.STATUS_FAILED, 'error': stored.error}
+		else:
+			data = {'receipt': receipt, 'status': IngestReceiptSerializer.STATUS_STORED, 'submission_id': stored.submission_id}
+		return Response(data)
+	spooled = get_spool().get(receipt)
+	if spooled is not None and spooled.record['company_id'] == company_id:
+		return Response(pending_receipt(receipt))
+	if recently_issued(receipt):
+		# Probably still in the spool of the server that accepted it
+		return Response(pending_receipt(receipt))
+	return Response({'detail': 'Recibo não encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
 
 
@@ -94,14 +380,14 @@ def surveys_index(request):
 @login_required
 def submissions_detail(request, survey_id: int):
     survey = get_object_or_404(Survey.objects.select_related('company'), id=survey_id)
-    # Load submissions and group answers per submission
-    submissions = Submission.objects.filter(survey=survey)
     # Bulk delete handling
     if request.method == 'POST' and request.POST.get('action') == 'bulk_delete':
         ids = request.POST.getlist('selected_ids')
-        Submission.objects.filter(survey=survey, id__in=ids).delete()
+        purge.delete_submissions(
+            Submission.objects.filter(survey=survey, id__in=ids).values_list('id', flat=True)
+        )
         params = []
-        for key in ('from', 'to', 'state', 'city', 'page', 'page_size'):
+        for key in ('from', 'to', 'state', 'city', 'cursor', 'page_size'):
             val = request.POST.get(key)
             if val:
                 params.append(f"{key}={val}")
@@ -119,24 +405,21 @@ def submissions_detail(request, survey_id: int):
         cities = _get_cities_with_submissions(survey_id, int(selected_state_id))
     
     # Apply filters
-    date_from = request.GET.get('from')
-    date_to = request.GET.get('to')
-    if date_from:
-        submissions = submissions.filter(submitted_at__date__gte=date_from)
-    if date_to:
-        submissions = submissions.filter(submitted_at__date__lte=date_to)
-    if selected_state_id:
-        submissions = submissions.filter(state_id=selected_state_id)
-    if selected_city_id:
-        submissions = submissions.filter(city_id=selected_city_id)
-    
-    submissions = submissions.order_by('-submitted_at')
-    paginator = Paginator(submissions, 15)
-    submissions_page = paginator.get_page(request.GET.get('page'))
+    submissions = filter_submissions(survey, {
+        'from': request.GET.get('from'),
+        'to': request.GET.get('to'),
+        'state': selected_state_id,
+        'city': selected_city_id,
+    })
+
+    # Keyset pagination: constant time on any page, no COUNT(*) of the whole set
+    page_size = parse_page_size(request.GET.get('page_size'))
+    paginator = KeysetPaginator(submissions.select_related('state', 'city'), page_size)
+    submissions_page = paginator.get_page(request.GET.get('cursor'))
     answers_by_submission: dict[int, list[SubmissionAnswer]] = {}
     answers = (
         SubmissionAnswer.objects
-        .filter(submission__in=submissions_page)
+        .filter(submission__in=[sub.id for sub in submissions_page])
         .select_related('question', 'selected_option', 'submission')
         .order_by('question_id', 'id')
     )
@@ -206,7 +489,7 @@ def submissions_detail(request, survey_id: int):
         'cities': cities,
         'selected_state_id': selected_state_id,
         'selected_city_id': selected_city_id,
-        'extra_query': _build_extra_query(request, exclude_keys={'page'}),
+        'extra_query': _build_extra_query(request, exclude_keys={'cursor'}),
     })
 
 
@@ -237,59 +520,23 @@ def survey_dashboard(request, survey_id: int):
     # Check for export format
     fmt = request.GET.get('format')
     if fmt == 'csv':
-        import csv
-        resp = HttpResponse(content_type='text/csv; charset=utf-8')
+        # Stream rows as they are pivoted so memory stays flat for large surveys
+        rows = iter_dashboard_csv_rows(survey, submissions_qs)
+        resp = StreamingHttpResponse(stream_csv(rows), content_type='text/csv; charset=utf-8')
         resp['Content-Disposition'] = f'attachment; filename="dashboard_{survey.title}_{survey_id}.csv"'
         resp['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         resp['Pragma'] = 'no-cache'
         resp['Expires'] = '0'
-        writer = csv.writer(resp)
-        
-        # Get all questions for this survey
-        questions = Question.objects.filter(survey=survey).order_by('id')
-        
-        # Create header with basic info + all questions
-        header = ['Submission ID', 'Submitted At', 'IP Address', 'State', 'City', 'Latitude', 'Longitude']
-        for q in questions:
-            header.append(f'Q{q.id}: {q.question_text}')
-        writer.writerow(header)
-        
-        # Get all answers for submissions
-        answers_by_submission = {}
-        for ans in SubmissionAnswer.objects.filter(
-            submission__in=submissions_qs
-        ).select_related('question', 'selected_option'):
-            if ans.submission_id not in answers_by_submission:
-                answers_by_submission[ans.submission_id] = {}
-            answers_by_submission[ans.submission_id][ans.question_id] = ans
-        
-        # Write submissions data
-        for sub in submissions_qs.select_related('state', 'city'):
-            row = [
-                sub.id,
-                sub.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if sub.submitted_at else '',
-                sub.ip_address or '',
-                sub.state.name if sub.state else '',
-                sub.city.name if sub.city else '',
-                sub.latitude or '',
-                sub.longitude or '',
-            ]
-            
-            # Add answers for each question
-            for q in questions:
-                answer = answers_by_submission.get(sub.id, {}).get(q.id)
-                if answer:
-                    if answer.selected_option_id:
-                        answer_text = answer.selected_option.option_text
-                    else:
-                        answer_text = answer.text_response or ''
-                else:
-                    answer_text = ''
-                row.append(answer_text)
-            
-            writer.writerow(row)
         return resp
     
+    if fmt == 'distributions':
+        distributions = compute_distributions(survey, selected_state_id, selected_city_id)
+        return JsonResponse({
+            'survey_id': survey.id,
+            'total_submissions': total_submissions,
+            'questions': distributions_to_json(distributions),
+        })
+
     if fmt == 'json':
         data = []
         
@@ -328,48 +575,17 @@ def survey_dashboard(request, survey_id: int):
             data.append(submission_data)
         return JsonResponse(data, safe=False)
 
-    # Collect geo points for heatmap
-    geo_points = []
-    for sub in submissions_qs.exclude(
-        latitude__isnull=True
-    ).exclude(
-        longitude__isnull=True
-    ).only('latitude', 'longitude'):
-        try:
-            lat = float(sub.latitude)
-            lng = float(sub.longitude)
-            geo_points.append({
-                'lat': lat,
-                'lng': lng,
-                'intensity': 1.0  # Fixed intensity for each point
-            })
-        except (TypeError, ValueError):
-            continue
+    # The heat map itself is loaded from answers_heat; only check there is something to show
+    has_geo_points = submissions_qs.filter(latitude__isnull=False, longitude__isnull=False).exists()
 
-    distributions = []
-    for q in Question.objects.filter(survey=survey).order_by('id'):
-        if q.question_type in (Question.MULTIPLE_CHOICE, Question.SINGLE_CHOICE):
-            # Apply same filters to answers
-            answers_qs = SubmissionAnswer.objects.filter(question=q, selected_option__isnull=False)
-            if selected_state_id:
-                answers_qs = answers_qs.filter(submission__state_id=selected_state_id)
-            if selected_city_id:
-                answers_qs = answers_qs.filter(submission__city_id=selected_city_id)
-            
-            opts = (
-                answers_qs
-                .values('selected_option_id', 'selected_option__option_text')
-                .annotate(total=Count('id'))
-                .order_by('-total')
-            )
-            distributions.append({'question': q, 'options': list(opts)})
+    distributions = compute_distributions(survey, selected_state_id, selected_city_id)
     
     return render(request, 'answers/survey_dashboard.html', {
         'survey': survey,
         'total_submissions': total_submissions,
         'last_submission': last_submission,
         'distributions': distributions,
-        'geo_points': geo_points,
+        'has_geo_points': has_geo_points,
         'states': states,
         'cities': cities,
         'selected_state_id': selected_state_id,
@@ -380,10 +596,10 @@ def survey_dashboard(request, survey_id: int):
 def delete_submission(request, survey_id: int, submission_id: int):
     submission = get_object_or_404(Submission, id=submission_id, survey_id=survey_id)
     if request.method == 'POST':
-        submission.delete()
+        purge.delete_submissions([submission.pk])
         # Preserve filters and pagination
         params = []
-        for key in ('from', 'to', 'page', 'page_size'):
+        for key in ('from', 'to', 'state', 'city', 'cursor', 'page_size'):
             val = request.POST.get(key)
             if val:
                 params.append(f"{key}={val}")
@@ -393,6 +609,107 @@ def delete_submission(request, survey_id: int, submission_id: int):
     return redirect('answers_detail', survey_id=survey_id)
 
 
+@login_required
+@require_http_methods(["GET", "POST"])
+def export_jobs(request, survey_id: int):
+    """List background exports for a survey; POST queues a new one with the current filters."""
+    survey = get_object_or_404(Survey.objects.select_related('company'), id=survey_id)
+    if request.method == 'POST':
+        kind = request.POST.get('kind')
+        export_format = request.POST.get('format')
+        if kind not in dict(ExportJob.KIND_CHOICES) or export_format not in dict(ExportJob.FORMAT_CHOICES):
+            return HttpResponse('Tipo ou formato de exportação inválido', status=400)
+        filters = {
+            key: request.POST.get(key)
+            for key in ('state', 'city', 'from', 'to')
+            if request.POST.get(key)
+        }
+        ExportJob.objects.create(
+            survey=survey,
+            requested_by=request.user,
+            kind=kind,
+            export_format=export_format,
+            filters=filters,
+        )
+        return redirect('answers_export_jobs', survey_id=survey_id)
+
+    jobs = ExportJob.objects.filter(survey=survey)[:50]
+    return render(request, 'answers/export_jobs.html', {
+        'survey': survey,
+        'jobs': jobs,
+    })
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def purge_jobs(request, survey_id: int):
+    """List background purges for a survey; POST queues deletion of the submissions matching the current filters."""
+    survey = get_object_or_404(Survey.objects.select_related('company'), id=survey_id)
+    if request.method == 'POST':
+        filters = {
+            key: request.POST.get(key)
+            for key in ('state', 'city', 'from', 'to')
+            if request.POST.get(key)
+        }
+        PurgeJob.objects.create(survey=survey, requested_by=request.user, filters=filters)
+        return redirect('answers_purge_jobs', survey_id=survey_id)
+
+    jobs = PurgeJob.objects.filter(survey=survey)[:50]
+    return render(request, 'answers/purge_jobs.html', {
+        'survey': survey,
+        'jobs': jobs,
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_job_status(request, job_id: int):
+    """AJAX endpoint reporting the progress of an export job."""
+    job = get_object_or_404(ExportJob, id=job_id)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'processed': job.processed,
+        'total': job.total,
+        'file_size': job.file_size,
+        'error': job.error,
+        'download_url': reverse('answers_export_download', args=[job.id]) if job.status == ExportJob.STATUS_DONE else None,
+    })
+
+
+@login_required
+@require_http_methods(["GET", "HEAD"])
+def export_job_download(request, job_id: int):
+    """Serve a finished export with HTTP Range support so downloads can be resumed."""
+    job = get_object_or_404(ExportJob, id=job_id, status=ExportJob.STATUS_DONE)
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise Http404('Arquivo de exportação não encontrado')
+    content_type = 'text/csv; charset=utf-8' if job.export_format == ExportJob.FORMAT_CSV else 'application/json'
+    return ranged_file_response(request, job.file_path, job.filename, content_type)
+
+
+@login_required
+def survey_heat(request, survey_id: int):
+    """Heat map cells of the dashboard, binned server-side for a Leaflet zoom level.
+
+    Query params: ``zoom``, ``bbox`` (``south,west,north,east``), ``state``, ``city``.
+    """
+    survey = get_object_or_404(Survey, id=survey_id)
+    filters = {'state': request.GET.get('state'), 'city': request.GET.get('city')}
+    for name, value in filters.items():
+        if value and not value.isdecimal():
+            return JsonResponse({'detail': f'{name} inválido'}, status=400)
+    submissions_qs = Submission.objects.filter(survey=survey)
+    if filters['state']:
+        submissions_qs = submissions_qs.filter(state_id=filters['state'])
+    if filters['city']:
+        submissions_qs = submissions_qs.filter(city_id=filters['city'])
+    zoom = heat.clamp_zoom(request.GET.get('zoom'))
+    bbox = heat.parse_bbox(request.GET.get('bbox'))
+    return JsonResponse(heat.survey_heat(survey, submissions_qs, zoom, filters, bbox))
+
+
 def _build_extra_query(request, exclude_keys: set[str] | None = None) -> str:
     exclude_keys = exclude_keys or set()
     parts = []
@@ -438,57 +755,15 @@ def get_cities_for_state(request, survey_id: int):
     })
 
 
-def _build_heat_grid(points: list[tuple[float, float]], rows: int, cols: int) -> dict:
+def _build_heat_grid(points: list[tuple[float, float]], rows: int, cols: int, weights=None) -> dict:
     """Bucket lat/lon points into a rows x cols grid and compute counts and colors.
 
     Returns dict with: { 'rows': [[{'count': int, 'color': '#rrggbb'}, ...], ...], 'max': int }
+    See ``heat.build_grid`` to pass latitude/longitude arrays directly.
     """
-    if not points:
-        return {'rows': [[{'count': 0, 'color': '#ffffff'} for _ in range(cols)] for _ in range(rows)], 'max': 0}
-
-    lats = [p[0] for p in points]
-    lons = [p[1] for p in points]
-    min_lat, max_lat = min(lats), max(lats)
-    min_lon, max_lon = min(lons), max(lons)
-
-    # Avoid zero span
-    if max_lat - min_lat == 0:
-        max_lat += 0.0001
-        min_lat -= 0.0001
-    if max_lon - min_lon == 0:
-        max_lon += 0.0001
-        min_lon -= 0.0001
-
-    # Initialize grid counts
-    grid = [[0 for _ in range(cols)] for _ in range(rows)]
-    for lat, lon in points:
-        r = int((lat - min_lat) / (max_lat - min_lat) * (rows - 1))
-        c = int((lon - min_lon) / (max_lon - min_lon) * (cols - 1))
-        # Clamp just in case
-        r = max(0, min(rows - 1, r))
-        c = max(0, min(cols - 1, c))
-        grid[r][c] += 1
-
-    max_count = max(max(row) for row in grid) if points else 0
-
-    def color_for(value: int) -> str:
-        if max_count == 0:
-            return '#ffffff'
-        # Intensity 0..1 maps white -> red
-        t = value / max_count
-        r = 255
-        g = int(255 * (1.0 - t))
-        b = int(255 * (1.0 - t))
-        return f"#{r:02x}{g:02x}{b:02x}"
-
-    colored_rows: list[list[dict]] = []
-    for r in range(rows):
-        row_out: list[dict] = []
-        for c in range(cols):
-            val = grid[r][c]
-            row_out.append({'count': val, 'color': color_for(val)})
-        colored_rows.append(row_out)
-
-    return {'rows': colored_rows, 'max': max_count}
+    if not len(points):
+        return heat.build_grid((), (), rows, cols)
+    coords = np.asarray(points, dtype=np.float64)
+    return heat.build_grid(coords[:, 0], coords[:, 1], rows, cols, weights)
 
 
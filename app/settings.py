@@ -97,6 +97,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'app.wsgi.application'
+# ASGI entry point (e.g. uvicorn app.asgi:application): the submit endpoint is
+# async, so slow uploads wait on the event loop instead of holding a worker
+ASGI_APPLICATION = 'app.asgi.application'
 
 
 # Database
@@ -122,6 +125,61 @@ else:
     }
 
 
+# Cache
+# CACHE_URL selects the shared cache: redis://... (Redis), file:///path (file-based)
+# or empty for per-process local memory.
+
+_cache_url = os.getenv('CACHE_URL', '').strip()
+if _cache_url.startswith(('redis://', 'rediss://')):
+    _shared_cache = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': _cache_url,
+    }
+elif _cache_url.startswith('file://'):
+    _shared_cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': _cache_url[len('file://'):],
+    }
+else:
+    _shared_cache = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+
+CACHES = {
+    'default': _shared_cache,
+}
+
+# Compiled survey definitions (surveys.cache): seconds kept in the shared cache
+# and in each process before re-reading the shared cache.
+SURVEY_CACHE_TIMEOUT = int(os.getenv('SURVEY_CACHE_TIMEOUT', '3600'))
+SURVEY_CACHE_LOCAL_TTL = int(os.getenv('SURVEY_CACHE_LOCAL_TTL', '30'))
+# Seconds a process serves its copy before comparing it with the shared version
+# stamp; bounds how long other processes may validate against an edited survey.
+# The stamp reaches every process only through CACHE_URL; with the per-process
+# default cache, edits made in another worker or in the admin reach this one
+# only when its cached definition expires (up to SURVEY_CACHE_TIMEOUT).
+SURVEY_CACHE_VERSION_CHECK_INTERVAL = int(os.getenv('SURVEY_CACHE_VERSION_CHECK_INTERVAL', '1'))
+
+# Seconds between checks of the gazetteer version in the database (answers.gazetteer)
+GAZETTEER_VERSION_CHECK_INTERVAL = int(os.getenv('GAZETTEER_VERSION_CHECK_INTERVAL', '30'))
+# Seconds a binned dashboard heat map (answers.heat) stays cached
+HEAT_CACHE_TIMEOUT = int(os.getenv('HEAT_CACHE_TIMEOUT', '600'))
+
+# Submissions without IBGE codes get the municipality with the nearest seat
+# within this distance of their coordinates
+REVERSE_GEOCODE_MAX_KM = float(os.getenv('REVERSE_GEOCODE_MAX_KM', '150'))
+
+# Submission lists (answers.pagination) count at most this many rows; beyond
+# it the total is shown as an estimate
+PAGINATION_COUNT_CAP = int(os.getenv('PAGINATION_COUNT_CAP', '10000'))
+
+# Monthly partitioning of submissions and answers on PostgreSQL (answers.partitions),
+# maintained by the manage_partitions command. Retention 0 keeps every month.
+SUBMISSION_PARTITIONING = os.getenv('SUBMISSION_PARTITIONING', 'False') == 'True'
+SUBMISSION_PARTITIONS_AHEAD = int(os.getenv('SUBMISSION_PARTITIONS_AHEAD', '3'))
+SUBMISSION_RETENTION_MONTHS = int(os.getenv('SUBMISSION_RETENTION_MONTHS', '0'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -158,6 +216,9 @@ USE_TZ = False
 
 STATIC_URL = 'static/'
 
+# Background exports (answers.ExportJob) are rendered into this directory
+EXPORTS_ROOT = Path(os.getenv('EXPORTS_ROOT', BASE_DIR / 'exports'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -174,6 +235,43 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Verified API credentials are cached per process (companies.auth_cache) to skip
+# the password KDF on repeat requests. A TTL of 0 disables the cache. Revoking an
+# account or suspending a company reaches every process through CACHE_URL; with
+# the per-process default cache, other workers keep accepting the old
+# credentials for up to the TTL.
+API_AUTH_CACHE_TTL = int(os.getenv('API_AUTH_CACHE_TTL', '60'))
+API_AUTH_CACHE_MAX_ENTRIES = int(os.getenv('API_AUTH_CACHE_MAX_ENTRIES', '10000'))
+
+# API account usage (last_used_at, request_count) is buffered per process and
+# flushed every API_USAGE_FLUSH_INTERVAL seconds. 0 writes on every request.
+API_USAGE_FLUSH_INTERVAL = float(os.getenv('API_USAGE_FLUSH_INTERVAL', '10'))
+
+# Maximum number of submissions accepted by POST /api/v1/answers/submit/bulk/
+BULK_SUBMIT_MAX_ITEMS = int(os.getenv('BULK_SUBMIT_MAX_ITEMS', '5000'))
+# Largest submit body accepted once decompressed (Content-Encoding: gzip/zstd), in bytes
+API_MAX_DECOMPRESSED_BODY_SIZE = int(os.getenv('API_MAX_DECOMPRESSED_BODY_SIZE', str(20 * 1024 * 1024)))
+
+# Write-behind ingest (answers.spool): POST /api/v1/answers/submit/ appends the
+# validated submission to a local SQLite spool and answers 202 with a receipt;
+# flush_ingest_spool (cron) stores INGEST_SPOOL_BATCH_SIZE records per transaction.
+INGEST_SPOOL_ENABLED = os.getenv('INGEST_SPOOL_ENABLED', 'False') == 'True'
+INGEST_SPOOL_PATH = Path(os.getenv('INGEST_SPOOL_PATH', BASE_DIR / 'spool' / 'ingest.sqlite3'))
+INGEST_SPOOL_BATCH_SIZE = int(os.getenv('INGEST_SPOOL_BATCH_SIZE', '1000'))
+# Days receipts of spooled submissions stay available to GET /api/v1/answers/receipts/<id>/
+INGEST_RECEIPT_RETENTION_DAYS = int(os.getenv('INGEST_RECEIPT_RETENTION_DAYS', '7'))
+# Seconds an unknown receipt is reported as pending: with several servers, a
+# receipt stays in the spool of the one that accepted it until its next flush.
+INGEST_RECEIPT_PENDING_SECONDS = int(os.getenv('INGEST_RECEIPT_PENDING_SECONDS', '900'))
+
+# Idempotent submits (answers.idempotency): first responses are cached per process
+# for IDEMPOTENCY_CACHE_TTL seconds (0 disables the cache) and kept in the database
+# for IDEMPOTENCY_KEY_RETENTION_DAYS days. Deleting a submission drops its key; other
+# processes may still replay it from their cache until the TTL runs out.
+IDEMPOTENCY_CACHE_TTL = int(os.getenv('IDEMPOTENCY_CACHE_TTL', '600'))
+IDEMPOTENCY_CACHE_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_CACHE_MAX_ENTRIES', '10000'))
+IDEMPOTENCY_KEY_RETENTION_DAYS = int(os.getenv('IDEMPOTENCY_KEY_RETENTION_DAYS', '7'))
+
 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Question API',
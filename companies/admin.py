@@ -143,17 +143,17 @@ class CompanyAdmin(admin.ModelAdmin):
 
 @admin.register(CompanyAPIAccount)
 class CompanyAPIAccountAdmin(admin.ModelAdmin):
-	list_display = ('id', 'username', 'company', 'label', 'is_active', 'created_at', 'last_used_at')
+	list_display = ('id', 'username', 'company', 'label', 'is_active', 'created_at', 'last_used_at', 'request_count')
 	list_filter = ('is_active', 'company', 'created_at')
 	search_fields = ('username', 'label', 'company__name')
-	readonly_fields = ('created_at', 'updated_at', 'last_used_at', 'deactivated_at')
+	readonly_fields = ('created_at', 'updated_at', 'last_used_at', 'request_count', 'deactivated_at')
 	
 	fieldsets = (
 		('Informações da Conta', {
 			'fields': ('company', 'username', 'password', 'label')
 		}),
 		('Status', {
-			'fields': ('is_active', 'deactivated_at', 'last_used_at')
+			'fields': ('is_active', 'deactivated_at', 'last_used_at', 'request_count')
 		}),
 		('Informações do Sistema', {
 			'fields': ('created_at', 'updated_at'),
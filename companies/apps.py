@@ -7,7 +7,8 @@ class CompaniesConfig(AppConfig):
 	verbose_name = 'Empresas'
 	
 	def ready(self):
-		"""Import schema extensions when app is ready."""
+		"""Import schema extensions and signal handlers when app is ready."""
 		# Import to register the OpenAPI authentication extension
 		from . import schema  # noqa: F401
+		from . import signals  # noqa: F401
 
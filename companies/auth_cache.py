@@ -0,0 +1,114 @@
+"""Bounded TTL cache of verified API credentials.
+
+``CompanyAccountAuthentication`` would otherwise run a database lookup and a
+full PBKDF2 ``check_password`` on every request. After a successful check the
+account is remembered under a keyed BLAKE2 hash of (username, password), so
+repeated requests from the same device skip the KDF. The plain password is
+never stored. Entries expire after ``API_AUTH_CACHE_TTL`` seconds.
+
+Every process keeps its own entries, so revocations go through the shared
+cache: saving or deleting an account or its company bumps a generation counter
+there (see ``companies.signals``) and an entry is only used while both
+counters still match the ones it was stored with. That costs one shared cache
+read per hit. With the default per-process cache (no ``CACHE_URL``), other
+processes only notice a revocation when their entry expires.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _account_key(account_id: int) -> str:
+	return f'auth:account:{account_id}:generation'
+
+
+def _company_key(company_id: int) -> str:
+	return f'auth:company:{company_id}:generation'
+
+
+def _generations(account) -> tuple[int, int]:
+	"""Shared generation counters of ``account`` and its company."""
+	account_key, company_key = _account_key(account.pk), _company_key(account.company_id)
+	current = cache.get_many([account_key, company_key])
+	return current.get(account_key, 0), current.get(company_key, 0)
+
+
+def bump_account_generation(account_id: int) -> None:
+	"""Invalidate the cached credentials of an account in every process."""
+	# Time-based so a cache eviction never brings back an older generation
+	cache.set(_account_key(account_id), time.time_ns(), None)
+
+
+def bump_company_generation(company_id: int) -> None:
+	"""Invalidate the cached credentials of every account of a company in every process."""
+	cache.set(_company_key(company_id), time.time_ns(), None)
+
+
+class CredentialCache:
+	"""Thread-safe LRU of ``credential digest -> (expires_at, account, generations)``."""
+
+	def __init__(self, max_entries: int, ttl: float):
+		self.max_entries = max_entries
+		self.ttl = ttl
+		self._entries: 'OrderedDict[bytes, tuple[float, object, tuple[int, int]]]' = OrderedDict()
+		self._lock = threading.Lock()
+		self._key = hashlib.sha256(settings.SECRET_KEY.encode()).digest()
+
+	def _digest(self, username: str, password: str) -> bytes:
+		message = username.encode() + b'\0' + password.encode()
+		return hashlib.blake2b(message, key=self._key, digest_size=32).digest()
+
+	def get(self, username: str, password: str):
+		"""Return the cached account for these credentials, or ``None``."""
+		if not self.ttl:
+			return None
+		digest = self._digest(username, password)
+		with self._lock:
+			entry = self._entries.get(digest)
+			if entry is None:
+				return None
+			if entry[0] <= time.monotonic():
+				del self._entries[digest]
+				return None
+			self._entries.move_to_end(digest)
+		_, account, generations = entry
+		if _generations(account) != generations:
+			# Changed since it was cached, possibly by another process
+			self.invalidate_account(account.pk)
+			return None
+		return account
+
+	def put(self, username: str, password: str, account) -> None:
+		if not self.ttl:
+			return
+		digest = self._digest(username, password)
+		generations = _generations(account)
+		with self._lock:
+			self._entries[digest] = (time.monotonic() + self.ttl, account, generations)
+			self._entries.move_to_end(digest)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def invalidate_account(self, account_id: int) -> None:
+		with self._lock:
+			for digest in [d for d, (_, acc, _) in self._entries.items() if acc.pk == account_id]:
+				del self._entries[digest]
+
+	def invalidate_company(self, company_id: int) -> None:
+		with self._lock:
+			for digest in [d for d, (_, acc, _) in self._entries.items() if acc.company_id == company_id]:
+				del self._entries[digest]
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+
+
+credential_cache = CredentialCache(
+	max_entries=settings.API_AUTH_CACHE_MAX_ENTRIES,
+	ttl=settings.API_AUTH_CACHE_TTL,
+)
@@ -4,6 +4,7 @@ from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.hashers import check_password
 from django.utils import timezone
 
+from .auth_cache import credential_cache
 from .models import CompanyAPIAccount
 
 
@@ -30,6 +31,12 @@ class CompanyAccountAuthentication(BasicAuthentication):
 		Raises:
 			AuthenticationFailed: If credentials are invalid or account is inactive
 		"""
+		# Credentials verified recently skip the lookup and the password KDF
+		account = credential_cache.get(userid, password)
+		if account is not None:
+			self._check_status(account)
+			return self._authenticated(account)
+
 		try:
 			account = CompanyAPIAccount.objects.select_related('company').get(
 				username=userid
@@ -37,6 +44,17 @@ class CompanyAccountAuthentication(BasicAuthentication):
 		except CompanyAPIAccount.DoesNotExist:
 			raise AuthenticationFailed('Credenciais inválidas')
 
+		self._check_status(account)
+
+		# Verify password hash
+		if not check_password(password, account.password):
+			raise AuthenticationFailed('Credenciais inválidas')
+
+		credential_cache.put(userid, password, account)
+		return self._authenticated(account)
+
+	def _check_status(self, account: CompanyAPIAccount) -> None:
+		"""Reject inactive accounts and non-operational companies."""
 		# Check if account is active
 		if not account.is_active:
 			raise AuthenticationFailed('Conta desativada')
@@ -45,12 +63,9 @@ class CompanyAccountAuthentication(BasicAuthentication):
 		if not account.company.is_operational:
 			raise AuthenticationFailed('Empresa não está operacional')
 
-		# Verify password hash
-		if not check_password(password, account.password):
-			raise AuthenticationFailed('Credenciais inválidas')
-
-		# Update last used timestamp asynchronously to avoid performance impact
-		# We'll do this in a simple way without celery for now
+	def _authenticated(self, account: CompanyAPIAccount):
+		"""Build the (user, auth) pair for a verified account."""
+		# Buffered in memory and flushed in batches (see companies.usage)
 		account.mark_used()
 
 		# Create a pseudo-user object with company information
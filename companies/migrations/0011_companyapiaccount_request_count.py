@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0010_remove_company_logo_companyapiaccount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companyapiaccount',
+            name='request_count',
+            field=models.BigIntegerField(default=0, help_text='Total de requisições autenticadas com esta conta'),
+        ),
+    ]
@@ -327,6 +327,10 @@ class CompanyAPIAccount(models.Model):
 		blank=True,
 		help_text='Última vez que esta conta foi usada'
 	)
+	request_count = models.BigIntegerField(
+		default=0,
+		help_text='Total de requisições autenticadas com esta conta'
+	)
 
 	class Meta:
 		db_table = 'company_api_accounts'
@@ -351,7 +355,13 @@ class CompanyAPIAccount(models.Model):
 		self.save(update_fields=['is_active', 'deactivated_at', 'updated_at'])
 
 	def mark_used(self) -> None:
-		"""Update last_used_at timestamp."""
+		"""Record a use of this account.
+
+		The timestamp and request counter are buffered in memory and written in
+		batches by ``companies.usage``, so authentication does not write to the
+		database on the request path.
+		"""
+		from .usage import usage_tracker
 		self.last_used_at = timezone.now()
-		self.save(update_fields=['last_used_at'])
+		usage_tracker.record(self.pk, self.last_used_at)
 
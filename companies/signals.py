@@ -0,0 +1,36 @@
+"""Keep the verified-credential cache consistent with account and company changes."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth_cache import bump_account_generation, bump_company_generation, credential_cache
+from .models import Company, CompanyAPIAccount
+
+
+def _account_changed(account_id: int) -> None:
+	credential_cache.invalidate_account(account_id)
+	# Again after the commit, so no process re-caches the old row in between
+	bump_account_generation(account_id)
+	transaction.on_commit(lambda: bump_account_generation(account_id))
+
+
+@receiver(post_save, sender=CompanyAPIAccount)
+def api_account_saved(sender, instance, update_fields=None, **kwargs):
+	# Usage bookkeeping does not affect whether the credentials are valid
+	if update_fields and set(update_fields) <= {'last_used_at'}:
+		return
+	_account_changed(instance.pk)
+
+
+@receiver(post_delete, sender=CompanyAPIAccount)
+def api_account_deleted(sender, instance, **kwargs):
+	_account_changed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Company)
+def company_changed(sender, instance, **kwargs):
+	# Contract and payment status decide whether the company's accounts may authenticate
+	company_id = instance.pk
+	credential_cache.invalidate_company(company_id)
+	bump_company_generation(company_id)
+	transaction.on_commit(lambda: bump_company_generation(company_id))
@@ -0,0 +1,83 @@
+"""Coalesced usage tracking for API accounts.
+
+Every authenticated request used to run an ``UPDATE`` on its account row.
+Instead, :class:`UsageTracker` keeps the latest timestamp and a request count
+per account in memory and a daemon thread writes them in one batch every
+``API_USAGE_FLUSH_INTERVAL`` seconds; pending usage is also flushed when the
+process exits. ``.update()`` is used so the credential cache signal handlers
+are not triggered.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class UsageTracker:
+	"""Buffer of ``account_id -> (last_used_at, request_count)``."""
+
+	def __init__(self, interval: float):
+		self.interval = interval
+		self._pending: dict[int, tuple] = {}
+		self._lock = threading.Lock()
+		self._thread: threading.Thread | None = None
+		self._stop = threading.Event()
+
+	def record(self, account_id: int, used_at) -> None:
+		with self._lock:
+			last, count = self._pending.get(account_id, (used_at, 0))
+			self._pending[account_id] = (max(last, used_at), count + 1)
+		if self.interval <= 0:
+			self.flush()
+		elif self._thread is None:
+			self._start()
+
+	def flush(self) -> int:
+		"""Write pending usage to the database and return the number of accounts updated."""
+		with self._lock:
+			pending, self._pending = self._pending, {}
+		if not pending:
+			return 0
+		from .models import CompanyAPIAccount
+		try:
+			with transaction.atomic():
+				# Sorted so concurrent flushes from several workers lock rows in the same order
+				for account_id in sorted(pending):
+					used_at, count = pending[account_id]
+					CompanyAPIAccount.objects.filter(pk=account_id).update(
+						last_used_at=used_at,
+						request_count=F('request_count') + count,
+					)
+		except Exception:
+			logger.exception('Failed to flush API account usage; retrying on next flush')
+			self._requeue(pending)
+			return 0
+		return len(pending)
+
+	def _requeue(self, pending: dict) -> None:
+		with self._lock:
+			for account_id, (used_at, count) in pending.items():
+				last, current = self._pending.get(account_id, (used_at, 0))
+				self._pending[account_id] = (max(last, used_at), current + count)
+
+	def _start(self) -> None:
+		with self._lock:
+			if self._thread is not None:
+				return
+			self._thread = threading.Thread(target=self._run, name='api-usage-flush', daemon=True)
+			self._thread.start()
+		atexit.register(self.flush)
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.interval):
+			self.flush()
+			# The flush thread owns its own connection; don't keep it open between flushes
+			connection.close()
+
+
+usage_tracker = UsageTracker(interval=settings.API_USAGE_FLUSH_INTERVAL)
@@ -6,3 +6,6 @@ class SurveysConfig(AppConfig):
 	name = 'surveys'
 	verbose_name = 'Pesquisas'
 
+	def ready(self):
+		"""Connect the survey definition cache invalidation signals."""
+		from . import signals  # noqa: F401
@@ -0,0 +1,162 @@
+"""Compiled survey definitions cached by token.
+
+The ingest path (``SubmissionCreateSerializer``) and ``api_survey_detail`` only
+need the survey structure, which changes rarely. It is compiled once into a
+``CompiledSurvey`` and kept in two tiers: a small per-process LRU with a short
+TTL and the shared Django cache (local memory, file-based or Redis, see
+``CACHE_URL``). Signals in ``surveys.signals`` invalidate the shared tier and
+bump a per-token version stamp in it whenever a survey, question, option or
+company is saved or deleted. Each process compares its local copy with that
+stamp at most every ``SURVEY_CACHE_VERSION_CHECK_INTERVAL`` seconds, so with a
+shared ``CACHE_URL`` an edit reaches every process within that interval. With
+the per-process default cache, only the process that saved the change sees it
+at once; the others keep their definition for up to ``SURVEY_CACHE_TIMEOUT``.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .models import Survey
+from .serializers import SurveyDetailSerializer
+
+
+CACHE_KEY_PREFIX = 'survey-def:'
+LOCAL_MAX_ENTRIES = 1024
+
+# Stored for unknown tokens so invalid requests do not reach the database either
+_MISSING = 'missing'
+
+
+@dataclass(frozen=True)
+class CompiledSurvey:
+	id: int
+	token: str
+	company_id: int
+	# question_id -> question_type
+	questions: dict[int, str]
+	# option_id -> question_id
+	option_question: dict[int, int]
+	# SurveyDetailSerializer output, served as-is by api_survey_detail
+	detail: dict = field(repr=False)
+
+
+# token -> (expires_at, definition, version, version checked at)
+_local: 'OrderedDict[str, tuple[float, CompiledSurvey | None, int, float]]' = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _cache_key(token: str) -> str:
+	return f'{CACHE_KEY_PREFIX}{token}'
+
+
+def _version_key(token: str) -> str:
+	return f'{CACHE_KEY_PREFIX}{token}:version'
+
+
+def compile_survey(token: str) -> CompiledSurvey | None:
+	"""Build the definition of ``token`` from the database (3 queries)."""
+	survey = (
+		Survey.objects
+		.filter(token=token)
+		.select_related('company')
+		.prefetch_related('questions__options')
+		.first()
+	)
+	if not survey:
+		return None
+	questions: dict[int, str] = {}
+	option_question: dict[int, int] = {}
+	for question in survey.questions.all():
+		questions[question.id] = question.question_type
+		for option in question.options.all():
+			option_question[option.id] = question.id
+	# Round-trip through JSON to store plain, picklable values
+	detail = json.loads(JSONRenderer().render(SurveyDetailSerializer(survey).data))
+	return CompiledSurvey(
+		id=survey.id,
+		token=survey.token,
+		company_id=survey.company_id,
+		questions=questions,
+		option_question=option_question,
+		detail=detail,
+	)
+
+
+def _remember_locally(token: str, compiled: CompiledSurvey | None, version: int, expires_at: float | None = None) -> None:
+	now = time.monotonic()
+	with _local_lock:
+		_local[token] = (expires_at or now + settings.SURVEY_CACHE_LOCAL_TTL, compiled, version, now)
+		_local.move_to_end(token)
+		while len(_local) > LOCAL_MAX_ENTRIES:
+			_local.popitem(last=False)
+
+
+def _local_entry(token: str) -> tuple[float, CompiledSurvey | None, int, float] | None:
+	with _local_lock:
+		entry = _local.get(token)
+	if entry is None or entry[0] <= time.monotonic():
+		return None
+	return entry
+
+
+def _fresh(entry) -> bool:
+	"""Whether ``entry`` can be served without comparing its version again."""
+	return entry is not None and time.monotonic() - entry[3] < settings.SURVEY_CACHE_VERSION_CHECK_INTERVAL
+
+
+def get_compiled_survey(token: str) -> CompiledSurvey | None:
+	"""Return the compiled definition for ``token`` or ``None`` if it does not exist."""
+	entry = _local_entry(token)
+	if _fresh(entry):
+		return entry[1]
+
+	# Read before the definition: invalidate() deletes it before bumping the version
+	version = cache.get(_version_key(token), 0)
+	if entry is not None and entry[2] == version:
+		_remember_locally(token, entry[1], version, expires_at=entry[0])
+		return entry[1]
+
+	cached = cache.get(_cache_key(token))
+	if cached is None:
+		compiled = compile_survey(token)
+		cache.set(_cache_key(token), compiled or _MISSING, settings.SURVEY_CACHE_TIMEOUT)
+	else:
+		compiled = None if cached == _MISSING else cached
+
+	_remember_locally(token, compiled, version)
+	return compiled
+
+
+async def aget_compiled_survey(token: str) -> CompiledSurvey | None:
+	"""Async :func:`get_compiled_survey`; only leaves the event loop when the local copy needs a check."""
+	entry = _local_entry(token)
+	if _fresh(entry):
+		return entry[1]
+	return await sync_to_async(get_compiled_survey)(token)
+
+
+def invalidate(*tokens: str) -> None:
+	"""Drop ``tokens`` from the shared cache and, through their versions, from every process."""
+	tokens = tuple(t for t in tokens if t)
+	if not tokens:
+		return
+	cache.delete_many([_cache_key(t) for t in tokens])
+	# Time-based so a cache eviction never brings back an older version
+	version = time.time_ns()
+	cache.set_many({_version_key(t): version for t in tokens}, None)
+	with _local_lock:
+		for token in tokens:
+			_local.pop(token, None)
+
+
+def clear_local() -> None:
+	"""Forget every definition cached in this process."""
+	with _local_lock:
+		_local.clear()
@@ -0,0 +1,37 @@
+"""Invalidate cached survey definitions when the survey structure changes."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from companies.models import Company
+from . import cache as survey_cache
+from .models import Option, Question, Survey
+
+
+def _invalidate(*tokens: str) -> None:
+	survey_cache.invalidate(*tokens)
+	# Again after the commit, in case another process cached the old rows meanwhile
+	transaction.on_commit(lambda: survey_cache.invalidate(*tokens))
+
+
+@receiver([post_save, post_delete], sender=Survey)
+def survey_changed(sender, instance, **kwargs):
+	_invalidate(instance.token)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+	token = Survey.objects.filter(pk=instance.survey_id).values_list('token', flat=True).first()
+	_invalidate(token)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_changed(sender, instance, **kwargs):
+	token = Question.objects.filter(pk=instance.question_id).values_list('survey__token', flat=True).first()
+	_invalidate(token)
+
+
+@receiver(post_save, sender=Company)
+def company_changed(sender, instance, **kwargs):
+	# The company name is part of the cached survey detail
+	_invalidate(*Survey.objects.filter(company=instance).values_list('token', flat=True))
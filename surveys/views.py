@@ -6,14 +6,17 @@ from companies.models import Company
 from django.core.paginator import Paginator
 from .models import Survey, Question, Option
 from .forms import CompanyForm, SurveyForm, QuestionForm, OptionForm
-from .serializers import SurveyDetailSerializer
+from .cache import get_compiled_survey
 
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
 from drf_spectacular.utils import extend_schema
 from .schema import get_survey_by_token_schema
+from answers.gazetteer import get_gazetteer
+from answers.renderers import BINARY_RENDERER_CLASSES
 from answers.serializers import SubmissionCreateSerializer
 
 
@@ -368,39 +371,30 @@ def survey_preview_start(request):
 		else:
 			error_msg = 'Informe um token válido, estado e cidade.'
 			# Reload states and cities for error display
-			from answers.models import State, City
-			states = State.objects.all().order_by('name')
+			geo = get_gazetteer()
 			selected_state_code = request.POST.get('state_code', '')
-			cities = []
-			if selected_state_code:
-				try:
-					state = State.objects.get(code=selected_state_code)
-					cities = City.objects.filter(state=state).order_by('name')
-				except State.DoesNotExist:
-					pass
+			cities = geo.cities_in_state(selected_state_code) if selected_state_code else []
 			return render(request, 'surveys/preview_start.html', {
 				'error': error_msg,
-				'states': states,
+				'states': geo.states(),
 				'cities': cities,
 				'selected_state_code': selected_state_code
 			})
 	
 	# Load states for the form
-	from answers.models import State, City
-	states = State.objects.all().order_by('name')
+	geo = get_gazetteer()
 	
 	# Check if a state was selected via GET parameter
 	selected_state_code = request.GET.get('state_code')
 	cities = []
 	if selected_state_code:
-		try:
-			state = State.objects.get(code=selected_state_code)
-			cities = City.objects.filter(state=state).order_by('name')
-		except State.DoesNotExist:
+		if geo.state(selected_state_code):
+			cities = geo.cities_in_state(selected_state_code)
+		else:
 			selected_state_code = None
 	
 	return render(request, 'surveys/preview_start.html', {
-		'states': states,
+		'states': geo.states(),
 		'cities': cities,
 		'selected_state_code': selected_state_code
 	})
@@ -461,17 +455,17 @@ def survey_preview(request, token: str):
 		})
 
 	# Get location info from session for display
-	from answers.models import State, City
+	geo = get_gazetteer()
 	location_info = None
 	state_code = request.session.get('preview_state_code')
 	city_ibge_code = request.session.get('preview_city_ibge_code')
 	
 	if state_code and city_ibge_code:
-		try:
-			state = State.objects.get(code=state_code)
-			city = City.objects.get(ibge_code=city_ibge_code)
+		state = geo.state(state_code)
+		city = geo.city(city_ibge_code)
+		if state and city:
 			location_info = f"{city.name} - {state.uf}"
-		except (State.DoesNotExist, City.DoesNotExist):
+		else:
 			location_info = "Localização não encontrada"
 	
 	return render(request, 'surveys/preview_form.html', {
@@ -490,19 +484,20 @@ def survey_preview_success(request, token: str):
 
 @get_survey_by_token_schema
 @api_view(['GET'])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, *BINARY_RENDERER_CLASSES])
 @permission_classes([IsAuthenticated])
 def api_survey_detail(request):
 	"""
 	Get survey detail by token query param.
 	
 	Authentication: Basic Auth (username/password) or Bearer Token (legacy JWT)
+	Format: JSON by default, MessagePack or CBOR through the ``Accept`` header
 	"""
 	token = request.GET.get('token')
 	if not token:
 		return Response({'detail': 'token ausente'}, status=status.HTTP_400_BAD_REQUEST)
-	survey = Survey.objects.filter(token=token).prefetch_related('questions__options', 'company').first()
-	if not survey:
+	definition = get_compiled_survey(token)
+	if not definition:
 		return Response({'detail': 'pesquisa não encontrada'}, status=status.HTTP_404_NOT_FOUND)
-	data = SurveyDetailSerializer(survey).data
-	return Response(data)
+	return Response(definition.detail)
 